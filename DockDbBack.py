@@ -1,184 +1,52 @@
 import sys
 import os
-import json
-import datetime
-import subprocess
-import shutil
+import time
+
+# เวลาเริ่มโหลดโปรแกรม (ใช้กับ startup probe ของ bench/startup_time.py)
+STARTED_AT = time.time()
 
 from PyQt6 import QtWidgets, QtCore
 
 from DockDbBack_ui import Ui_MainWindow
+from cancel import CancelToken, OperationCancelled, use_token
+from logpipe import DEFAULT_MAX_LINES, LogPipeline
+from progress import format_progress
 
+# engine, catalog, scheduler ฯลฯ (asyncio, sqlite3, http.client, ...) ไม่จำเป็นต่อการวาดหน้าต่างครั้งแรก
+# จึง import ในเมธอดที่ใช้ และ MainWindow.load_settings() โหลดหลังหน้าต่างแสดงแล้ว
 
-def get_base_dir() -> str:
-    if getattr(sys, "frozen", False):
-        return os.path.dirname(sys.executable)
-    return os.path.dirname(os.path.abspath(__file__))
-
-
-def get_config_path() -> str:
-    return os.path.join(get_base_dir(), "config.json")
-
-
-BASE_DIR = get_base_dir()
-
-
-def load_config() -> dict:
-    config_path = get_config_path()
-
-    if not os.path.exists(config_path):
-        # ถ้ารันแบบ onefile และมี default config bundle อยู่ ให้ copy ออกมาวางข้าง exe
-        if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
-            bundled_path = os.path.join(sys._MEIPASS, "config.json")
-            if os.path.exists(bundled_path):
-                try:
-                    shutil.copyfile(bundled_path, config_path)
-                except OSError:
-                    pass
-
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"Config file not found: {config_path}")
-
-    with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def save_config(config: dict) -> None:
-    config_path = get_config_path()
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
-
-
-def run_cmd(cmd, log_callback):
-    msg = "Running: " + " ".join(cmd)
-    print(msg)
-    if log_callback:
-        log_callback(msg)
-    creationflags = 0
-    if os.name == "nt" and hasattr(subprocess, "CREATE_NO_WINDOW"):
-        creationflags = subprocess.CREATE_NO_WINDOW
-
-    result = subprocess.run(cmd, shell=False, creationflags=creationflags)
-    if result.returncode != 0:
-        err = f"Command failed with code {result.returncode}"
-        print(err)
-        if log_callback:
-            log_callback(err)
-        raise RuntimeError(err)
-
-
-def do_backup(db_type: str, config: dict, dump_path: str, log_callback=None):
-    section = config.get(db_type)
-    if not section:
-        raise RuntimeError(f"Config not found for db_type={db_type}")
-
-    src = section["source"]
-    container = src["container"]
-    db_name = src["db_name"]
-    db_user = src["db_user"]
-    db_password = src["db_password"]
-
-    container_dump_path = "/backup/" + os.path.basename(dump_path)
-
-    # สร้างโฟลเดอร์ /backup ใน container (ถ้ายังไม่มี)
-    run_cmd(["docker", "exec", container, "mkdir", "-p", "/backup"], log_callback)
-
-    if db_type.lower() == "postgres":
-        # pg_dump ใน container
-        run_cmd([
-            "docker", "exec", "-e", f"PGPASSWORD={db_password}", container,
-            "pg_dump", "-U", db_user, "-d", db_name, "-Fc", "-C", "-f", container_dump_path,
-        ], log_callback)
-
-        # ดึงไฟล์ออกมาที่ Windows host
-        run_cmd([
-            "docker", "cp", f"{container}:{container_dump_path}", dump_path
-        ], log_callback)
-
-    elif db_type.lower() == "mysql":
-        # mysqldump ใน container (ใช้ sh -c เพื่อ redirect ออกไฟล์)
-        dump_cmd = f"mysqldump -u {db_user} {db_name} > {container_dump_path}"
-        run_cmd([
-            "docker", "exec", "-e", f"MYSQL_PWD={db_password}", container,
-            "sh", "-c", dump_cmd,
-        ], log_callback)
-
-        run_cmd([
-            "docker", "cp", f"{container}:{container_dump_path}", dump_path
-        ], log_callback)
-    else:
-        raise RuntimeError(f"Unsupported db_type: {db_type}")
-
-    msg = f"Backup completed to: {dump_path}"
-    print(msg)
-    if log_callback:
-        log_callback(msg)
-
-
-def do_restore(db_type: str, config: dict, dump_path: str, log_callback=None):
-    section = config.get(db_type)
-    if not section:
-        raise RuntimeError(f"Config not found for db_type={db_type}")
-
-    tgt = section["target"]
-    container = tgt["container"]
-    db_name = tgt["db_name"]
-    db_user = tgt["db_user"]
-    db_password = tgt["db_password"]
-
-    file_name = os.path.basename(dump_path)
-    container_dump_path = f"/backup/{file_name}"
-
-    # สร้างโฟลเดอร์ /backup ใน container ปลายทาง (ถ้ายังไม่มี)
-    run_cmd(["docker", "exec", container, "mkdir", "-p", "/backup"], log_callback)
-
-    # copy ไฟล์จาก Windows host เข้า container
-    run_cmd(["docker", "cp", dump_path, f"{container}:{container_dump_path}"], log_callback)
-
-    if db_type.lower() == "postgres":
-        # pg_restore ทับฐาน db_name โดยไม่ตั้ง owner จาก dump
-        run_cmd([
-            "docker", "exec", "-e", f"PGPASSWORD={db_password}", container,
-            "pg_restore", "-U", db_user,
-            "-d", db_name,
-            "--clean", "--if-exists", "--no-owner",
-            container_dump_path,
-        ], log_callback)
-
-    elif db_type.lower() == "mysql":
-        # mysql restore ภายใน container ด้วย sh -c และ redirect
-        restore_cmd = f"mysql -u {db_user} {db_name} < {container_dump_path}"
-        run_cmd([
-            "docker", "exec", "-e", f"MYSQL_PWD={db_password}", container,
-            "sh", "-c", restore_cmd,
-        ], log_callback)
-    else:
-        raise RuntimeError(f"Unsupported db_type: {db_type}")
-
-    msg = f"Restore completed into DB: {db_name}"
-    print(msg)
-    if log_callback:
-        log_callback(msg)
+# ช่อง log ดึงบรรทัดจาก ring buffer เป็นชุดทุก 100 ms (10 ครั้งต่อวินาที) ไม่ว่า log จะเข้ามาเร็วแค่ไหน
+LOG_FLUSH_INTERVAL_MS = 100
 
 
 class Worker(QtCore.QThread):
-    log_signal = QtCore.pyqtSignal(str)
+    progress_signal = QtCore.pyqtSignal(dict)
     finished_signal = QtCore.pyqtSignal(bool, str)
 
-    def __init__(self, fn, *args, **kwargs):
+    def __init__(self, log_sink, fn, *args, **kwargs):
         super().__init__()
+        # log ไม่ผ่าน signal ทีละบรรทัด แต่ส่งเข้า LogPipeline ตรง ๆ (thread-safe) แล้ว GUI ดึงไปแสดงเป็นชุด
+        self.log_sink = log_sink
         self.fn = fn
         self.args = args
         self.kwargs = kwargs
+        # ปุ่ม Cancel/Pause สั่งงานผ่าน token นี้ (engine ตรวจ token ของ thread ที่รันอยู่)
+        self.token = CancelToken()
+        # ค่าที่ fn คืน (อ่านได้หลัง finished_signal สำเร็จ เช่นรายชื่อตารางของ list_dump_tables)
+        self.result = None
 
-    def log(self, text: str):
-        self.log_signal.emit(text)
+    def progress(self, event: dict):
+        self.progress_signal.emit(event)
 
     def run(self):
         try:
-            self.kwargs["log_callback"] = self.log
-            self.fn(*self.args, **self.kwargs)
+            self.kwargs["log_callback"] = self.log_sink
+            self.kwargs["progress_callback"] = self.progress
+            with use_token(self.token):
+                self.result = self.fn(*self.args, **self.kwargs)
             self.finished_signal.emit(True, "")
+        except OperationCancelled:
+            self.finished_signal.emit(False, "Operation cancelled")
         except Exception as e:
             self.finished_signal.emit(False, str(e))
 
@@ -186,6 +54,10 @@ class Worker(QtCore.QThread):
 class ConfigDialog(QtWidgets.QDialog):
     def __init__(self, parent, config: dict):
         super().__init__(parent)
+        from compression import CODECS
+        from engine import BASE_DIR, DB_TYPES, STORAGE_MODES, TRANSFER_MODES
+        from verify import DEFAULT_WORKERS, VERIFY_MODES
+
         self.setWindowTitle("Config")
         self.config = config
 
@@ -194,8 +66,10 @@ class ConfigDialog(QtWidgets.QDialog):
         top_layout = QtWidgets.QHBoxLayout()
         label_db = QtWidgets.QLabel("Database type:", parent=self)
         self.combo_db_type = QtWidgets.QComboBox(parent=self)
+        # config มี key อื่นด้วย (jobs, scheduler) จึงแสดงเฉพาะ section ของ db_type
         for key in sorted(self.config.keys()):
-            self.combo_db_type.addItem(key)
+            if key.lower() in DB_TYPES:
+                self.combo_db_type.addItem(key)
         top_layout.addWidget(label_db)
         top_layout.addWidget(self.combo_db_type)
         layout.addLayout(top_layout)
@@ -214,6 +88,75 @@ class ConfigDialog(QtWidgets.QDialog):
         self.edit_tgt_db_password = QtWidgets.QLineEdit(parent=self)
         self.edit_tgt_db_password.setEchoMode(QtWidgets.QLineEdit.EchoMode.Password)
 
+        self.combo_transfer = QtWidgets.QComboBox(parent=self)
+        for mode in TRANSFER_MODES:
+            self.combo_transfer.addItem(mode)
+
+        # จำนวน worker ของ pg_dump/pg_restore (>1 = ใช้ directory format -Fd และ -j)
+        self.spin_parallel = QtWidgets.QSpinBox(parent=self)
+        self.spin_parallel.setRange(1, 64)
+
+        # การบีบอัดบน host ระหว่าง stream (level 0 = ค่า default ของ codec, threads ใช้กับ zstd)
+        self.combo_codec = QtWidgets.QComboBox(parent=self)
+        for codec in CODECS:
+            self.combo_codec.addItem(codec)
+        self.spin_level = QtWidgets.QSpinBox(parent=self)
+        self.spin_level.setRange(0, 22)
+        self.spin_level.setSpecialValueText("default")
+        self.spin_threads = QtWidgets.QSpinBox(parent=self)
+        self.spin_threads.setRange(0, 64)
+
+        # repository = เก็บเป็น chunk แบบ dedup แล้วเขียน manifest แทนไฟล์ dump เต็ม
+        self.combo_storage = QtWidgets.QComboBox(parent=self)
+        for storage in STORAGE_MODES:
+            self.combo_storage.addItem(storage)
+        self.edit_repository = QtWidgets.QLineEdit(parent=self)
+        self.edit_repository.setPlaceholderText(os.path.join(BASE_DIR, "repository"))
+
+        # pattern ของตารางคั่นด้วย comma เช่น public.invoice*, audit_log (ว่าง = ทุกตาราง)
+        self.edit_tables_include = QtWidgets.QLineEdit(parent=self)
+        self.edit_tables_include.setPlaceholderText("all tables")
+        self.edit_tables_exclude = QtWidgets.QLineEdit(parent=self)
+
+        # restore/clone ของ Postgres ใน transaction เดียว: ล้มเหลวหรือกด Cancel แล้ว target ไม่เปลี่ยน
+        self.check_single_transaction = QtWidgets.QCheckBox("Restore in a single transaction", parent=self)
+        # restore ลง <db_name>_shadow แล้วค่อยสลับชื่อ: ฐานจริงหยุดแค่ช่วงสลับไม่กี่วินาที
+        self.check_shadow_restore = QtWidgets.QCheckBox(
+            "Restore into a shadow database, then swap it in", parent=self,
+        )
+        # เทียบ target กับ source ทีละตารางหลัง restore/clone (count, sample หรือ full checksum)
+        self.combo_verify = QtWidgets.QComboBox(parent=self)
+        for mode in VERIFY_MODES:
+            self.combo_verify.addItem(mode)
+        self.spin_verify_workers = QtWidgets.QSpinBox(parent=self)
+        self.spin_verify_workers.setRange(1, 64)
+        self.spin_verify_workers.setValue(DEFAULT_WORKERS)
+        # ส่ง backup ขึ้น object storage แบบ S3 ระหว่าง dump (url ว่าง = ไม่ upload)
+        self.edit_upload_url = QtWidgets.QLineEdit(parent=self)
+        self.edit_upload_url.setPlaceholderText("http://minio:9000 (empty = no upload)")
+        self.edit_upload_bucket = QtWidgets.QLineEdit(parent=self)
+        self.edit_upload_prefix = QtWidgets.QLineEdit(parent=self)
+        self.edit_upload_access_key = QtWidgets.QLineEdit(parent=self)
+        self.edit_upload_secret_key = QtWidgets.QLineEdit(parent=self)
+        self.edit_upload_secret_key.setEchoMode(QtWidgets.QLineEdit.EchoMode.Password)
+
+        # ตรวจพื้นที่ว่างบน host และ /backup ใน container ก่อนเริ่ม (การต่อฐานข้อมูลตรวจเสมอ)
+        self.check_preflight = QtWidgets.QCheckBox("Check free space before starting", parent=self)
+
+        # retention แบบ GFS: จำนวน backup รายวัน/สัปดาห์/เดือนที่เก็บ และเพดานขนาดรวม (0 = ไม่ใช้)
+        self.spin_retention = {}
+        retention_layout = QtWidgets.QHBoxLayout()
+        for key, label, maximum in (
+            ("daily", "daily", 366), ("weekly", "weekly", 520), ("monthly", "monthly", 1200),
+            ("max_size_mb", "max MB", 10_000_000),
+        ):
+            spin = QtWidgets.QSpinBox(parent=self)
+            spin.setRange(0, maximum)
+            spin.setSpecialValueText("off")
+            retention_layout.addWidget(QtWidgets.QLabel(label, parent=self))
+            retention_layout.addWidget(spin)
+            self.spin_retention[key] = spin
+
         form.addRow("Source container:", self.edit_src_container)
         form.addRow("Source db_name:", self.edit_src_db_name)
         form.addRow("Source db_user:", self.edit_src_db_user)
@@ -222,6 +165,26 @@ class ConfigDialog(QtWidgets.QDialog):
         form.addRow("Target db_name:", self.edit_tgt_db_name)
         form.addRow("Target db_user:", self.edit_tgt_db_user)
         form.addRow("Target db_password:", self.edit_tgt_db_password)
+        form.addRow("Transfer mode:", self.combo_transfer)
+        form.addRow("Parallel jobs:", self.spin_parallel)
+        form.addRow("Compression:", self.combo_codec)
+        form.addRow("Compression level:", self.spin_level)
+        form.addRow("Compression threads:", self.spin_threads)
+        form.addRow("Storage:", self.combo_storage)
+        form.addRow("Repository path:", self.edit_repository)
+        form.addRow("Include tables:", self.edit_tables_include)
+        form.addRow("Exclude tables:", self.edit_tables_exclude)
+        form.addRow("", self.check_single_transaction)
+        form.addRow("", self.check_shadow_restore)
+        form.addRow("Verify after restore:", self.combo_verify)
+        form.addRow("Verify workers:", self.spin_verify_workers)
+        form.addRow("", self.check_preflight)
+        form.addRow("Retention:", retention_layout)
+        form.addRow("Upload URL:", self.edit_upload_url)
+        form.addRow("Upload bucket:", self.edit_upload_bucket)
+        form.addRow("Upload prefix:", self.edit_upload_prefix)
+        form.addRow("Upload access key:", self.edit_upload_access_key)
+        form.addRow("Upload secret key:", self.edit_upload_secret_key)
 
         layout.addLayout(form)
 
@@ -239,6 +202,8 @@ class ConfigDialog(QtWidgets.QDialog):
             self._load_from_config(self.combo_db_type.currentText())
 
     def _load_from_config(self, db_type: str):
+        from verify import DEFAULT_WORKERS
+
         section = self.config.get(db_type.lower()) or self.config.get(db_type) or {}
         src = section.get("source", {})
         tgt = section.get("target", {})
@@ -253,6 +218,37 @@ class ConfigDialog(QtWidgets.QDialog):
         self.edit_tgt_db_user.setText(tgt.get("db_user", ""))
         self.edit_tgt_db_password.setText(tgt.get("db_password", ""))
 
+        self.combo_transfer.setCurrentText(section.get("transfer", "stream"))
+        self.spin_parallel.setValue(int(section.get("parallel", 1) or 1))
+
+        compression = section.get("compression") or {}
+        self.combo_codec.setCurrentText(compression.get("codec") or "none")
+        self.spin_level.setValue(int(compression.get("level") or 0))
+        self.spin_threads.setValue(int(compression.get("threads") or 0))
+
+        self.combo_storage.setCurrentText(section.get("storage") or "file")
+        self.edit_repository.setText(section.get("repository", ""))
+
+        tables = section.get("tables") or {}
+        self.edit_tables_include.setText(", ".join(tables.get("include") or []))
+        self.edit_tables_exclude.setText(", ".join(tables.get("exclude") or []))
+        self.check_single_transaction.setChecked(bool(section.get("single_transaction")))
+        self.check_shadow_restore.setChecked(bool(section.get("shadow_restore")))
+        verify = section.get("verify") or {}
+        self.combo_verify.setCurrentText(verify.get("mode") or "off")
+        self.spin_verify_workers.setValue(int(verify.get("workers") or DEFAULT_WORKERS))
+        self.check_preflight.setChecked(bool(section.get("preflight", True)))
+        retention = section.get("retention") or {}
+        for key, spin in self.spin_retention.items():
+            spin.setValue(int(retention.get(key) or 0))
+
+        upload = section.get("upload") or {}
+        self.edit_upload_url.setText(upload.get("url", ""))
+        self.edit_upload_bucket.setText(upload.get("bucket", ""))
+        self.edit_upload_prefix.setText(upload.get("prefix", ""))
+        self.edit_upload_access_key.setText(upload.get("access_key", ""))
+        self.edit_upload_secret_key.setText(upload.get("secret_key", ""))
+
     def apply_to_config(self):
         db_key = self.combo_db_type.currentText()
         key_lower = db_key.lower()
@@ -273,40 +269,277 @@ class ConfigDialog(QtWidgets.QDialog):
         tgt["db_user"] = self.edit_tgt_db_user.text().strip()
         tgt["db_password"] = self.edit_tgt_db_password.text().strip()
 
+        section["transfer"] = self.combo_transfer.currentText()
+        section["parallel"] = self.spin_parallel.value()
+        section["compression"] = {
+            "codec": self.combo_codec.currentText(),
+            "level": self.spin_level.value() or None,
+            "threads": self.spin_threads.value(),
+        }
+        section["storage"] = self.combo_storage.currentText()
+        section["repository"] = self.edit_repository.text().strip()
+        section["tables"] = {
+            "include": [p.strip() for p in self.edit_tables_include.text().split(",") if p.strip()],
+            "exclude": [p.strip() for p in self.edit_tables_exclude.text().split(",") if p.strip()],
+        }
+        section["single_transaction"] = self.check_single_transaction.isChecked()
+        section["shadow_restore"] = self.check_shadow_restore.isChecked()
+        # chunk_rows แก้ได้ใน config.json
+        section["verify"] = {
+            **(section.get("verify") or {}),
+            "mode": self.combo_verify.currentText(),
+            "workers": self.spin_verify_workers.value(),
+        }
+        section["preflight"] = self.check_preflight.isChecked()
+        section["retention"] = {key: spin.value() for key, spin in self.spin_retention.items()}
+        # เก็บค่าอื่นของ upload (region, part_size_mb, concurrency) ที่แก้ใน config.json ไว้ตามเดิม
+        section["upload"] = {
+            **(section.get("upload") or {}),
+            "url": self.edit_upload_url.text().strip(),
+            "bucket": self.edit_upload_bucket.text().strip(),
+            "prefix": self.edit_upload_prefix.text().strip(),
+            "access_key": self.edit_upload_access_key.text().strip(),
+            "secret_key": self.edit_upload_secret_key.text().strip(),
+        }
+
+
+class TableSelectDialog(QtWidgets.QDialog):
+    """เลือกตารางจาก TOC ของ dump เพื่อ restore เฉพาะบางตาราง"""
+
+    def __init__(self, parent, tables: list[str], selected: list[str]):
+        super().__init__(parent)
+        self.setWindowTitle("Select Tables")
+        self.resize(420, 480)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.edit_filter = QtWidgets.QLineEdit(parent=self)
+        self.edit_filter.setPlaceholderText("Filter...")
+        layout.addWidget(self.edit_filter)
+
+        self.list_tables = QtWidgets.QListWidget(parent=self)
+        for name in tables:
+            item = QtWidgets.QListWidgetItem(name, self.list_tables)
+            item.setFlags(item.flags() | QtCore.Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(
+                QtCore.Qt.CheckState.Checked if name in selected else QtCore.Qt.CheckState.Unchecked
+            )
+        layout.addWidget(self.list_tables)
+
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok
+            | QtWidgets.QDialogButtonBox.StandardButton.Cancel,
+            parent=self,
+        )
+        btn_clear = buttons.addButton("Clear", QtWidgets.QDialogButtonBox.ButtonRole.ResetRole)
+        btn_clear.clicked.connect(lambda: self._set_all(QtCore.Qt.CheckState.Unchecked))
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.edit_filter.textChanged.connect(self._apply_filter)
+
+    def _apply_filter(self, text: str):
+        text = text.strip().lower()
+        for i in range(self.list_tables.count()):
+            item = self.list_tables.item(i)
+            item.setHidden(bool(text) and text not in item.text().lower())
+
+    def _set_all(self, state):
+        for i in range(self.list_tables.count()):
+            self.list_tables.item(i).setCheckState(state)
+
+    def selected_tables(self) -> list[str]:
+        return [
+            self.list_tables.item(i).text()
+            for i in range(self.list_tables.count())
+            if self.list_tables.item(i).checkState() == QtCore.Qt.CheckState.Checked
+        ]
+
+
+class CatalogDialog(QtWidgets.QDialog):
+    """เลือก backup จาก catalog (ใหม่สุดก่อน) แทนการเปิดหาไฟล์เอง"""
+
+    COLUMNS = ("Created", "Job", "Type", "Database", "Size", "Tables", "Path")
+
+    def __init__(self, parent, config: dict, db_type: str):
+        super().__init__(parent)
+        self.setWindowTitle("Backup Catalog")
+        self.resize(900, 480)
+        self.config = config
+        self.db_type = db_type
+        self.backups: list[dict] = []
+
+        layout = QtWidgets.QVBoxLayout(self)
+        row = QtWidgets.QHBoxLayout()
+        self.edit_search = QtWidgets.QLineEdit(parent=self)
+        self.edit_search.setPlaceholderText("Search path, job, database or table...")
+        row.addWidget(self.edit_search)
+        self.btn_rescan = QtWidgets.QPushButton("Rescan", parent=self)
+        row.addWidget(self.btn_rescan)
+        layout.addLayout(row)
+
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS), parent=self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok
+            | QtWidgets.QDialogButtonBox.StandardButton.Cancel,
+            parent=self,
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.edit_search.textChanged.connect(lambda _text: self.refresh())
+        self.btn_rescan.clicked.connect(self.rescan)
+        self.table.doubleClicked.connect(lambda _index: self.accept())
+        # scan ข้ามไฟล์ที่ไม่เปลี่ยน จึงเรียกทุกครั้งที่เปิด ให้เห็น backup ที่เพิ่งวางไว้โดยไม่ต้องกด Rescan
+        self.rescan()
+
+    def rescan(self):
+        from catalog import scan
+        from engine import get_catalog_path
+        from scheduler import backup_roots
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.CursorShape.WaitCursor)
+        try:
+            scan(get_catalog_path(), backup_roots(self.config))
+        except (RuntimeError, OSError) as e:
+            QtWidgets.QMessageBox.warning(self, "Catalog", str(e))
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+        self.refresh()
+
+    def refresh(self):
+        from catalog import list_backups
+        from engine import get_catalog_path
+
+        self.backups = list_backups(
+            get_catalog_path(), db_type=self.db_type, search=self.edit_search.text().strip() or None,
+        )
+        self.table.setRowCount(len(self.backups))
+        for i, entry in enumerate(self.backups):
+            size = f"{entry['size'] / (1024 * 1024):,.1f} MB" if entry["size"] is not None else ""
+            values = (
+                entry["created_at"] or "", entry["job"] or "", entry["db_type"] or "",
+                f"{entry['container'] or ''}/{entry['db_name'] or ''}" if entry["container"] else "",
+                size, "" if entry["table_count"] is None else str(entry["table_count"]), entry["path"],
+            )
+            for column, value in enumerate(values):
+                self.table.setItem(i, column, QtWidgets.QTableWidgetItem(value))
+        self.table.resizeColumnsToContents()
+        if self.backups:
+            self.table.selectRow(0)
+
+    def selected_path(self) -> str | None:
+        rows = self.table.selectionModel().selectedRows()
+        return self.backups[rows[0].row()]["path"] if rows else None
+
 
 class MainWindow(QtWidgets.QWidget, Ui_MainWindow):
     def __init__(self):
         super().__init__()
         self.setupUi(self)
 
-        self.config = load_config()
+        # config โหลดใน load_settings() หลังหน้าต่างแสดงแล้ว ระหว่างนั้นปุ่มสั่งงานยังกดไม่ได้
+        self.config: dict = {}
         self.worker: Worker | None = None
         self.current_operation: str | None = None
-
-        # ตั้งค่า label แสดง config สำหรับค่าเริ่มต้น (Postgres)
-        self.update_info_labels("Postgres")
-
-        # ค่าเริ่มต้นของ path backup/restore
-        default_name = datetime.datetime.now().strftime("back_%Y%m%d%H%M%S.dump")
-        self.lineEditBackupPath.setText(os.path.join(BASE_DIR, default_name))
-        self.lineEditRestorePath.setText(os.path.join(BASE_DIR, "back_*.dump"))
+        # ตารางที่เลือกไว้สำหรับ restore (ว่าง = ทั้งฐาน)
+        self.restore_tables: list[str] = []
+        # dump ที่กำลังอ่านรายชื่อตารางใน worker (ถ้าผู้ใช้เปลี่ยน path ระหว่างนั้นจะไม่เปิดหน้าต่างเลือกตาราง)
+        self.tables_dump_path: str | None = None
+        self.labelSrcInfo.setText("source: (loading config...)")
+        self.labelTgtInfo.setText("target: (loading config...)")
+
+        # log จากทุก thread เข้า ring buffer แล้วแสดงเป็นชุดตาม timer; ช่อง log เก็บไม่เกิน max_lines บรรทัด
+        self.log_pipeline = LogPipeline()
+        self.plainTextEditLog.setMaximumBlockCount(DEFAULT_MAX_LINES)
+        self.log_timer = QtCore.QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start()
 
         # ผูก signal/slot
         self.btnBackupBrowse.clicked.connect(self.browse_backup_path)
         self.btnBackupRun.clicked.connect(self.run_backup)
         self.btnRestoreBrowse.clicked.connect(self.browse_restore_path)
         self.btnRestoreRun.clicked.connect(self.run_restore)
+        self.btnRestoreTables.clicked.connect(self.select_restore_tables)
+        self.btnRestoreCatalog.clicked.connect(self.open_catalog_dialog)
+        self.lineEditRestorePath.textChanged.connect(lambda _text: self.set_restore_tables([]))
         self.comboDbType.currentTextChanged.connect(self.on_db_type_changed)
         self.btnConfig.clicked.connect(self.open_config_dialog)
+        self.btnJobsRun.clicked.connect(self.run_jobs)
+        self.btnCloneRun.clicked.connect(self.run_clone)
+        self.btnPause.clicked.connect(self.toggle_pause)
+        self.btnCancel.clicked.connect(self.cancel_operation)
 
         # เก็บปุ่มไว้ใช้ enable/disable ระหว่างทำงาน
         self.backup_run_btn = self.btnBackupRun
         self.restore_run_btn = self.btnRestoreRun
+        self.jobs_run_btn = self.btnJobsRun
+        self.clone_run_btn = self.btnCloneRun
+        self.set_run_buttons_enabled(False)
+        self.btnConfig.setEnabled(False)
+
+    def load_settings(self) -> bool:
+        """import engine แล้วโหลดและตรวจ config (เรียกจาก main หลังวาดหน้าต่างครั้งแรก)"""
+        from engine import BASE_DIR, load_config, use_docker_api, validate_config
+        from logpipe import get_log_options
+
+        try:
+            self.config = load_config()
+        except (OSError, ValueError) as e:
+            self.append_log(f"Could not load config: {e}")
+            QtWidgets.QMessageBox.critical(self, "Config", f"Could not load config: {e}")
+            return False
+        try:
+            log_options = get_log_options(self.config, BASE_DIR)
+            self.log_pipeline.open_file(log_options["dir"], log_options["max_mb"], log_options["backups"])
+            self.plainTextEditLog.setMaximumBlockCount(log_options["max_lines"])
+        except (OSError, RuntimeError) as e:
+            self.append_log(f"Warning: could not open the log file: {e}")
+        use_docker_api(self.config, self.append_log)
+        for problem in validate_config(self.config):
+            self.append_log(f"Config warning: {problem}")
+
+        # ตั้งค่า label แสดง config สำหรับค่าเริ่มต้น (Postgres)
+        self.update_info_labels("Postgres")
+
+        # ค่าเริ่มต้นของ path backup/restore
+        default_name = self.default_backup_name()
+        self.lineEditBackupPath.setText(os.path.join(BASE_DIR, default_name))
+        self.lineEditRestorePath.setText(os.path.join(BASE_DIR, f"{self.current_db_type()}_*.dump"))
+        self.set_run_buttons_enabled(True)
+        self.btnConfig.setEnabled(True)
+        return True
+
+    def set_run_buttons_enabled(self, enabled: bool):
+        self.backup_run_btn.setEnabled(enabled)
+        self.restore_run_btn.setEnabled(enabled)
+        self.jobs_run_btn.setEnabled(enabled)
+        self.clone_run_btn.setEnabled(enabled)
+        self.btnRestoreTables.setEnabled(enabled)
+
+    def default_backup_name(self) -> str:
+        from engine import default_dump_name
+
+        db_type = self.current_db_type()
+        return default_dump_name(db_type, self.config.get(db_type) or {})
 
     def current_db_type(self) -> str:
         return self.comboDbType.currentText().strip().lower() or "postgres"
 
     def update_info_labels(self, db_type_text: str | None = None):
+        if not self.config:
+            return
         db_type = (db_type_text or self.comboDbType.currentText() or "Postgres").lower()
         section = self.config.get(db_type)
         if not section:
@@ -324,52 +557,128 @@ class MainWindow(QtWidgets.QWidget, Ui_MainWindow):
 
     # ---- UI helpers ----
     def append_log(self, text: str):
-        self.plainTextEditLog.appendPlainText(text)
+        self.log_pipeline.emit(text)
+
+    def flush_log(self):
+        """แสดงบรรทัดที่ค้างใน ring buffer ด้วย appendPlainText ครั้งเดียว (เรียกจาก log_timer)"""
+        lines, dropped = self.log_pipeline.ring.drain()
+        if not lines:
+            return
+        # บรรทัดเกินความจุของช่อง log จะถูกลบทันทีอยู่แล้ว ไม่ต้องส่งเข้า widget
+        limit = self.plainTextEditLog.maximumBlockCount()
+        if len(lines) > limit:
+            dropped += len(lines) - limit
+            lines = lines[-limit:]
+        if dropped:
+            log_file = self.log_pipeline.file
+            where = f" (full log: {log_file.path})" if log_file else ""
+            lines.insert(0, f"... {dropped:,} lines skipped{where}")
+        self.plainTextEditLog.appendPlainText("\n".join(lines))
+
+    def on_progress(self, event: dict):
+        if event["total"]:
+            self.progressBar.setRange(0, 100)
+            self.progressBar.setValue(min(int(event["bytes"] * 100 / event["total"]), 100))
+        elif event["done"]:
+            self.progressBar.setRange(0, 100)
+            self.progressBar.setValue(100)
+        else:
+            # ไม่รู้ขนาดทั้งหมด แสดงเป็นแถบวิ่ง
+            self.progressBar.setRange(0, 0)
+        prefix = f"[{event['job']}] " if event.get("job") else ""
+        self.labelProgress.setText(prefix + format_progress(event))
 
     def open_config_dialog(self):
         dlg = ConfigDialog(self, self.config)
         if dlg.exec() == QtWidgets.QDialog.DialogCode.Accepted:
+            from engine import save_config
+
             dlg.apply_to_config()
             save_config(self.config)
             self.update_info_labels()
             QtWidgets.QMessageBox.information(self, "Config", "Config saved.")
 
     def browse_backup_path(self):
-        default_name = datetime.datetime.now().strftime("back_%Y%m%d%H%M%S.dump")
+        from engine import BASE_DIR
+
+        default_name = self.default_backup_name()
         default_path = self.lineEditBackupPath.text() or os.path.join(BASE_DIR, default_name)
         path, _ = QtWidgets.QFileDialog.getSaveFileName(
             self,
             "Select backup file",
             default_path,
-            "Dump files (*.dump);;All files (*.*)",
+            "Dump files (*.dump *.tar *.gz *.zst *.lz4 *.manifest);;All files (*.*)",
         )
         if path:
             self.lineEditBackupPath.setText(path)
 
     def browse_restore_path(self):
+        from engine import BASE_DIR
+
         current = self.lineEditRestorePath.text()
         start_path = current if os.path.isfile(current) else BASE_DIR
         path, _ = QtWidgets.QFileDialog.getOpenFileName(
             self,
             "Select dump file to restore",
             start_path,
-            "Dump files (*.dump);;All files (*.*)",
+            "Dump files (*.dump *.tar *.gz *.zst *.lz4 *.manifest);;All files (*.*)",
         )
         if path:
             self.lineEditRestorePath.setText(path)
 
+    def open_catalog_dialog(self):
+        dlg = CatalogDialog(self, self.config, self.current_db_type())
+        if dlg.exec() == QtWidgets.QDialog.DialogCode.Accepted and dlg.selected_path():
+            self.lineEditRestorePath.setText(dlg.selected_path())
+
+    def set_restore_tables(self, tables: list[str]):
+        self.restore_tables = tables
+        if tables:
+            self.labelRestoreTables.setText(f"Tables: {len(tables)} selected (data only)")
+        else:
+            self.labelRestoreTables.setText("Tables: all")
+
+    def select_restore_tables(self):
+        dump_path = self.lineEditRestorePath.text().strip()
+        if not dump_path or not os.path.exists(dump_path):
+            QtWidgets.QMessageBox.warning(self, "Restore", "Dump file does not exist")
+            return
+
+        from engine import list_dump_tables
+
+        # dump แบบ directory/tar ต้องส่งทั้งก้อนเข้า container ก่อน pg_restore -l จึงอ่านใน worker (ยกเลิกได้)
+        # แล้วเปิดหน้าต่างเลือกตารางใน on_worker_finished
+        self.current_operation = "tables"
+        self.tables_dump_path = dump_path
+        self.start_worker(list_dump_tables, self.current_db_type(), self.config, dump_path)
+
+    def show_table_picker(self, tables: list[str]):
+        dump_path, self.tables_dump_path = self.tables_dump_path, None
+        if dump_path != self.lineEditRestorePath.text().strip():
+            self.append_log("Restore path changed while reading the table list; select tables again")
+            return
+        dlg = TableSelectDialog(self, tables, self.restore_tables)
+        if dlg.exec() == QtWidgets.QDialog.DialogCode.Accepted:
+            self.set_restore_tables(dlg.selected_tables())
+
     def run_backup(self):
+        from engine import do_backup
+
         dump_path = self.lineEditBackupPath.text().strip()
         if not dump_path:
             QtWidgets.QMessageBox.warning(self, "Backup", "Please select dump file path")
             return
         db_type = self.current_db_type()
         self.current_operation = "backup"
-        self.start_worker(do_backup, db_type, dump_path)
+        self.start_worker(do_backup, db_type, self.config, dump_path)
 
     def run_restore(self):
+        from engine import do_restore
+        from objstore import is_remote_path
+
         dump_path = self.lineEditRestorePath.text().strip()
-        if not dump_path or not os.path.exists(dump_path):
+        # s3://bucket/key อ่านจาก object storage ตามการตั้งค่า upload ของ config
+        if not dump_path or not (is_remote_path(dump_path) or os.path.exists(dump_path)):
             QtWidgets.QMessageBox.warning(self, "Restore", "Dump file does not exist")
             return
 
@@ -377,38 +686,159 @@ class MainWindow(QtWidgets.QWidget, Ui_MainWindow):
         section = self.config.get(db_type)
         db_name = section["target"]["db_name"] if section else "?"
 
+        what = f"{len(self.restore_tables)} table(s) in database" if self.restore_tables else "database"
         reply = QtWidgets.QMessageBox.question(
             self,
             "Confirm Restore",
-            f"This will overwrite database '{db_name}' ({db_type}). Continue?",
+            f"This will overwrite {what} '{db_name}' ({db_type}). Continue?",
         )
         if reply != QtWidgets.QMessageBox.StandardButton.Yes:
             return
 
         self.current_operation = "restore"
-        self.start_worker(do_restore, db_type, dump_path)
+        self.start_worker(do_restore, db_type, self.config, dump_path, tables=self.restore_tables or None)
+
+    def run_clone(self):
+        from engine import do_clone
+
+        db_type = self.current_db_type()
+        section = self.config.get(db_type)
+        if not section:
+            QtWidgets.QMessageBox.warning(self, "Clone", f"Config not found for {db_type}")
+            return
+
+        copy_path = None
+        if self.checkBoxCloneCopy.isChecked():
+            copy_path = self.lineEditBackupPath.text().strip()
+            if not copy_path:
+                QtWidgets.QMessageBox.warning(self, "Clone", "Please select dump file path for the copy")
+                return
 
-    def start_worker(self, fn, db_type: str, dump_path: str):
+        src, tgt = section["source"], section["target"]
+        reply = QtWidgets.QMessageBox.question(
+            self,
+            "Confirm Clone",
+            f"This will overwrite database '{tgt['db_name']}' in {tgt['container']} "
+            f"with '{src['db_name']}' from {src['container']} ({db_type}). Continue?",
+        )
+        if reply != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+
+        self.current_operation = "clone"
+        self.start_worker(do_clone, db_type, self.config, copy_path)
+
+    def run_jobs(self):
+        from scheduler import get_jobs, run_jobs
+
+        try:
+            names = sorted(get_jobs(self.config))
+        except RuntimeError as e:
+            QtWidgets.QMessageBox.warning(self, "Jobs", str(e))
+            return
+        if not names:
+            QtWidgets.QMessageBox.warning(self, "Jobs", "No jobs configured in config.json")
+            return
+
+        reply = QtWidgets.QMessageBox.question(
+            self,
+            "Run Jobs",
+            f"Back up {len(names)} job(s): {', '.join(names)}?",
+        )
+        if reply != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+
+        self.current_operation = "jobs"
+        self.start_worker(run_jobs, self.config)
+
+    def start_worker(self, fn, *args, **kwargs):
         if self.worker is not None and self.worker.isRunning():
             QtWidgets.QMessageBox.information(self, "Info", "Another operation is running")
             return
 
-        self.backup_run_btn.setEnabled(False)
-        self.restore_run_btn.setEnabled(False)
+        self.set_run_buttons_enabled(False)
+        self.btnPause.setEnabled(True)
+        self.btnPause.setText("Pause")
+        self.btnCancel.setEnabled(True)
+        self.progressBar.setRange(0, 100)
+        self.progressBar.setValue(0)
+        self.labelProgress.setText("")
 
-        self.worker = Worker(fn, db_type, self.config, dump_path)
-        self.worker.log_signal.connect(self.append_log)
+        self.worker = Worker(self.log_pipeline.emit, fn, *args, **kwargs)
+        self.worker.progress_signal.connect(self.on_progress)
         self.worker.finished_signal.connect(self.on_worker_finished)
         self.worker.start()
 
+    def toggle_pause(self):
+        """pause/resume: หยุดการส่งข้อมูลแบบ stream ระหว่าง chunk และไม่เริ่มคำสั่งถัดไปจนกว่าจะ resume"""
+        if self.worker is None or not self.worker.isRunning():
+            return
+        token = self.worker.token
+        if token.paused:
+            token.resume()
+            self.btnPause.setText("Pause")
+            self.append_log("Resumed")
+        else:
+            token.pause()
+            self.btnPause.setText("Resume")
+            self.append_log("Paused (a command already running inside the container keeps running)")
+
+    def cancel_operation(self):
+        if self.worker is None or not self.worker.isRunning():
+            return
+        reply = QtWidgets.QMessageBox.question(
+            self,
+            "Cancel",
+            f"Cancel the running {self.current_operation or 'operation'}?",
+        )
+        if reply != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+        self.append_log("Cancelling...")
+        self.btnCancel.setEnabled(False)
+        self.btnPause.setEnabled(False)
+        self.worker.token.cancel()
+
+    def closeEvent(self, event):
+        # ปิดหน้าต่างระหว่างทำงาน: ยกเลิกแล้วรอให้หยุด process และลบไฟล์ชั่วคราวก่อน ไม่ทิ้ง process ค้าง
+        if self.worker is not None and self.worker.isRunning():
+            reply = QtWidgets.QMessageBox.question(
+                self,
+                "Quit",
+                f"A {self.current_operation or 'task'} is running. Cancel it and quit?",
+            )
+            if reply != QtWidgets.QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            self.worker.token.cancel()
+            QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.CursorShape.WaitCursor)
+            try:
+                self.worker.wait()
+            finally:
+                QtWidgets.QApplication.restoreOverrideCursor()
+        self.log_timer.stop()
+        self.log_pipeline.close_file()
+        event.accept()
+
     def on_worker_finished(self, success: bool, message: str):
-        self.backup_run_btn.setEnabled(True)
-        self.restore_run_btn.setEnabled(True)
-        if success:
+        # แสดง log ที่เหลือก่อนขึ้นกล่องข้อความ
+        self.flush_log()
+        self.set_run_buttons_enabled(True)
+        self.btnPause.setEnabled(False)
+        self.btnPause.setText("Pause")
+        self.btnCancel.setEnabled(False)
+        self.progressBar.setRange(0, 100)
+        if self.worker is not None and self.worker.token.cancelled:
+            QtWidgets.QMessageBox.information(self, "Cancelled", "Operation cancelled.")
+        elif success:
             if self.current_operation == "backup":
                 QtWidgets.QMessageBox.information(self, "Backup", "Backup completed successfully.")
+            elif self.current_operation == "jobs":
+                QtWidgets.QMessageBox.information(self, "Jobs", "All jobs completed successfully.")
             elif self.current_operation == "restore":
                 QtWidgets.QMessageBox.information(self, "Restore", "Restore completed successfully.")
+            elif self.current_operation == "clone":
+                QtWidgets.QMessageBox.information(self, "Clone", "Clone completed successfully.")
+            elif self.current_operation == "tables":
+                self.show_table_picker(self.worker.result or [])
         else:
             QtWidgets.QMessageBox.critical(self, "Error", message or "Operation failed")
         self.current_operation = None
@@ -417,15 +847,36 @@ class MainWindow(QtWidgets.QWidget, Ui_MainWindow):
         self.update_info_labels(text)
 
 
+def write_startup_probe(path: str, marks: dict):
+    """บันทึกเวลา (epoch) ของแต่ละช่วง startup เป็น JSON สำหรับ bench/startup_time.py"""
+    import json
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"frozen": bool(getattr(sys, "frozen", False)), "marks": marks}, f)
+
+
 def main():
     print("Starting main...")
+    # DOCKDBBACK_STARTUP_PROBE=<ไฟล์>: วัดเวลาเปิดโปรแกรมแล้วปิดทันทีเมื่อพร้อมใช้งาน
+    probe_path = os.environ.get("DOCKDBBACK_STARTUP_PROBE")
+    marks = {"started": STARTED_AT, "imported": time.time()}
     try:
         app = QtWidgets.QApplication(sys.argv)
         app.setStyle("Fusion")
+        marks["app"] = time.time()
         print("App created")
         window = MainWindow()
+        marks["window"] = time.time()
         print("Window created")
         window.show()
+        # ให้หน้าต่างวาดเสร็จก่อน แล้วค่อย import engine และโหลด/ตรวจ config
+        app.processEvents()
+        marks["first_paint"] = time.time()
+        window.load_settings()
+        marks["ready"] = time.time()
+        if probe_path:
+            write_startup_probe(probe_path, marks)
+            return
         print("Window shown, entering exec loop")
         sys.exit(app.exec())
     except Exception as e:
@@ -1,4 +1,10 @@
 # -*- mode: python ; coding: utf-8 -*-
+# ค่าเริ่มต้นเป็น onedir (dist/DockDbBack/): เปิดเร็วเพราะไม่ต้องแตกไฟล์ทั้งหมดลง _MEIPASS ทุกครั้งแบบ onefile
+# ต้องการไฟล์ exe เดียวแบบเดิม: DOCKDBBACK_ONEFILE=1 pyinstaller DockDbBack.spec
+# วัดเวลาเปิด: python bench/startup_time.py --exe dist/DockDbBack/DockDbBack
+import os
+
+ONEFILE = os.environ.get("DOCKDBBACK_ONEFILE") == "1"
 
 
 a = Analysis(
@@ -16,23 +22,52 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='DockDbBack',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if ONEFILE:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='DockDbBack',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        # DLL ของ Qt ที่บีบด้วย UPX ต้องคลายทุกครั้งที่โหลด ทำให้เปิดช้าลง
+        upx=False,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='DockDbBack',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='DockDbBack',
+    )
@@ -26,6 +26,10 @@ class Ui_MainWindow(object):
         self.btnConfig.setObjectName("btnConfig")
         self.layoutDbType.addWidget(self.btnConfig)
 
+        self.btnJobsRun = QtWidgets.QPushButton(parent=MainWindow)
+        self.btnJobsRun.setObjectName("btnJobsRun")
+        self.layoutDbType.addWidget(self.btnJobsRun)
+
         self.verticalLayout.addLayout(self.layoutDbType)
 
         # Backup group
@@ -64,7 +68,7 @@ class Ui_MainWindow(object):
 
         self.labelTgtInfo = QtWidgets.QLabel(parent=self.groupBoxRestore)
         self.labelTgtInfo.setObjectName("labelTgtInfo")
-        self.gridLayoutRestore.addWidget(self.labelTgtInfo, 0, 0, 1, 3)
+        self.gridLayoutRestore.addWidget(self.labelTgtInfo, 0, 0, 1, 4)
 
         self.labelRestorePath = QtWidgets.QLabel(parent=self.groupBoxRestore)
         self.labelRestorePath.setObjectName("labelRestorePath")
@@ -78,12 +82,61 @@ class Ui_MainWindow(object):
         self.btnRestoreBrowse.setObjectName("btnRestoreBrowse")
         self.gridLayoutRestore.addWidget(self.btnRestoreBrowse, 1, 2, 1, 1)
 
+        self.btnRestoreCatalog = QtWidgets.QPushButton(parent=self.groupBoxRestore)
+        self.btnRestoreCatalog.setObjectName("btnRestoreCatalog")
+        self.gridLayoutRestore.addWidget(self.btnRestoreCatalog, 1, 3, 1, 1)
+
+        self.labelRestoreTables = QtWidgets.QLabel(parent=self.groupBoxRestore)
+        self.labelRestoreTables.setObjectName("labelRestoreTables")
+        self.gridLayoutRestore.addWidget(self.labelRestoreTables, 2, 0, 1, 1)
+
+        self.btnRestoreTables = QtWidgets.QPushButton(parent=self.groupBoxRestore)
+        self.btnRestoreTables.setObjectName("btnRestoreTables")
+        self.gridLayoutRestore.addWidget(self.btnRestoreTables, 2, 1, 1, 1, QtCore.Qt.AlignmentFlag.AlignRight)
+
         self.btnRestoreRun = QtWidgets.QPushButton(parent=self.groupBoxRestore)
         self.btnRestoreRun.setObjectName("btnRestoreRun")
         self.gridLayoutRestore.addWidget(self.btnRestoreRun, 2, 2, 1, 1)
 
         self.verticalLayout.addWidget(self.groupBoxRestore)
 
+        # Clone group (source -> target โดยไม่ผ่านไฟล์บน host)
+        self.groupBoxClone = QtWidgets.QGroupBox(parent=MainWindow)
+        self.groupBoxClone.setObjectName("groupBoxClone")
+        self.gridLayoutClone = QtWidgets.QGridLayout(self.groupBoxClone)
+        self.gridLayoutClone.setObjectName("gridLayoutClone")
+
+        self.checkBoxCloneCopy = QtWidgets.QCheckBox(parent=self.groupBoxClone)
+        self.checkBoxCloneCopy.setObjectName("checkBoxCloneCopy")
+        self.gridLayoutClone.addWidget(self.checkBoxCloneCopy, 0, 0, 1, 2)
+
+        self.btnCloneRun = QtWidgets.QPushButton(parent=self.groupBoxClone)
+        self.btnCloneRun.setObjectName("btnCloneRun")
+        self.gridLayoutClone.addWidget(self.btnCloneRun, 0, 2, 1, 1)
+
+        self.verticalLayout.addWidget(self.groupBoxClone)
+
+        # Progress
+        self.layoutProgress = QtWidgets.QHBoxLayout()
+        self.layoutProgress.setObjectName("layoutProgress")
+        self.progressBar = QtWidgets.QProgressBar(parent=MainWindow)
+        self.progressBar.setObjectName("progressBar")
+        self.progressBar.setRange(0, 100)
+        self.progressBar.setValue(0)
+        self.layoutProgress.addWidget(self.progressBar)
+        self.labelProgress = QtWidgets.QLabel(parent=MainWindow)
+        self.labelProgress.setObjectName("labelProgress")
+        self.layoutProgress.addWidget(self.labelProgress)
+        self.btnPause = QtWidgets.QPushButton(parent=MainWindow)
+        self.btnPause.setObjectName("btnPause")
+        self.btnPause.setEnabled(False)
+        self.layoutProgress.addWidget(self.btnPause)
+        self.btnCancel = QtWidgets.QPushButton(parent=MainWindow)
+        self.btnCancel.setObjectName("btnCancel")
+        self.btnCancel.setEnabled(False)
+        self.layoutProgress.addWidget(self.btnCancel)
+        self.verticalLayout.addLayout(self.layoutProgress)
+
         # Console label
         self.labelConsole = QtWidgets.QLabel(parent=MainWindow)
         self.labelConsole.setObjectName("labelConsole")
@@ -96,7 +149,9 @@ class Ui_MainWindow(object):
         self.verticalLayout.addWidget(self.plainTextEditLog)
 
         # modern-ish tweaks
-        for btn in (self.btnBackupBrowse, self.btnBackupRun, self.btnRestoreBrowse, self.btnRestoreRun, self.btnConfig):
+        for btn in (self.btnBackupBrowse, self.btnBackupRun, self.btnRestoreBrowse, self.btnRestoreRun,
+                    self.btnRestoreCatalog, self.btnRestoreTables, self.btnCloneRun, self.btnConfig, self.btnJobsRun,
+                    self.btnPause, self.btnCancel):
             btn.setMinimumHeight(28)
 
         MainWindow.setStyleSheet(
@@ -167,6 +222,17 @@ class Ui_MainWindow(object):
                 background-color: #e5e7eb;
                 color: #9ca3af;
             }
+            QProgressBar {
+                background-color: #ffffff;
+                border: 1px solid #d1d5db;
+                border-radius: 6px;
+                text-align: center;
+                min-height: 18px;
+            }
+            QProgressBar::chunk {
+                background-color: #3b82f6;
+                border-radius: 5px;
+            }
             QPlainTextEdit {
                 font-family: "Cascadia Code", "Consolas", monospace;
                 font-size: 9pt;
@@ -189,6 +255,7 @@ class Ui_MainWindow(object):
             self.comboDbType.addItem("Postgres")
             self.comboDbType.addItem("MySQL")
         self.btnConfig.setText(_translate("MainWindow", "Config..."))
+        self.btnJobsRun.setText(_translate("MainWindow", "Run All Jobs"))
         self.groupBoxBackup.setTitle(_translate("MainWindow", "Backup"))
         self.labelSrcInfo.setText(_translate("MainWindow", "source:"))
         self.labelBackupPath.setText(_translate("MainWindow", "Dump file (save as):"))
@@ -198,5 +265,13 @@ class Ui_MainWindow(object):
         self.labelTgtInfo.setText(_translate("MainWindow", "target:"))
         self.labelRestorePath.setText(_translate("MainWindow", "Dump file (to restore):"))
         self.btnRestoreBrowse.setText(_translate("MainWindow", "Browse..."))
+        self.btnRestoreCatalog.setText(_translate("MainWindow", "Catalog..."))
+        self.labelRestoreTables.setText(_translate("MainWindow", "Tables: all"))
+        self.btnRestoreTables.setText(_translate("MainWindow", "Select Tables..."))
         self.btnRestoreRun.setText(_translate("MainWindow", "Run Restore"))
+        self.groupBoxClone.setTitle(_translate("MainWindow", "Clone (source → target)"))
+        self.checkBoxCloneCopy.setText(_translate("MainWindow", "Also save a copy to the backup dump file"))
+        self.btnCloneRun.setText(_translate("MainWindow", "Run Clone"))
+        self.btnPause.setText(_translate("MainWindow", "Pause"))
+        self.btnCancel.setText(_translate("MainWindow", "Cancel"))
         self.labelConsole.setText(_translate("MainWindow", "Console output:"))
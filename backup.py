@@ -20,14 +20,14 @@ def run(cmd: list[str]) -> None:
 
 def main() -> None:
     # สร้างโฟลเดอร์ /backup ใน container (ถ้ายังไม่มี)
-    run(["docker", "exec", "-it", SOURCE_CONTAINER, "mkdir", "-p", "/backup"])
+    run(["docker", "exec", SOURCE_CONTAINER, "mkdir", "-p", "/backup"])
 
     # ใช้ชื่อไฟล์ dump คงที่
     container_dump_path = "/backup/erp_back.dump"
 
     # pg_dump ใน container
     run([
-        "docker", "exec", "-e", f"PGPASSWORD={DB_PASSWORD}", "-it", SOURCE_CONTAINER,
+        "docker", "exec", "-e", f"PGPASSWORD={DB_PASSWORD}", SOURCE_CONTAINER,
         "pg_dump", "-U", DB_USER, "-d", DB_NAME, "-Fc", "-C", "-f", container_dump_path,
     ])
 
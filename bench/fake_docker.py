@@ -0,0 +1,244 @@
+"""ตัวแทนคำสั่ง docker สำหรับ benchmark (ไม่ต้องมี Docker จริง)
+
+รองรับเฉพาะคำสั่งที่ engine ใช้: exec, cp และเครื่องมือใน container
+(pg_dump, pg_restore, psql, mysqldump, mysql และคำสั่ง shell เช่น mkdir, rm, tar, sh, stat, tail) โดย path /backup ของแต่ละ
+container จะถูก map ไปไว้ที่ $FAKE_DOCKER_ROOT/<container>/backup
+
+ตัวแปรควบคุม:
+    FAKE_DOCKER_ROOT   โฟลเดอร์เก็บไฟล์ของ container จำลอง
+    FAKE_DUMP_SIZE     ขนาด dump ที่สร้าง (byte)
+    FAKE_DUMP_RATE     ความเร็วสูงสุดของ dump/restore (MB/s, 0 = ไม่จำกัด)
+    FAKE_RANDOM_RATIO  สัดส่วนข้อมูลสุ่ม (บีบอัดไม่ได้) ในแต่ละ block 0.0-1.0
+    FAKE_MYSQL_TABLES  จำนวนตารางของฐาน MySQL จำลอง (ขนาดรวม FAKE_DUMP_SIZE)
+"""
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def root_dir() -> str:
+    return os.environ.get("FAKE_DOCKER_ROOT", "/tmp/fake_docker")
+
+
+def map_path(container: str, path: str) -> str:
+    if path.startswith("/"):
+        base = os.path.join(root_dir(), container)
+        os.makedirs(base, exist_ok=True)
+        return base + path
+    return path
+
+
+class Throttle:
+    def __init__(self):
+        self.rate = float(os.environ.get("FAKE_DUMP_RATE", "0")) * 1024 * 1024
+        self.started = time.monotonic()
+        self.bytes = 0
+
+    def wait(self, n: int):
+        self.bytes += n
+        if self.rate > 0:
+            ahead = self.bytes / self.rate - (time.monotonic() - self.started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def synthetic_blocks(size: int):
+    """block ของข้อมูลคล้าย SQL ผสมข้อมูลสุ่ม; เหมือนเดิมทุกครั้งที่รันด้วยขนาดเดียวกัน"""
+    rnd = random.Random(size)
+    ratio = float(os.environ.get("FAKE_RANDOM_RATIO", "0.3"))
+    text = b"".join(
+        b"INSERT INTO erp.invoice_line VALUES (%d, 'item-%05d', %d.%02d, 'note for row');\n" % (i, i % 9973, i % 500, i % 100)
+        for i in range(20000)
+    )
+    remaining = size
+    while remaining > 0:
+        n = min(BLOCK_SIZE, remaining)
+        n_random = int(n * ratio)
+        offset = rnd.randrange(len(text) - n) if len(text) > n else 0
+        block = rnd.randbytes(n_random) + text[offset:offset + n - n_random]
+        if len(block) < n:
+            block += bytes(n - len(block))
+        yield block
+        remaining -= n
+
+
+def dump(args: list[str], container: str) -> int:
+    size = int(os.environ.get("FAKE_DUMP_SIZE", str(64 * 1024 * 1024)))
+    throttle = Throttle()
+    if "-f" in args:
+        target = map_path(container, args[args.index("-f") + 1])
+        if "-Fd" in args:
+            os.makedirs(target, exist_ok=True)
+            jobs = int(args[args.index("-j") + 1]) if "-j" in args else 1
+            # -j จำลองด้วยการแบ่ง rate ให้ worker หลายตัว
+            throttle.rate *= jobs
+            with open(os.path.join(target, "toc.dat"), "wb") as f:
+                f.write(b"PGDMP" + bytes(4091))
+            with open(os.path.join(target, "1000.dat"), "wb") as f:
+                for block in synthetic_blocks(size):
+                    f.write(block)
+                    throttle.wait(len(block))
+        else:
+            with open(target, "wb") as f:
+                for block in synthetic_blocks(size):
+                    f.write(block)
+                    throttle.wait(len(block))
+        return 0
+    out = sys.stdout.buffer
+    for block in synthetic_blocks(size):
+        out.write(block)
+        throttle.wait(len(block))
+    out.flush()
+    return 0
+
+
+def mysql_tables() -> dict:
+    """ตาราง t00, t01, ... ขนาดลดหลั่นกัน รวมเท่ากับ FAKE_DUMP_SIZE"""
+    size = int(os.environ.get("FAKE_DUMP_SIZE", str(64 * 1024 * 1024)))
+    count = int(os.environ.get("FAKE_MYSQL_TABLES", "8"))
+    weights = [count - i for i in range(count)]
+    return {f"t{i:02d}": size * w // sum(weights) for i, w in enumerate(weights)}
+
+
+def positional_args(args: list[str]) -> list[str]:
+    result = []
+    i = 0
+    while i < len(args):
+        if args[i] in ("-u", "-h", "-P", "-e"):
+            i += 2
+            continue
+        if not args[i].startswith("-"):
+            result.append(args[i])
+        i += 1
+    return result
+
+
+def mysqldump_tables(tables: list[str]) -> int:
+    """output แบบ mysqldump ของหลายตาราง (header, ตารางละส่วน, footer)"""
+    sizes = mysql_tables()
+    throttle = Throttle()
+    out = sys.stdout.buffer
+    out.write(
+        b"-- MySQL dump 10.13  Distrib 8.0.36, for Linux (x86_64)\n--\n-- Host: localhost    Database: bench\n"
+        b"/*!40101 SET NAMES utf8mb4 */;\n"
+        b"/*!40014 SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0 */;\n\n"
+    )
+    for table in tables:
+        name = table.encode()
+        out.write(
+            b"--\n-- Table structure for table `%s`\n--\n\nDROP TABLE IF EXISTS `%s`;\n"
+            b"CREATE TABLE `%s` (\n  `id` int NOT NULL AUTO_INCREMENT,\n  `parent_id` int DEFAULT NULL,\n"
+            b"  `note` varchar(100) DEFAULT NULL,\n  PRIMARY KEY (`id`),\n  KEY `idx_note` (`note`),\n"
+            b"  CONSTRAINT `fk_%s` FOREIGN KEY (`parent_id`) REFERENCES `t00` (`id`)\n"
+            b") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;\n\n--\n-- Dumping data for table `%s`\n--\n\n"
+            % (name, name, name, name, name)
+        )
+        for block in synthetic_blocks(sizes.get(table, 0)):
+            out.write(block)
+            throttle.wait(len(block))
+        out.write(b"\n")
+    out.write(b"/*!40014 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS */;\n\n-- Dump completed\n")
+    out.flush()
+    return 0
+
+
+def mysql_session() -> int:
+    """session ที่อ่านคำสั่งจาก stdin ทีละบรรทัด; ตอบเฉพาะ SELECT 'ข้อความ'"""
+    for line in sys.stdin:
+        if line.startswith("SELECT '"):
+            print(line.split("'")[1], flush=True)
+    return 0
+
+
+def mysql_query(query: str) -> int:
+    if "information_schema.tables" in query:
+        for table, size in mysql_tables().items():
+            print(f"{table}\t{size}")
+    elif "information_schema.processlist" in query:
+        print(0)
+    else:
+        print(os.environ.get("FAKE_DUMP_SIZE", str(64 * 1024 * 1024)))
+    return 0
+
+
+def consume(args: list[str], container: str) -> int:
+    throttle = Throttle()
+    source = args[-1] if args and not args[-1].startswith("-") else None
+    mapped = map_path(container, source) if source and source.startswith("/") else None
+    if mapped and os.path.isdir(mapped):
+        files = [os.path.join(mapped, name) for name in sorted(os.listdir(mapped))]
+    elif mapped and os.path.exists(mapped):
+        files = [mapped]
+    else:
+        files = []
+    if files:
+        for path in files:
+            with open(path, "rb") as f:
+                while block := f.read(BLOCK_SIZE):
+                    throttle.wait(len(block))
+    else:
+        stdin = sys.stdin.buffer
+        while block := stdin.read(BLOCK_SIZE):
+            throttle.wait(len(block))
+    return 0
+
+
+def run_exec(args: list[str]) -> int:
+    while args and args[0].startswith("-"):
+        args = args[2:] if args[0] == "-e" else args[1:]
+    container, program, rest = args[0], args[1], args[2:]
+    if program == "mysqldump" and len(positional_args(rest)) > 1:
+        return mysqldump_tables(positional_args(rest)[1:])
+    if program in ("pg_dump", "mysqldump"):
+        return dump(rest, container)
+    if program == "mysql" and "--unbuffered" in rest:
+        return mysql_session()
+    if program == "mysql" and "-e" in rest:
+        return mysql_query(rest[rest.index("-e") + 1])
+    if program in ("pg_restore", "mysql"):
+        return consume(rest, container)
+    if program == "psql":
+        print(os.environ.get("FAKE_DUMP_SIZE", str(64 * 1024 * 1024)))
+        return 0
+    if program in ("mkdir", "rm", "tar", "sh", "cat", "df", "test", "stat", "tail", "sha256sum"):
+        mapped = [a.replace("/backup", map_path(container, "/backup")) for a in rest]
+        return subprocess.call([program, *mapped])
+    print(f"fake docker: unsupported program {program}", file=sys.stderr)
+    return 127
+
+
+def run_cp(src: str, dst: str) -> int:
+    def convert(arg):
+        if ":" in arg and not os.path.exists(arg):
+            container, path = arg.split(":", 1)
+            return map_path(container, path)
+        return arg
+
+    src, dst = convert(src), convert(dst)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, dirs_exist_ok=True)
+    else:
+        shutil.copyfile(src, dst)
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    if argv[:1] == ["-H"]:
+        argv = argv[2:]
+    if not argv:
+        return 2
+    if argv[0] == "exec":
+        return run_exec(argv[1:])
+    if argv[0] == "cp":
+        return run_cp(argv[1], argv[2])
+    print(f"fake docker: unsupported command {argv[0]}", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,258 @@
+"""Docker Engine API จำลองบน Unix socket สำหรับ benchmark/ทดสอบ docker_api (ไม่ต้องมี Docker จริง)
+
+รองรับเฉพาะที่ dockerapi ใช้: /_ping, สร้าง/เริ่ม/ตรวจ exec (stream แบบ hijack และ multiplex stdout/stderr)
+และ GET/PUT archive; คำสั่งใน container รันด้วย fake_docker.py (ตัวแปร FAKE_* ชุดเดียวกัน)
+
+ตัวอย่าง:
+    python bench/fake_docker_api.py --socket /tmp/fake_docker.sock
+"""
+import argparse
+import io
+import json
+import os
+import re
+import socket
+import socketserver
+import subprocess
+import sys
+import tarfile
+import threading
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler
+
+from fake_docker import map_path
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BLOCK_SIZE = 1024 * 1024
+
+_VERSION = re.compile(r"^/v[0-9.]+(?=/)")
+
+
+class ChunkedReader:
+    """อ่าน body แบบ Transfer-Encoding: chunked เป็น file object"""
+
+    def __init__(self, rfile):
+        self.rfile = rfile
+        self.remaining = 0
+        self.done = False
+
+    def read(self, size: int = -1) -> bytes:
+        if self.done:
+            return b""
+        if self.remaining == 0:
+            line = self.rfile.readline()
+            self.remaining = int(line.split(b";")[0].strip() or b"0", 16)
+            if self.remaining == 0:
+                self.rfile.readline()
+                self.done = True
+                return b""
+        n = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.rfile.read(n)
+        self.remaining -= len(data)
+        if self.remaining == 0:
+            self.rfile.readline()
+        return data
+
+
+class ChunkedWriter:
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self.wfile.write(b"%x\r\n" % len(data) + bytes(data) + b"\r\n")
+        return len(data)
+
+    def close(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeDockerServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self) -> str:
+        return "unix"
+
+    def _parse(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.route = _VERSION.sub("", url.path)
+        self.query = dict(urllib.parse.parse_qsl(url.query))
+
+    def _body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            return ChunkedReader(self.rfile)
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _json(self, status: int, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._parse()
+        if self.route == "/_ping":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"OK")
+            return
+        m = re.fullmatch(r"/exec/([^/]+)/json", self.route)
+        if m:
+            state = self.server.execs.get(m.group(1))
+            if state is None:
+                self._json(404, {"message": "no such exec"})
+                return
+            self._json(200, {"ID": m.group(1), "Running": state["exit_code"] is None, "ExitCode": state["exit_code"] or 0})
+            return
+        m = re.fullmatch(r"/containers/([^/]+)/archive", self.route)
+        if m:
+            path = map_path(m.group(1), self.query.get("path", "/"))
+            if not os.path.exists(path):
+                self._json(404, {"message": f"Could not find the file {self.query.get('path')} in container"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-tar")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            out = ChunkedWriter(self.wfile)
+            with tarfile.open(fileobj=out, mode="w|") as tar:
+                tar.add(path, arcname=os.path.basename(path.rstrip("/")))
+            out.close()
+            return
+        self._json(404, {"message": "page not found"})
+
+    def do_PUT(self):
+        self._parse()
+        m = re.fullmatch(r"/containers/([^/]+)/archive", self.route)
+        if not m:
+            self._json(404, {"message": "page not found"})
+            return
+        target = map_path(m.group(1), self.query.get("path", "/"))
+        body = self._body()
+        if not os.path.isdir(target):
+            if hasattr(body, "read"):
+                while body.read(BLOCK_SIZE):
+                    pass
+            self._json(404, {"message": f"Could not find the file {self.query.get('path')} in container"})
+            return
+        with tarfile.open(fileobj=body if hasattr(body, "read") else io.BytesIO(body), mode="r|") as tar:
+            tar.extractall(target, filter="data")
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        self._parse()
+        body = self._body()
+        m = re.fullmatch(r"/containers/([^/]+)/exec", self.route)
+        if m:
+            opts = json.loads(body or b"{}")
+            exec_id = uuid.uuid4().hex
+            self.server.execs[exec_id] = {"container": m.group(1), "opts": opts, "exit_code": None}
+            self._json(201, {"Id": exec_id})
+            return
+        m = re.fullmatch(r"/exec/([^/]+)/start", self.route)
+        if m and m.group(1) in self.server.execs:
+            self._start_exec(self.server.execs[m.group(1)])
+            return
+        self._json(404, {"message": "page not found"})
+
+    def _start_exec(self, state: dict):
+        opts = state["opts"]
+        env_args = [arg for pair in opts.get("Env") or [] for arg in ("-e", pair)]
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(BENCH_DIR, "fake_docker.py"), "exec", *env_args, state["container"],
+             *opts["Cmd"]],
+            stdin=subprocess.PIPE if opts.get("AttachStdin") else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        self.send_response(101, "UPGRADED")
+        self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Upgrade", "tcp")
+        self.end_headers()
+        self.wfile.flush()
+        lock = threading.Lock()
+
+        def forward(stream, stream_id: int):
+            try:
+                while data := stream.read1(BLOCK_SIZE):
+                    with lock:
+                        self.wfile.write(bytes([stream_id, 0, 0, 0]) + len(data).to_bytes(4, "big") + data)
+            except OSError:
+                # client ตัด connection (kill) ก่อน process จบ
+                proc.kill()
+
+        def feed():
+            try:
+                while data := self.rfile.read1(BLOCK_SIZE):
+                    proc.stdin.write(data)
+            except (BrokenPipeError, OSError, ValueError):
+                pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+
+        readers = [
+            threading.Thread(target=forward, args=(proc.stdout, 1), daemon=True),
+            threading.Thread(target=forward, args=(proc.stderr, 2), daemon=True),
+        ]
+        for t in readers:
+            t.start()
+        if proc.stdin:
+            threading.Thread(target=feed, daemon=True).start()
+        for t in readers:
+            t.join()
+        state["exit_code"] = proc.wait()
+        # stream จบเมื่อ process จบ (เหมือน daemon จริงที่ปิด connection)
+        self.close_connection = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class FakeDockerServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, Handler)
+        self.socket_path = socket_path
+        self.execs = {}
+
+
+def start_server(socket_path: str) -> FakeDockerServer:
+    """เปิด server ใน background thread (ปิดด้วย server.shutdown())"""
+    server = FakeDockerServer(socket_path)
+    threading.Thread(target=server.serve_forever, name="fake-docker-api", daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fake Docker Engine API on a Unix socket for tests")
+    parser.add_argument("--socket", required=True)
+    args = parser.parse_args(argv)
+    server = FakeDockerServer(args.socket)
+    print(f"listening on unix://{args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
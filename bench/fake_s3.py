@@ -0,0 +1,228 @@
+"""object storage แบบ S3 จำลองสำหรับ benchmark/ทดสอบ upload (ไม่ต้องมี MinIO)
+
+รองรับเฉพาะที่ objstore ใช้: PUT/GET/HEAD/DELETE object และ multipart upload (uploads, partNumber, uploadId)
+ตรวจลายเซ็น AWS Signature V4 จาก request ที่ได้รับจริง ข้อมูลเก็บเป็นไฟล์ใต้ <root>/<bucket>/<key>
+
+ตัวอย่าง:
+    python bench/fake_s3.py --root /tmp/fake_s3 --port 9000
+"""
+import argparse
+import hashlib
+import hmac
+import os
+import re
+import shutil
+import sys
+import threading
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ACCESS_KEY = "bench"
+SECRET_KEY = "benchsecret"
+BLOCK_SIZE = 1024 * 1024
+
+_AUTH = re.compile(r"AWS4-HMAC-SHA256 Credential=([^/]+)/(\d{8})/([^/]+)/s3/aws4_request, "
+                   r"SignedHeaders=([^,]+), Signature=([0-9a-f]{64})")
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return urllib.parse.quote(value, safe=safe)
+
+
+def _error(code: str, message: str) -> bytes:
+    return f"<?xml version=\"1.0\"?><Error><Code>{code}</Code><Message>{message}</Message></Error>".encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeS3Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- helpers ----
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _parse(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.raw_path = url.path
+        self.query = dict(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+        path = urllib.parse.unquote(url.path).lstrip("/")
+        self.bucket, _, self.key = path.partition("/")
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _check_auth(self, body: bytes) -> bool:
+        """คำนวณ canonical request จากสิ่งที่ได้รับจริงแล้วเทียบลายเซ็น"""
+        m = _AUTH.fullmatch(self.headers.get("Authorization") or "")
+        if not m or m.group(1) != ACCESS_KEY:
+            self._send(403, _error("InvalidAccessKeyId", "bad credentials"))
+            return False
+        _, date, region, signed_headers, signature = m.groups()
+        payload_hash = self.headers.get("x-amz-content-sha256") or ""
+        if body and payload_hash != hashlib.sha256(body).hexdigest():
+            self._send(400, _error("XAmzContentSHA256Mismatch", "payload hash does not match"))
+            return False
+        canonical_headers = "".join(
+            f"{name}:{' '.join((self.headers.get(name) or '').split())}\n" for name in signed_headers.split(";")
+        )
+        canonical_request = "\n".join([
+            self.command,
+            _quote(urllib.parse.unquote(self.raw_path), safe="-_.~/"),
+            "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(self.query.items())),
+            canonical_headers,
+            signed_headers,
+            payload_hash,
+        ])
+        scope = f"{date}/{region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", self.headers.get("x-amz-date") or "", scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        key = ("AWS4" + SECRET_KEY).encode()
+        for part in (date, region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        expected = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, signature):
+            self._send(403, _error("SignatureDoesNotMatch", "signature does not match"))
+            return False
+        return True
+
+    def _object_path(self) -> str:
+        return os.path.join(self.server.root, self.bucket, *self.key.split("/"))
+
+    def _upload_dir(self, upload_id: str) -> str:
+        return os.path.join(self.server.root, ".uploads", os.path.basename(upload_id))
+
+    # ---- methods ----
+    def do_PUT(self):
+        self._parse()
+        body = self._body()
+        if not self._check_auth(body):
+            return
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if "uploadId" in self.query:
+            upload_dir = self._upload_dir(self.query["uploadId"])
+            if not os.path.isdir(upload_dir):
+                self._send(404, _error("NoSuchUpload", "upload does not exist"))
+                return
+            with open(os.path.join(upload_dir, f"{int(self.query['partNumber']):05d}"), "wb") as f:
+                f.write(body)
+            self._send(200, headers={"ETag": etag})
+            return
+        path = self._object_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+        self._send(200, headers={"ETag": etag})
+
+    def do_POST(self):
+        self._parse()
+        body = self._body()
+        if not self._check_auth(body):
+            return
+        if "uploads" in self.query:
+            upload_id = uuid.uuid4().hex
+            os.makedirs(self._upload_dir(upload_id))
+            self._send(200, (
+                "<InitiateMultipartUploadResult xmlns=\"http://s3.amazonaws.com/doc/2006-03-01/\">"
+                f"<Bucket>{self.bucket}</Bucket><Key>{self.key}</Key><UploadId>{upload_id}</UploadId>"
+                "</InitiateMultipartUploadResult>"
+            ).encode())
+            return
+        upload_dir = self._upload_dir(self.query.get("uploadId", ""))
+        if not os.path.isdir(upload_dir):
+            self._send(404, _error("NoSuchUpload", "upload does not exist"))
+            return
+        parts = re.findall(rb"<PartNumber>(\d+)</PartNumber><ETag>([^<]+)</ETag>", body)
+        path = self._object_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as out:
+            for number, etag in parts:
+                with open(os.path.join(upload_dir, f"{int(number):05d}"), "rb") as f:
+                    data = f.read()
+                if etag.decode().strip('"') != hashlib.md5(data).hexdigest():
+                    # S3 ตอบ 200 พร้อม <Error> ใน body เมื่อรวม part ไม่ได้
+                    self._send(200, _error("InvalidPart", f"part {int(number)} does not match"))
+                    return
+                out.write(data)
+        os.replace(path + ".tmp", path)
+        shutil.rmtree(upload_dir)
+        self._send(200, f"<CompleteMultipartUploadResult><Key>{self.key}</Key></CompleteMultipartUploadResult>".encode())
+
+    def do_DELETE(self):
+        self._parse()
+        if not self._check_auth(b""):
+            return
+        if "uploadId" in self.query:
+            shutil.rmtree(self._upload_dir(self.query["uploadId"]), ignore_errors=True)
+        elif os.path.exists(self._object_path()):
+            os.remove(self._object_path())
+        self._send(204)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self._parse()
+        if not self._check_auth(b""):
+            return
+        path = self._object_path()
+        if not os.path.isfile(path):
+            self._send(404, b"" if self.command == "HEAD" else _error("NoSuchKey", "object does not exist"))
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        with open(path, "rb") as f:
+            while block := f.read(BLOCK_SIZE):
+                self.wfile.write(block)
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root: str, port: int = 0):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def start_server(root: str, port: int = 0) -> FakeS3Server:
+    """เปิด server ใน background thread (ปิดด้วย server.shutdown())"""
+    server = FakeS3Server(root, port)
+    threading.Thread(target=server.serve_forever, name="fake-s3", daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fake S3-compatible server for tests")
+    parser.add_argument("--root", required=True)
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args(argv)
+    server = FakeS3Server(args.root, args.port)
+    print(f"listening on {server.url} (access key {ACCESS_KEY}, secret {SECRET_KEY})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""Benchmark ของ pipeline backup/restore โดยใช้ fake docker (รันแบบ offline บน Linux ได้)
+
+ตัวอย่าง:
+    python bench/run_bench.py --size 256 --rate 0
+    python bench/run_bench.py --size 1024 --rate 200 --cases copy,stream,zstd,parallel4 --json
+
+แต่ละ case/operation รันใน process แยก เพื่อให้วัด CPU และ peak RSS ได้ถูกต้อง
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# ชื่อ case -> ค่าที่ override ใน section ของ config
+CASES = {
+    "copy": {"transfer": "copy"},
+    "stream": {"transfer": "stream"},
+    "gzip": {"transfer": "stream", "compression": {"codec": "gzip", "level": 1, "threads": 0}},
+    "zstd": {"transfer": "stream", "compression": {"codec": "zstd", "level": 3, "threads": 4}},
+    "lz4": {"transfer": "stream", "compression": {"codec": "lz4", "level": 0, "threads": 0}},
+    "parallel4": {"transfer": "stream", "parallel": 4},
+    "repository": {"transfer": "stream", "storage": "repository"},
+    # backup แล้ว upload ไป fake_s3 ระหว่าง stream, restore อ่านกลับจาก s3:// โดยตรง
+    "upload": {"transfer": "stream", "upload": {"bucket": "bench", "part_size_mb": 8, "concurrency": 4}},
+    # เหมือน stream แต่ docker exec ทุกขั้นตอนวิ่งผ่าน Docker Engine API จำลอง (fake_docker_api) แทน CLI
+    "dockerapi": {"transfer": "stream"},
+    # MySQL ตารางละไฟล์: 4 mysqldump จาก snapshot เดียวกัน, restore แล้วเพิ่ม index/foreign key ทีหลัง
+    "mysql4": {"transfer": "stream", "parallel": 4},
+}
+
+# case ที่เปิด docker_api ใน config (ระดับบนสุด)
+API_CASES = {"dockerapi"}
+
+# case ที่ใช้ฐาน MySQL จำลอง (case อื่นเป็น Postgres)
+MYSQL_CASES = {"mysql4"}
+
+# module ที่ case ต้องใช้ (ถ้าไม่มีจะข้าม case นั้น)
+CASE_REQUIRES = {"zstd": "zstandard", "lz4": "lz4"}
+
+
+def make_section(case: str, workdir: str) -> dict:
+    endpoint = {"db_name": "bench", "db_user": "bench", "db_password": "bench"}
+    section = {
+        "name": f"bench-{case}",
+        "source": {**endpoint, "container": "bench_src"},
+        "target": {**endpoint, "container": "bench_tgt"},
+        "transfer": "stream",
+        "parallel": 1,
+        "compression": {"codec": "none", "level": None, "threads": 0},
+        "storage": "file",
+        "repository": os.path.join(workdir, "repository"),
+    }
+    section.update(CASES[case])
+    if "upload" in section:
+        from fake_s3 import ACCESS_KEY, SECRET_KEY
+        section["upload"] = {
+            **section["upload"], "url": os.environ["FAKE_S3_URL"], "access_key": ACCESS_KEY, "secret_key": SECRET_KEY,
+        }
+    return section
+
+
+def artifact_path(case: str, workdir: str) -> str:
+    return os.path.join(workdir, f"{case}.tar" if CASES[case].get("parallel", 1) > 1 else f"{case}.dump")
+
+
+def path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def run_child(case: str, operation: str, workdir: str) -> dict:
+    """รันใน process ลูก: ทำ backup หรือ restore หนึ่งครั้งแล้วคืน metric"""
+    import resource
+
+    sys.path.insert(0, REPO_DIR)
+    import engine
+
+    # ไม่ให้ benchmark ไปปน history.db และ catalog.db จริงข้าง config.json
+    engine.get_history_path = lambda: os.path.join(workdir, "history.db")
+    engine.get_catalog_path = lambda: os.path.join(workdir, "catalog.db")
+
+    section = make_section(case, workdir)
+    db_type = "mysql" if case in MYSQL_CASES else "postgres"
+    config = {db_type: section}
+    if case in API_CASES:
+        config["docker_api"] = {"enabled": True, "socket": os.environ["FAKE_DOCKER_SOCKET"]}
+    dump_path = artifact_path(case, workdir)
+    first_byte = []
+
+    def on_progress(event):
+        if not first_byte and event["bytes"] > 0:
+            first_byte.append(time.perf_counter())
+
+    times_before = os.times()
+    started = time.perf_counter()
+    if operation == "backup":
+        engine.do_backup(db_type, config, dump_path, log_callback=None, progress_callback=on_progress)
+    elif "upload" in section:
+        engine.do_restore(
+            db_type, config, f"s3://{section['upload']['bucket']}/{os.path.basename(dump_path)}",
+            log_callback=None, progress_callback=on_progress,
+        )
+    else:
+        engine.do_restore(db_type, config, dump_path, log_callback=None, progress_callback=on_progress)
+    wall = time.perf_counter() - started
+    times_after = os.times()
+
+    cpu = sum(
+        getattr(times_after, field) - getattr(times_before, field)
+        for field in ("user", "system", "children_user", "children_system")
+    )
+    return {
+        "case": case,
+        "operation": operation,
+        "wall": wall,
+        "ttfb": (first_byte[0] - started) if first_byte else None,
+        "cpu": cpu,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_child_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        # repository: นับขนาด chunk ทั้งหมดรวมกับ manifest
+        "artifact_bytes": path_size(dump_path) + (
+            path_size(section["repository"]) if section["storage"] == "repository" else 0
+        ),
+    }
+
+
+def make_fake_bin(workdir: str) -> str:
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    launcher = os.path.join(bin_dir, "docker")
+    with open(launcher, "w", encoding="utf-8") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCH_DIR, "fake_docker.py")}" "$@"\n')
+    os.chmod(launcher, 0o755)
+    return bin_dir
+
+
+def case_available(case: str) -> bool:
+    module = CASE_REQUIRES.get(case)
+    if not module:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def run_case(case: str, operation: str, workdir: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", case, "--operation", operation, "--workdir", workdir],
+        env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{case}/{operation} failed:\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_table(results: list[dict], size_bytes: int):
+    print(f"{'case':<11} {'op':<8} {'wall s':>8} {'MB/s':>8} {'ttfb ms':>8} {'cpu s':>7} "
+          f"{'rss MB':>7} {'child MB':>8} {'out MB':>8}")
+    for r in results:
+        mbps = size_bytes / (1024 * 1024) / r["wall"] if r["wall"] else 0
+        ttfb = f"{r['ttfb'] * 1000:.0f}" if r["ttfb"] is not None else "-"
+        print(
+            f"{r['case']:<11} {r['operation']:<8} {r['wall']:>8.2f} {mbps:>8.1f} {ttfb:>8} {r['cpu']:>7.2f} "
+            f"{r['peak_rss_kb'] / 1024:>7.1f} {r['peak_child_rss_kb'] / 1024:>8.1f} "
+            f"{r['artifact_bytes'] / (1024 * 1024):>8.1f}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark DockDbBack backup/restore pipelines with a fake docker")
+    parser.add_argument("--size", type=int, default=256, help="dump size in MB (default 256)")
+    parser.add_argument("--rate", type=float, default=0, help="fake pg_dump/pg_restore speed in MB/s (0 = unlimited)")
+    parser.add_argument("--random-ratio", type=float, default=0.3, help="share of incompressible data per block")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma separated cases: " + ", ".join(CASES))
+    parser.add_argument("--operations", default="backup,restore")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep the work directory")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--operation", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.operation, args.workdir)))
+        return 0
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    for case in cases:
+        if case not in CASES:
+            parser.error(f"unknown case: {case}")
+    operations = [o.strip() for o in args.operations.split(",") if o.strip()]
+
+    workdir = tempfile.mkdtemp(prefix="dockdbback-bench-")
+    size_bytes = args.size * 1024 * 1024
+    env = dict(os.environ)
+    env["PATH"] = make_fake_bin(workdir) + os.pathsep + env.get("PATH", "")
+    env["FAKE_DOCKER_ROOT"] = os.path.join(workdir, "containers")
+    env["FAKE_DUMP_SIZE"] = str(size_bytes)
+    env["FAKE_DUMP_RATE"] = str(args.rate)
+    env["FAKE_RANDOM_RATIO"] = str(args.random_ratio)
+
+    server = None
+    if "upload" in cases:
+        from fake_s3 import start_server
+        server = start_server(os.path.join(workdir, "s3"))
+        env["FAKE_S3_URL"] = server.url
+    api_server = None
+    if API_CASES.intersection(cases):
+        # รันใน process แยกด้วย env เดียวกับ fake docker (FAKE_DOCKER_ROOT, FAKE_DUMP_SIZE, ...)
+        env["FAKE_DOCKER_SOCKET"] = os.path.join(workdir, "docker.sock")
+        api_server = subprocess.Popen(
+            [sys.executable, os.path.join(BENCH_DIR, "fake_docker_api.py"), "--socket", env["FAKE_DOCKER_SOCKET"]],
+            env=env, stdout=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 10
+        while not os.path.exists(env["FAKE_DOCKER_SOCKET"]) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    results = []
+    try:
+        for case in cases:
+            if not case_available(case):
+                print(f"skip {case}: {CASE_REQUIRES[case]} is not installed", file=sys.stderr)
+                continue
+            for operation in operations:
+                results.append(run_case(case, operation, workdir, env))
+    finally:
+        if server:
+            server.shutdown()
+        if api_server:
+            api_server.terminate()
+            api_server.wait()
+        if args.keep:
+            print(f"work directory: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, size_bytes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
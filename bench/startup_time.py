@@ -0,0 +1,133 @@
+"""วัดเวลาเปิดโปรแกรม GUI (DockDbBack) ตั้งแต่สั่งรันจนหน้าต่างพร้อมใช้งาน
+
+รันโปรแกรมหลายรอบโดยตั้ง DOCKDBBACK_STARTUP_PROBE ให้โปรแกรมบันทึกเวลาของแต่ละช่วงแล้วปิดตัวเองทันที
+ใช้ได้ทั้งกับ DockDbBack.py และ build จาก PyInstaller (onedir หรือ onefile) เพื่อเทียบกัน
+
+ช่วงที่รายงาน (ms นับจากตอนสั่งรัน):
+    started      เริ่มรันโค้ดของ DockDbBack.py (interpreter และการแตกไฟล์ของ onefile)
+    imported     import PyQt6 และ UI เสร็จ
+    app          สร้าง QApplication แล้ว
+    window       สร้าง MainWindow แล้ว
+    first_paint  หน้าต่างวาดครั้งแรกเสร็จ
+    ready        import engine, โหลดและตรวจ config เสร็จ ปุ่มสั่งงานกดได้
+
+ตัวอย่าง:
+    python bench/startup_time.py --runs 5
+    python bench/startup_time.py --exe dist/DockDbBack/DockDbBack.exe --runs 10
+    python bench/startup_time.py --offscreen --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+PHASES = ("started", "imported", "app", "window", "first_paint", "ready")
+
+# เวลารอสูงสุดต่อรอบ (วินาที)
+RUN_TIMEOUT = 120
+
+
+def launch_command(exe: str | None) -> list[str]:
+    if exe:
+        return [os.path.abspath(exe)]
+    return [sys.executable, os.path.join(REPO_DIR, "DockDbBack.py")]
+
+
+def measure_once(cmd: list[str], env: dict) -> dict:
+    """รันหนึ่งรอบ คืน {phase: ms นับจากตอนสั่งรัน} รวม "exit" (process จบ)"""
+    fd, probe_path = tempfile.mkstemp(prefix="dockdbback-startup-", suffix=".json")
+    os.close(fd)
+    os.remove(probe_path)
+    try:
+        launched = time.time()
+        result = subprocess.run(
+            cmd, env={**env, "DOCKDBBACK_STARTUP_PROBE": probe_path}, capture_output=True, text=True,
+            timeout=RUN_TIMEOUT,
+        )
+        exited = time.time()
+        if not os.path.exists(probe_path):
+            raise RuntimeError(
+                f"{' '.join(cmd)} exited with code {result.returncode} without writing the startup probe:\n"
+                f"{(result.stderr or result.stdout).strip()}"
+            )
+        with open(probe_path, encoding="utf-8") as f:
+            probe = json.load(f)
+    finally:
+        if os.path.exists(probe_path):
+            os.remove(probe_path)
+    timings = {phase: (probe["marks"][phase] - launched) * 1000 for phase in PHASES if phase in probe["marks"]}
+    timings["exit"] = (exited - launched) * 1000
+    return timings
+
+
+def print_summary(runs: list[dict]):
+    print(f"{'phase':<12} {'min ms':>8} {'median':>8} {'max':>8}")
+    for phase in (*PHASES, "exit"):
+        values = [run[phase] for run in runs if phase in run]
+        if values:
+            print(f"{phase:<12} {min(values):>8.0f} {statistics.median(values):>8.0f} {max(values):>8.0f}")
+
+
+def print_importtime(env: dict, limit: int = 15):
+    """module ที่ import นานที่สุด (cumulative) จาก python -X importtime ระหว่างเปิดโปรแกรมหนึ่งรอบ"""
+    fd, probe_path = tempfile.mkstemp(prefix="dockdbback-startup-", suffix=".json")
+    os.close(fd)
+    try:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.join(REPO_DIR, "DockDbBack.py")],
+            env={**env, "DOCKDBBACK_STARTUP_PROBE": probe_path}, capture_output=True, text=True, timeout=RUN_TIMEOUT,
+        )
+    finally:
+        os.remove(probe_path)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.strip()))
+    print(f"\n{'cumulative ms':>13}  module")
+    for cumulative, name in sorted(rows, reverse=True)[:limit]:
+        print(f"{cumulative / 1000:>13.1f}  {name}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure DockDbBack GUI startup time")
+    parser.add_argument("--exe", help="frozen build to measure (default: python DockDbBack.py)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--offscreen", action="store_true", help="use QT_QPA_PLATFORM=offscreen (no display)")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports (script only)")
+    parser.add_argument("--json", action="store_true", help="print every run as JSON")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    cmd = launch_command(args.exe)
+
+    runs = []
+    for i in range(max(args.runs, 1)):
+        runs.append(measure_once(cmd, env))
+        print(f"run {i + 1}: ready in {runs[-1].get('ready', runs[-1]['exit']):.0f} ms", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(runs, indent=2))
+    else:
+        print_summary(runs)
+    if args.importtime and not args.exe:
+        print_importtime(env)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
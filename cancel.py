@@ -0,0 +1,134 @@
+"""ยกเลิกและหยุดชั่วคราวงานที่กำลังรัน (ปุ่ม Cancel/Pause ใน GUI, Ctrl+C ใน CLI)
+
+CancelToken ผูกกับ thread ที่ทำงาน (แบบเดียวกับ run ใน history) engine เรียก check_cancelled() และ
+wait_if_paused() ระหว่างขั้นตอน และลงทะเบียน callback ด้วย on_cancel() เพื่อ kill process ที่รันอยู่ทันที
+thread ที่แตกออกไป (ThreadPoolExecutor) ต้องห่อฟังก์ชันด้วย bind_token() เพื่อใช้ token เดียวกัน
+"""
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class OperationCancelled(RuntimeError):
+    def __init__(self, message: str = "Operation cancelled"):
+        super().__init__(message)
+
+
+class CancelToken:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._running = threading.Event()
+        self._running.set()
+        self._callbacks: dict[int, object] = {}
+        self._next_key = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def cancel(self):
+        """ยกเลิก: เรียก callback ที่ลงทะเบียนไว้ (kill process) และปลด thread ที่ pause อยู่"""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks = list(self._callbacks.values())
+        self._running.set()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def check(self):
+        if self._cancelled:
+            raise OperationCancelled()
+
+    def wait_if_paused(self):
+        self._running.wait()
+        self.check()
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """เรียก callback เมื่อถูกยกเลิกระหว่างอยู่ใน block นี้ (หรือทันทีถ้ายกเลิกไปแล้ว)"""
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._callbacks[key] = callback
+            already = self._cancelled
+        try:
+            if already:
+                callback()
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.pop(key, None)
+
+
+def current_token() -> CancelToken | None:
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def use_token(token: CancelToken | None):
+    """ผูก token กับ thread นี้ระหว่างอยู่ใน block"""
+    previous = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def shielded():
+    """block ที่ต้องทำจนจบแม้ถูกยกเลิกแล้ว เช่นลบไฟล์ชั่วคราวใน container"""
+    return use_token(None)
+
+
+def bind_token(fn):
+    """ห่อ fn ให้รันด้วย token ของ thread ที่เรียก bind_token (ใช้ก่อนส่งงานเข้า thread pool)"""
+    token = current_token()
+
+    def bound(*args, **kwargs):
+        with use_token(token):
+            return fn(*args, **kwargs)
+    return bound
+
+
+def check_cancelled():
+    token = current_token()
+    if token is not None:
+        token.check()
+
+
+def is_cancelled() -> bool:
+    token = current_token()
+    return token is not None and token.cancelled
+
+
+def wait_if_paused():
+    token = current_token()
+    if token is not None:
+        token.wait_if_paused()
+
+
+@contextmanager
+def on_cancel(callback):
+    token = current_token()
+    if token is None:
+        yield
+        return
+    with token.on_cancel(callback):
+        yield
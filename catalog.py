@@ -0,0 +1,326 @@
+"""catalog ของไฟล์ backup (SQLite): ค้นหา/เลือก dump สำหรับ restore ได้ทันทีโดยไม่ต้องเปิดไฟล์ทีละไฟล์
+
+backup ที่ทำผ่าน engine จะถูกบันทึกพร้อม metadata ครบ (job, ต้นทาง, เวลา, server version, รายชื่อตาราง)
+ส่วนไฟล์ที่มีอยู่แล้วหรือ copy มาวางเองจะถูกเพิ่มตอน scan (ดูจากชื่อไฟล์และ header) โดย scan จะเปิดอ่าน
+เฉพาะไฟล์ใหม่หรือไฟล์ที่ขนาด/mtime เปลี่ยน
+"""
+import datetime
+import json
+import os
+import re
+import sqlite3
+
+from checksums import SUMS_SUFFIX, load_sums, sums_path
+from chunkstore import RepositoryReader, is_manifest, load_manifest
+from compression import CODEC_EXTENSIONS, detect_codec, open_reader
+
+CATALOG_FILE = "catalog.db"
+
+# นามสกุลของไฟล์ที่นับเป็น backup (หลังตัดนามสกุลของ codec ออกแล้ว)
+BACKUP_EXTENSIONS = (".dump", ".backup", ".tar", ".sql", ".manifest")
+
+# ชื่อจาก default_dump_name: <job>_<YYYYmmddHHMMSS>.<ext>
+_NAME_PATTERN = re.compile(r"^(.+)_(\d{14})(?:\.|$)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    path TEXT PRIMARY KEY,
+    job TEXT,
+    db_type TEXT,
+    container TEXT,
+    db_name TEXT,
+    kind TEXT,
+    codec TEXT,
+    storage TEXT,
+    size INTEGER,
+    mtime REAL,
+    created_at TEXT,
+    duration REAL,
+    sha256 TEXT,
+    server_version TEXT,
+    table_count INTEGER,
+    tables TEXT,
+    origin TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_backups_created ON backups(created_at);
+CREATE INDEX IF NOT EXISTS idx_backups_job ON backups(job, created_at);
+"""
+
+_COLUMNS = (
+    "path", "job", "db_type", "container", "db_name", "kind", "codec", "storage", "size", "mtime",
+    "created_at", "duration", "sha256", "server_version", "table_count", "tables", "origin",
+)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _strip_codec(name: str) -> str:
+    for ext in CODEC_EXTENSIONS.values():
+        if ext and name.endswith(ext):
+            return name[: -len(ext)]
+    return name
+
+
+def parse_backup_name(name: str) -> tuple[str, datetime.datetime] | None:
+    """(prefix, เวลา) จากชื่อแบบ default_dump_name; prefix คือชื่อ job, db_type หรือ "back" (ชื่อแบบเก่า)"""
+    m = _NAME_PATTERN.match(name)
+    if not m:
+        return None
+    try:
+        return m.group(1), datetime.datetime.strptime(m.group(2), "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+
+
+def is_backup_name(name: str) -> bool:
+    if name.endswith((".part", SUMS_SUFFIX)):
+        return False
+    return _strip_codec(name.lower()).endswith(BACKUP_EXTENSIONS)
+
+
+def path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path)
+
+
+def _dir_db_type(path: str) -> str | None:
+    names = os.listdir(path)
+    if "toc.dat" in names:
+        return "postgres"
+    if any(".sql" in name and not name.endswith((".part", SUMS_SUFFIX)) for name in names):
+        return "mysql"
+    return None
+
+
+def _read_prefix(reader, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = reader.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _read_header(path: str, size: int = 512) -> tuple[bytes, str, dict | None]:
+    """(header ของ stream หลังคลายการบีบอัด, codec ของไฟล์, manifest ถ้าเป็น repository)"""
+    with open(path, "rb") as f:
+        raw = f.read(64)
+        f.seek(0)
+        if is_manifest(raw):
+            manifest = load_manifest(f)
+            reader = RepositoryReader(manifest)
+            try:
+                return _read_prefix(reader, size), manifest["codec"], manifest
+            finally:
+                reader.close()
+        reader = open_reader(f)
+        try:
+            return _read_prefix(reader, size), detect_codec(raw), None
+        finally:
+            reader.close()
+
+
+def _header_db_type(header: bytes) -> str | None:
+    if header.startswith(b"PGDMP"):
+        return "postgres"
+    if header[257:262] == b"ustar":
+        # tar ของ pg_dump -Fd (parallel)
+        return "postgres"
+    if b"MySQL dump" in header or b"MariaDB dump" in header:
+        return "mysql"
+    return None
+
+
+def inspect_backup(path: str) -> dict:
+    """metadata ที่ได้จากตัวไฟล์เอง (ไม่ต้องใช้ docker): ขนาด, mtime, ชนิด, codec, sha256 จาก .sums, job จากชื่อ"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    name = os.path.basename(path.rstrip("/\\"))
+    entry = {
+        "path": path,
+        "size": path_size(path),
+        "mtime": stat.st_mtime,
+        "created_at": datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+        "storage": "file",
+        "codec": "none",
+        "origin": "scan",
+    }
+    parsed = parse_backup_name(name)
+    if parsed:
+        if parsed[0] != "back":
+            entry["job"] = parsed[0]
+        entry["created_at"] = parsed[1].isoformat()
+
+    if os.path.isdir(path):
+        entry["kind"] = "dir"
+        entry["db_type"] = _dir_db_type(path)
+        return entry
+
+    try:
+        header, codec, manifest = _read_header(path)
+    except (OSError, RuntimeError, ValueError, KeyError):
+        header, codec, manifest = b"", "none", None
+    entry["codec"] = codec
+    if manifest:
+        entry["storage"] = "repository"
+    entry["kind"] = "tar" if header[257:262] == b"ustar" else "file"
+    entry["db_type"] = _header_db_type(header)
+    sums = load_sums(sums_path(path))
+    if sums and sums["sha256"] and sums["size"] == entry["size"]:
+        entry["sha256"] = sums["sha256"]
+    return entry
+
+
+def _row_to_dict(row: sqlite3.Row) -> dict:
+    entry = dict(row)
+    entry["tables"] = json.loads(entry["tables"]) if entry["tables"] else None
+    return entry
+
+
+def get_backup(db_path: str, path: str) -> dict | None:
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM backups WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return _row_to_dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def _save(conn: sqlite3.Connection, entry: dict):
+    values = dict(entry)
+    if isinstance(values.get("tables"), list):
+        values["table_count"] = len(values["tables"])
+        values["tables"] = json.dumps(values["tables"])
+    conn.execute(
+        f"INSERT OR REPLACE INTO backups ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})",
+        [values.get(column) for column in _COLUMNS],
+    )
+
+
+def record_backup(db_path: str, entry: dict):
+    """บันทึก backup ที่เพิ่งทำเสร็จ: entry คือ metadata จาก engine ทับบน inspect_backup()"""
+    merged = inspect_backup(entry["path"])
+    merged.update({key: value for key, value in entry.items() if value is not None})
+    merged["origin"] = "backup"
+    conn = connect(db_path)
+    try:
+        with conn:
+            _save(conn, merged)
+    finally:
+        conn.close()
+
+
+def backup_paths(roots) -> list[str]:
+    """ไฟล์/directory backup ที่อยู่ชั้นบนสุดของแต่ละ root (ไม่เข้าไปใน sub-directory เช่น repository)"""
+    paths = []
+    for root in dict.fromkeys(os.path.abspath(r) for r in roots if r):
+        if not os.path.isdir(root):
+            continue
+        for name in sorted(os.listdir(root)):
+            path = os.path.abspath(os.path.join(root, name))
+            if os.path.isdir(path):
+                if _dir_db_type(path):
+                    paths.append(path)
+            elif is_backup_name(name):
+                paths.append(path)
+    return paths
+
+
+def scan(db_path: str, roots) -> dict:
+    """อัปเดต catalog ให้ตรงกับไฟล์บนดิสก์แบบ incremental
+
+    ไฟล์ที่ขนาดและ mtime ไม่เปลี่ยนจะไม่ถูกเปิดอ่าน; ไฟล์ที่หายไปจะถูกลบออกจาก catalog
+    คืนจำนวน {"added", "updated", "removed", "unchanged"}
+    """
+    counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    conn = connect(db_path)
+    try:
+        known = {row["path"]: row for row in conn.execute("SELECT path, size, mtime FROM backups")}
+        with conn:
+            for path in backup_paths(roots):
+                row = known.get(path)
+                stat = os.stat(path)
+                if row and row["mtime"] == stat.st_mtime and (os.path.isdir(path) or row["size"] == stat.st_size):
+                    counts["unchanged"] += 1
+                    continue
+                entry = inspect_backup(path)
+                if row:
+                    # เก็บ metadata จากตอน backup (เช่น server version, รายชื่อตาราง) ไว้ถ้า scan หาเองไม่ได้
+                    old = _row_to_dict(conn.execute("SELECT * FROM backups WHERE path = ?", (path,)).fetchone())
+                    entry = {**old, **{key: value for key, value in entry.items() if value is not None}}
+                    entry["origin"] = old["origin"]
+                    counts["updated"] += 1
+                else:
+                    counts["added"] += 1
+                _save(conn, entry)
+            for path in known:
+                if not os.path.exists(path):
+                    conn.execute("DELETE FROM backups WHERE path = ?", (path,))
+                    counts["removed"] += 1
+    finally:
+        conn.close()
+    return counts
+
+
+def remove_backups(db_path: str, paths):
+    """ลบ row ของ backup ที่ถูกลบจากดิสก์แล้ว (เช่นโดย retention)"""
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany("DELETE FROM backups WHERE path = ?", [(os.path.abspath(p),) for p in paths])
+    finally:
+        conn.close()
+
+
+def known_paths(db_path: str) -> list[str]:
+    if not os.path.exists(db_path):
+        return []
+    conn = connect(db_path)
+    try:
+        return [row["path"] for row in conn.execute("SELECT path FROM backups")]
+    finally:
+        conn.close()
+
+
+def list_backups(db_path: str, job: str | None = None, db_type: str | None = None, search: str | None = None,
+                 limit: int = 200) -> list[dict]:
+    """backup ใหม่สุดก่อน; search เทียบกับ path, job, container, db_name และชื่อตาราง"""
+    where, params = [], []
+    if job:
+        where.append("job = ?")
+        params.append(job)
+    if db_type:
+        where.append("db_type = ?")
+        params.append(db_type.lower())
+    if search:
+        where.append("(path LIKE ? OR job LIKE ? OR container LIKE ? OR db_name LIKE ? OR tables LIKE ?)")
+        params += [f"%{search}%"] * 5
+    sql = (
+        "SELECT * FROM backups" + (" WHERE " + " AND ".join(where) if where else "")
+        + " ORDER BY created_at DESC, path LIMIT ?"
+    )
+    conn = connect(db_path)
+    try:
+        return [_row_to_dict(row) for row in conn.execute(sql, (*params, limit))]
+    finally:
+        conn.close()
+
+
+def cached_tables(db_path: str, path: str) -> list[str] | None:
+    """รายชื่อตารางที่บันทึกไว้ตอน backup ถ้าไฟล์ยังเป็นไฟล์เดิม (ขนาดไม่เปลี่ยน)"""
+    if not os.path.exists(db_path) or not os.path.exists(path):
+        return None
+    try:
+        entry = get_backup(db_path, path)
+    except sqlite3.Error:
+        return None
+    if not entry or entry["tables"] is None or entry["size"] != path_size(path):
+        return None
+    return entry["tables"]
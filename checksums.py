@@ -0,0 +1,213 @@
+"""checksum ราย chunk ของไฟล์ dump (<dump>.sums) ใช้ทำ resume ตอนส่งไฟล์ขาดกลางทาง และตรวจไฟล์ระหว่าง restore
+
+รูปแบบไฟล์ (text):
+    dockdbback-sums 1 <chunk size> <source>
+    <offset> <size> <sha256>          หนึ่งบรรทัดต่อ chunk
+    total <size> <sha256 ของทั้งไฟล์>   บรรทัดสุดท้ายเมื่อเขียนครบ
+
+source เป็นตัวระบุต้นทาง (เช่น container:path size mtime) ใช้ตรวจว่า .part ที่ค้างไว้มาจากไฟล์เดียวกัน
+"""
+import hashlib
+import os
+
+SUMS_SUFFIX = ".sums"
+SUMS_MAGIC = "dockdbback-sums"
+SUMS_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def sums_path(dump_path: str) -> str:
+    return dump_path + SUMS_SUFFIX
+
+
+class SumsWriter:
+    """คำนวณ sha256 ราย chunk ของ byte ที่เขียนลงไฟล์ และ flush แต่ละบรรทัดทันทีเพื่อให้ resume ได้หลังโปรแกรมตาย"""
+
+    def __init__(self, path: str, source: str = "-", chunk_size: int = SUMS_CHUNK_SIZE, resume: dict | None = None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.total = hashlib.sha256()
+        self.current = hashlib.sha256()
+        self.current_size = 0
+        if resume:
+            # ต่อจาก chunk ที่ตรวจแล้ว (resume["chunks"] คือส่วนต้นของไฟล์ที่ยังดีอยู่)
+            self.chunks = list(resume["chunks"])
+            self.offset = sum(size for _, size, _ in self.chunks)
+            self.total = resume["total_hash"]
+            self.f = open(path, "w", encoding="utf-8")
+            self.f.write(f"{SUMS_MAGIC} 1 {chunk_size} {source}\n")
+            for offset, size, digest in self.chunks:
+                self.f.write(f"{offset} {size} {digest}\n")
+        else:
+            self.chunks = []
+            self.offset = 0
+            self.f = open(path, "w", encoding="utf-8")
+            self.f.write(f"{SUMS_MAGIC} 1 {chunk_size} {source}\n")
+        self.f.flush()
+
+    @property
+    def completed(self) -> int:
+        """จำนวน byte ที่อยู่ใน chunk ที่บันทึกครบแล้ว (ตำแหน่งที่ resume ได้)"""
+        return self.offset
+
+    def update(self, data):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.chunk_size - self.current_size)
+            self.current.update(view[:take])
+            self.total.update(view[:take])
+            self.current_size += take
+            view = view[take:]
+            if self.current_size == self.chunk_size:
+                self._end_chunk()
+
+    def _end_chunk(self):
+        digest = self.current.hexdigest()
+        self.chunks.append((self.offset, self.current_size, digest))
+        self.f.write(f"{self.offset} {self.current_size} {digest}\n")
+        self.f.flush()
+        self.offset += self.current_size
+        self.current = hashlib.sha256()
+        self.current_size = 0
+
+    def close(self) -> str:
+        """บันทึก chunk สุดท้ายและบรรทัด total แล้วคืน sha256 ของทั้งไฟล์"""
+        if self.current_size:
+            self._end_chunk()
+        digest = self.total.hexdigest()
+        self.f.write(f"total {self.offset} {digest}\n")
+        self.f.close()
+        return digest
+
+    def abort(self):
+        """ปิดไฟล์โดยไม่เขียน total (chunk ที่ครบแล้วยังใช้ resume ได้)"""
+        self.f.close()
+
+
+class HashingWriter:
+    """ห่อ fileobj ที่เขียนลงดิสก์ ให้ทุก byte ผ่าน SumsWriter ด้วย (ใช้ใต้ตัวบีบอัด/repository ได้)"""
+
+    def __init__(self, fileobj, sums: SumsWriter):
+        self.fileobj = fileobj
+        self.sums = sums
+
+    def write(self, data):
+        n = self.fileobj.write(data)
+        self.sums.update(data)
+        return n
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def tell(self) -> int:
+        return self.fileobj.tell()
+
+
+def load_sums(path: str) -> dict | None:
+    """อ่าน .sums คืน {"chunk_size", "source", "chunks": [(offset, size, sha256)], "size", "sha256"}
+
+    size/sha256 เป็น None ถ้าไฟล์ยังเขียนไม่ครบ (transfer ค้าง); คืน None ถ้าไม่มีไฟล์หรือรูปแบบไม่ถูก
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        header = f.readline().split(" ", 3)
+        if len(header) < 3 or header[0] != SUMS_MAGIC:
+            return None
+        sums = {
+            "chunk_size": int(header[2]),
+            "source": header[3].strip() if len(header) > 3 else "-",
+            "chunks": [],
+            "size": None,
+            "sha256": None,
+        }
+        expected = 0
+        for line in f:
+            parts = line.split()
+            if len(parts) != 3:
+                # บรรทัดสุดท้ายเขียนไม่ครบตอนโปรแกรมตาย
+                break
+            if parts[0] == "total":
+                sums["size"] = int(parts[1])
+                sums["sha256"] = parts[2]
+                break
+            offset, size = int(parts[0]), int(parts[1])
+            if offset != expected:
+                break
+            sums["chunks"].append((offset, size, parts[2]))
+            expected += size
+    return sums
+
+
+def verify_prefix(path: str, sums: dict) -> dict:
+    """ตรวจส่วนต้นของไฟล์ที่ยังตรงกับ sums คืน {"chunks", "total_hash"} ของ chunk ที่ดี (ใช้ resume)"""
+    good = []
+    total = hashlib.sha256()
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for offset, size, digest in sums["chunks"]:
+                data = f.read(size)
+                if len(data) != size or hashlib.sha256(data).hexdigest() != digest:
+                    break
+                total.update(data)
+                good.append((offset, size, digest))
+    return {"chunks": good, "total_hash": total}
+
+
+class VerifyingReader:
+    """อ่านไฟล์ dump พร้อมตรวจ sha256 ทีละ chunk ตาม sums; ถ้าไม่ตรงจะ raise RuntimeError ทันทีที่อ่านจบ chunk นั้น
+
+    รองรับ seek(0) (open_dump_reader อ่าน header แล้วย้อนกลับ) การ seek ไปตำแหน่งอื่นจะหยุดตรวจ
+    """
+
+    def __init__(self, fileobj, sums: dict):
+        self.fileobj = fileobj
+        self.sums = sums
+        self._reset()
+
+    def _reset(self):
+        self.position = 0
+        self.index = 0
+        self.current = hashlib.sha256()
+        self.current_size = 0
+        self.total = hashlib.sha256()
+        self.enabled = True
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        if self.enabled:
+            self._check(data)
+        return data
+
+    def _check(self, data):
+        chunks = self.sums["chunks"]
+        view = memoryview(data)
+        while view and self.index < len(chunks):
+            _, chunk_size, digest = chunks[self.index]
+            take = min(len(view), chunk_size - self.current_size)
+            self.current.update(view[:take])
+            self.total.update(view[:take])
+            self.current_size += take
+            self.position += take
+            view = view[take:]
+            if self.current_size == chunk_size:
+                if self.current.hexdigest() != digest:
+                    raise RuntimeError(f"Checksum mismatch in dump at offset {self.position - chunk_size}")
+                self.index += 1
+                self.current = hashlib.sha256()
+                self.current_size = 0
+        if view or (not data and self.sums["size"] is not None and self.position != self.sums["size"]):
+            raise RuntimeError("Dump size does not match its checksum file")
+
+    def seek(self, offset, whence=0):
+        pos = self.fileobj.seek(offset, whence)
+        if pos == 0:
+            self._reset()
+        else:
+            self.enabled = False
+        return pos
+
+    def tell(self) -> int:
+        return self.fileobj.tell()
+
+    def close(self):
+        self.fileobj.close()
@@ -0,0 +1,231 @@
+"""Repository แบบ dedup: แบ่ง stream ของ dump เป็น chunk ตามเนื้อหา แล้วเก็บ chunk ที่ไม่ซ้ำเพียงครั้งเดียว
+
+โครงสร้าง repository:
+    <repository>/chunks/<2 ตัวแรกของ hash>/<sha256>   ข้อมูล chunk (บีบอัดแล้ว)
+
+ไฟล์ backup แต่ละไฟล์เป็น manifest (JSON) ที่บอกลำดับ chunk สำหรับประกอบ stream กลับ
+"""
+import hashlib
+import json
+import os
+import random
+import time
+
+from compression import compress_bytes, decompress_bytes
+
+MANIFEST_FORMAT = "dockdbback-manifest"
+MANIFEST_MAGIC = b'{"format": "' + MANIFEST_FORMAT.encode() + b'"'
+
+# ขนาด chunk: ตัดที่ boundary ตามเนื้อหาหลัง MIN_CHUNK และบังคับตัดที่ MAX_CHUNK
+MIN_CHUNK = 512 * 1024
+MAX_CHUNK = 8 * 1024 * 1024
+
+# gc_repository() ไม่ลบ chunk ที่เขียน/ใช้ซ้ำภายในช่วงนี้ (backup ที่กำลังรันอยู่ยังไม่มี manifest)
+GC_GRACE_SECONDS = 24 * 3600
+
+# boundary คือตำแหน่งที่ BOUNDARY_BITS byte ติดกันถูก map เป็น "1" (เริ่ม run ได้ราว 2^-20 ต่อ byte ~ 1 MiB)
+BOUNDARY_BITS = 19
+_BOUNDARY = b"1" * BOUNDARY_BITS
+# ตาราง map byte -> "0"/"1" แบบสุ่มแต่คงที่ (seed ตายตัว) เพื่อให้ boundary เหมือนกันทุกครั้ง
+_rnd = random.Random(0x0DDB)
+_BIT_TABLE = bytes(_rnd.choice(b"01") for _ in range(256))
+del _rnd
+
+
+def is_manifest(header: bytes) -> bool:
+    return header.startswith(MANIFEST_MAGIC)
+
+
+def is_manifest_file(path: str) -> bool:
+    if os.path.isdir(path):
+        return False
+    with open(path, "rb") as f:
+        return is_manifest(f.read(len(MANIFEST_MAGIC)))
+
+
+def chunk_path(repository: str, digest: str) -> str:
+    return os.path.join(repository, "chunks", digest[:2], digest)
+
+
+class RepositoryWriter:
+    """รับข้อมูลแบบ stream ผ่าน write(), เก็บ chunk ลง repository และเขียน manifest ลง fileobj เมื่อ close()"""
+
+    def __init__(self, repository: str, fileobj, codec: str = "gzip", level=None):
+        self.repository = os.path.abspath(repository)
+        self.fileobj = fileobj
+        # chunk ต้องบีบอัดเสมอ เพื่อให้ตรวจ codec จาก header ได้ตอนอ่านกลับ
+        self.codec = codec if codec != "none" else "gzip"
+        self.level = level
+        self.buf = bytearray()
+        self.scanned = 0
+        self.chunks: list[list] = []
+        self.size = 0
+        self.new_bytes = 0
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.buf += data
+        self.size += len(data)
+        self.digest.update(data)
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            self._store(bytes(self.buf[:cut]))
+            del self.buf[:cut]
+            self.scanned = 0
+        return len(data)
+
+    def _find_cut(self):
+        if len(self.buf) < MIN_CHUNK:
+            return None
+        # สแกนต่อจากตำแหน่งเดิม (ถอยหลัง BOUNDARY_BITS เผื่อ boundary คร่อมรอบก่อน)
+        start = max(MIN_CHUNK, self.scanned) - BOUNDARY_BITS
+        end = min(len(self.buf), MAX_CHUNK)
+        bits = self.buf[start:end].translate(_BIT_TABLE)
+        pos = bits.find(_BOUNDARY)
+        if pos >= 0:
+            return start + pos + BOUNDARY_BITS
+        if len(self.buf) >= MAX_CHUNK:
+            return MAX_CHUNK
+        self.scanned = end
+        return None
+
+    def _store(self, chunk: bytes):
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = chunk_path(self.repository, digest)
+        if os.path.exists(path):
+            # chunk ที่ใช้ซ้ำต้องมี mtime ใหม่ ไม่ให้ gc_repository() ลบระหว่างที่ manifest ยังเขียนไม่เสร็จ
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # เขียนไฟล์ชั่วคราวแล้ว rename เพื่อให้หลาย job เขียน chunk เดียวกันพร้อมกันได้
+            tmp_path = f"{path}.{os.getpid()}.{id(self)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compress_bytes(chunk, self.codec, self.level))
+            os.replace(tmp_path, path)
+            self.new_bytes += len(chunk)
+        self.chunks.append([digest, len(chunk)])
+
+    def close(self):
+        if self.buf:
+            self._store(bytes(self.buf))
+            self.buf = bytearray()
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": 1,
+            "repository": self.repository,
+            "codec": self.codec,
+            "size": self.size,
+            "sha256": self.digest.hexdigest(),
+            "chunks": self.chunks,
+        }
+        self.fileobj.write(json.dumps(manifest).encode("utf-8"))
+
+
+def load_manifest(fileobj) -> dict:
+    manifest = json.loads(fileobj.read().decode("utf-8"))
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise RuntimeError("Not a repository manifest")
+    return manifest
+
+
+class RepositoryReader:
+    """ประกอบ stream กลับจาก manifest; ตรวจ sha256 ของทุก chunk ระหว่างอ่าน"""
+
+    def __init__(self, manifest: dict, repository: str | None = None):
+        self.manifest = manifest
+        self.repository = repository or manifest["repository"]
+        self.index = 0
+        self.current = b""
+        self.offset = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.manifest["size"]
+        out = []
+        remaining = size
+        while remaining > 0:
+            if self.offset >= len(self.current):
+                if self.index >= len(self.manifest["chunks"]):
+                    break
+                self.current = self._load(*self.manifest["chunks"][self.index])
+                self.index += 1
+                self.offset = 0
+            piece = self.current[self.offset:self.offset + remaining]
+            self.offset += len(piece)
+            remaining -= len(piece)
+            out.append(piece)
+        return b"".join(out)
+
+    def _load(self, digest: str, size: int) -> bytes:
+        path = chunk_path(self.repository, digest)
+        if not os.path.exists(path):
+            raise RuntimeError(f"Missing chunk in repository: {digest}")
+        with open(path, "rb") as f:
+            data = decompress_bytes(f.read())
+        if len(data) != size or hashlib.sha256(data).hexdigest() != digest:
+            raise RuntimeError(f"Corrupt chunk in repository: {digest}")
+        return data
+
+    def close(self):
+        pass
+
+
+def manifest_digests(path: str, repository: str) -> set[str] | None:
+    """digest ของ chunk ที่ manifest ไฟล์นี้ (หรือ manifest ใน directory ของ MySQL) อ้างถึงใน repository
+
+    คืน None ถ้าไม่มี manifest ของ repository นี้อยู่เลย
+    """
+    repository = os.path.abspath(repository)
+    if os.path.isdir(path):
+        files = [os.path.join(d, f) for d, _, names in os.walk(path) for f in names]
+    else:
+        files = [path]
+    digests = None
+    for name in files:
+        try:
+            if not is_manifest_file(name):
+                continue
+            with open(name, "rb") as f:
+                manifest = load_manifest(f)
+        except (OSError, ValueError, RuntimeError):
+            continue
+        if os.path.abspath(manifest["repository"]) != repository:
+            continue
+        digests = digests or set()
+        digests.update(digest for digest, _ in manifest["chunks"])
+    return digests
+
+
+def gc_repository(repository: str, referenced: set[str], grace: float = GC_GRACE_SECONDS) -> tuple[int, int]:
+    """ลบ chunk ที่ไม่มี manifest อ้างถึง (referenced ต้องครอบคลุมทุก manifest ของ repository)
+
+    คืน (จำนวน chunk ที่ลบ, byte ที่ได้คืน); chunk ที่ mtime อยู่ในช่วง grace จะถูกเก็บไว้เสมอ
+    """
+    chunks_dir = os.path.join(repository, "chunks")
+    cutoff = time.time() - grace
+    removed = freed = 0
+    if not os.path.isdir(chunks_dir):
+        return removed, freed
+    for prefix in os.listdir(chunks_dir):
+        prefix_dir = os.path.join(chunks_dir, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for name in os.listdir(prefix_dir):
+            if name in referenced or name.endswith(".tmp"):
+                continue
+            path = os.path.join(prefix_dir, name)
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            freed += stat.st_size
+    return removed, freed
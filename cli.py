@@ -0,0 +1,379 @@
+"""Command line สำหรับ backup/restore แบบไม่ใช้ GUI (ไม่ import PyQt6)
+
+ตัวอย่าง:
+    python cli.py backup --job erp --parallel 4
+    python cli.py backup --db-type postgres -o /backups/erp.dump
+    python cli.py backup --job erp --include 'public.invoice*' --exclude audit_log
+    python cli.py restore --job erp /backups/erp.dump --yes
+    python cli.py restore --job erp s3://backups/erp/erp_20260101020000.dump.zst --yes
+    python cli.py tables --job erp /backups/erp.dump
+    python cli.py restore --job erp /backups/erp.dump --table public.invoice --table public.invoice_line
+    python cli.py clone --job erp --copy /backups/erp.dump.zst --yes
+    python cli.py clone --job erp --verify sample --yes
+    python cli.py history --job erp --verify
+    python cli.py jobs --max-workers 8
+    python cli.py catalog --job erp --search invoice
+    python cli.py prune --job erp --dry-run
+
+หลัง pip install -e . เรียกเป็นคำสั่ง dockdbback ได้ (เช่น dockdbback backup --job erp) โดยใช้ config.json ในโฟลเดอร์นี้
+
+Ctrl+C ครั้งแรกจะยกเลิกงานอย่างเรียบร้อย (หยุด process ใน container และลบไฟล์ชั่วคราว) ครั้งที่สองจะหยุดทันที
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+
+from catalog import list_backups, scan
+from cancel import CancelToken, OperationCancelled, use_token
+from compression import CODECS
+from engine import (
+    BASE_DIR, TRANSFER_MODES, default_dump_name, do_backup, do_clone, do_restore, get_catalog_path, get_history_path,
+    list_dump_tables, load_config, use_docker_api,
+)
+from history import list_runs
+from objstore import is_remote_path
+from progress import format_progress
+from retention import get_retention, prune
+from scheduler import backup_roots, get_jobs, get_scheduler_options, job_config, run_jobs
+from verify import VERIFY_MODES
+
+
+def resolve_section(config: dict, job: str | None, db_type: str | None) -> tuple[str, dict]:
+    """เลือก (db_type, section) จาก --job หรือ --db-type แล้วคืน copy ที่แก้ค่าได้"""
+    if job:
+        jobs = get_jobs(config)
+        if job not in jobs:
+            raise RuntimeError(f"Job not found: {job}")
+        db_type, job_cfg = job_config(jobs[job], job)
+        return db_type, dict(job_cfg[db_type])
+    db_type = (db_type or "postgres").lower()
+    section = config.get(db_type)
+    if not section:
+        raise RuntimeError(f"Config not found for db_type={db_type}")
+    return db_type, dict(section)
+
+
+def apply_overrides(section: dict, args) -> dict:
+    if args.parallel:
+        section["parallel"] = args.parallel
+    if args.transfer:
+        section["transfer"] = args.transfer
+    if getattr(args, "compression", None):
+        compression = dict(section.get("compression") or {})
+        compression["codec"] = args.compression
+        if args.level is not None:
+            compression["level"] = args.level
+        if args.threads is not None:
+            compression["threads"] = args.threads
+        section["compression"] = compression
+    if getattr(args, "repository", None):
+        section["storage"] = "repository"
+        section["repository"] = args.repository
+    if getattr(args, "single_transaction", False):
+        section["single_transaction"] = True
+    if getattr(args, "shadow", False):
+        section["shadow_restore"] = True
+    if getattr(args, "verify", None):
+        section["verify"] = {**(section.get("verify") or {}), "mode": args.verify}
+    if getattr(args, "include", None) or getattr(args, "exclude", None):
+        tables = dict(section.get("tables") or {})
+        if args.include:
+            tables["include"] = args.include
+        if args.exclude:
+            tables["exclude"] = args.exclude
+        section["tables"] = tables
+    return section
+
+
+def make_progress_callback(mode: str):
+    """text = บรรทัดเดียวที่เขียนทับบน stderr, json = JSON หนึ่งบรรทัดต่อ event บน stderr"""
+    if mode == "auto":
+        mode = "text" if sys.stderr.isatty() else "none"
+    if mode == "none":
+        return None
+    if mode == "json":
+        def emit_json(event):
+            print(json.dumps(event), file=sys.stderr, flush=True)
+        return emit_json
+
+    def emit_text(event):
+        prefix = f"[{event['job']}] " if event.get("job") else ""
+        end = "\n" if event["done"] else ""
+        print(f"\r{prefix}{format_progress(event)}\033[K", end=end, file=sys.stderr, flush=True)
+    return emit_text
+
+
+def cmd_backup(config: dict, args) -> int:
+    db_type, section = resolve_section(config, args.job, args.db_type)
+    section = apply_overrides(section, args)
+    dump_path = args.output or os.path.join(BASE_DIR, default_dump_name(db_type, section, prefix=args.job))
+    do_backup(
+        db_type, {db_type: section}, dump_path,
+        log_callback=None, progress_callback=make_progress_callback(args.progress),
+    )
+    return 0
+
+
+def cmd_restore(config: dict, args) -> int:
+    db_type, section = resolve_section(config, args.job, args.db_type)
+    section = apply_overrides(section, args)
+    if not is_remote_path(args.dump_path) and not os.path.exists(args.dump_path):
+        raise RuntimeError(f"Dump file does not exist: {args.dump_path}")
+    if not args.yes:
+        db_name = section["target"]["db_name"]
+        what = f"tables {', '.join(args.table)} in database" if args.table else "database"
+        answer = input(f"This will overwrite {what} '{db_name}' ({db_type}). Continue? [y/N] ")
+        if answer.strip().lower() not in ("y", "yes"):
+            print("Cancelled")
+            return 1
+    do_restore(
+        db_type, {db_type: section}, args.dump_path,
+        log_callback=None, progress_callback=make_progress_callback(args.progress),
+        tables=args.table or None,
+    )
+    return 0
+
+
+def cmd_tables(config: dict, args) -> int:
+    db_type, section = resolve_section(config, args.job, args.db_type)
+    if not os.path.exists(args.dump_path):
+        raise RuntimeError(f"Dump file does not exist: {args.dump_path}")
+    for name in list_dump_tables(db_type, {db_type: section}, args.dump_path, log_callback=None):
+        print(name)
+    return 0
+
+
+def cmd_clone(config: dict, args) -> int:
+    db_type, section = resolve_section(config, args.job, args.db_type)
+    section = apply_overrides(section, args)
+    if not args.yes:
+        src, tgt = section["source"], section["target"]
+        answer = input(
+            f"This will overwrite database '{tgt['db_name']}' in {tgt['container']} "
+            f"with '{src['db_name']}' from {src['container']} ({db_type}). Continue? [y/N] "
+        )
+        if answer.strip().lower() not in ("y", "yes"):
+            print("Cancelled")
+            return 1
+    do_clone(
+        db_type, {db_type: section}, args.copy,
+        log_callback=None, progress_callback=make_progress_callback(args.progress),
+    )
+    return 0
+
+
+def cmd_jobs(config: dict, args) -> int:
+    run_jobs(
+        config,
+        job_names=args.names or None,
+        max_workers=args.max_workers,
+        per_container=args.per_container,
+        per_host=args.per_host,
+        backup_dir=args.backup_dir,
+        progress_callback=make_progress_callback(args.progress),
+    )
+    return 0
+
+
+def cmd_list_jobs(config: dict, args) -> int:
+    for name, job in sorted(get_jobs(config).items()):
+        src = job.get("source", {})
+        print(f"{name}\t{job['db_type']}\t{src.get('container', '')}/{src.get('db_name', '')}")
+    return 0
+
+
+def cmd_history(config: dict, args) -> int:
+    runs = list_runs(get_history_path(), job=args.job, operation=args.operation, limit=args.limit)
+    if args.json:
+        print(json.dumps(runs, indent=2))
+        return 0
+    for run in runs:
+        status = "ok" if run["success"] else "FAILED"
+        size = f"{run['bytes'] / (1024 * 1024):,.1f} MB" if run["bytes"] else "-"
+        line = f"{run['started_at']}  {run['operation']:<7} {run['job']:<16} {status:<6} {run['duration']:>8.1f}s  {size}"
+        if run["slowdown"]:
+            line += f"  SLOW x{run['slowdown']:.1f} (median {run['baseline']:.1f}s)"
+        print(line)
+        if args.phases:
+            for phase in run["phases"]:
+                print(f"    {phase['name']:<24} {phase['duration']:>8.1f}s")
+        if run["verifications"]:
+            bad = sum(1 for v in run["verifications"] if v["status"] != "ok")
+            print(f"    verified {len(run['verifications'])} tables, {bad} not matching")
+            for v in run["verifications"] if args.verify else ():
+                print(f"      {v['detail']}")
+    return 0
+
+
+def cmd_catalog(config: dict, args) -> int:
+    # scan เปิดอ่านเฉพาะไฟล์ใหม่/ที่เปลี่ยน จึงทำทุกครั้งก่อนแสดง ให้ไฟล์ที่เพิ่งวางหรือลบไปตรงกับ catalog
+    if not args.no_scan:
+        counts = scan(get_catalog_path(), backup_roots(config) + (args.dir or []))
+        if counts["added"] or counts["updated"] or counts["removed"]:
+            print(
+                f"Scanned: {counts['added']} added, {counts['updated']} updated, "
+                f"{counts['removed']} removed, {counts['unchanged']} unchanged",
+                file=sys.stderr,
+            )
+    backups = list_backups(get_catalog_path(), job=args.job, db_type=args.db_type, search=args.search, limit=args.limit)
+    if args.json:
+        print(json.dumps(backups, indent=2))
+        return 0
+    for entry in backups:
+        size = f"{entry['size'] / (1024 * 1024):,.1f} MB" if entry["size"] is not None else "-"
+        tables = entry["table_count"] if entry["table_count"] is not None else "-"
+        print(
+            f"{entry['created_at']}  {entry['job'] or '-':<16} {entry['db_type'] or '?':<8} "
+            f"{size:>12}  {tables:>5} tables  {entry['path']}"
+        )
+        if args.tables and entry["tables"]:
+            for name in entry["tables"]:
+                print(f"    {name}")
+    return 0
+
+
+def cmd_prune(config: dict, args) -> int:
+    db_type, section = resolve_section(config, args.job, args.db_type)
+    policy = get_retention(section)
+    if not policy:
+        raise RuntimeError("No retention configured for this job")
+    # ที่เดียวกับที่ backup วางไฟล์: jobs ใช้ backup_dir ของ scheduler, section ใช้ข้าง config.json
+    directory = args.dir or (get_scheduler_options(config)["backup_dir"] if args.job else BASE_DIR)
+    prune(directory, section.get("name") or db_type, policy, get_catalog_path(), print, dry_run=args.dry_run)
+    return 0
+
+
+def _add_section_args(parser: argparse.ArgumentParser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--job", help="job name from config.json 'jobs'")
+    group.add_argument("--db-type", choices=("postgres", "mysql"), help="use the postgres/mysql section of config.json")
+    parser.add_argument("--parallel", type=int, help="pg_dump/pg_restore worker count")
+    parser.add_argument("--transfer", choices=TRANSFER_MODES, help="stream or copy")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dockdbback", description="Docker database backup & restore")
+    parser.add_argument(
+        "--progress", choices=("auto", "text", "json", "none"), default="auto",
+        help="progress output on stderr (default: text on a terminal, otherwise none)",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backup", help="back up one database")
+    _add_section_args(p)
+    p.add_argument("-o", "--output", help="dump path (default: next to config.json)")
+    p.add_argument("--compression", choices=CODECS, help="compression codec")
+    p.add_argument("--level", type=int, help="compression level")
+    p.add_argument("--threads", type=int, help="compression threads (zstd)")
+    p.add_argument("--repository", help="store chunks in this dedup repository and write a manifest")
+    p.add_argument("--include", action="append", metavar="PATTERN", help="only back up matching tables (repeatable)")
+    p.add_argument("--exclude", action="append", metavar="PATTERN", help="skip matching tables (repeatable)")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("restore", help="restore a dump into the target database")
+    _add_section_args(p)
+    p.add_argument("dump_path")
+    p.add_argument(
+        "--table", action="append", metavar="NAME",
+        help="restore only the data of this table or pattern into the existing schema (repeatable)",
+    )
+    p.add_argument(
+        "--single-transaction", action="store_true",
+        help="pg_restore in one transaction so a failed or cancelled restore leaves the target unchanged",
+    )
+    p.add_argument(
+        "--shadow", action="store_true",
+        help="restore into <db_name>_shadow, then swap it in (the old database is kept as <db_name>_old)",
+    )
+    p.add_argument("--verify", choices=VERIFY_MODES, help="compare the target with the source afterwards")
+    p.add_argument("-y", "--yes", action="store_true", help="do not ask for confirmation")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("tables", help="list the tables in a dump (pg_restore -l TOC or per-table MySQL backup)")
+    _add_section_args(p)
+    p.add_argument("dump_path")
+    p.set_defaults(func=cmd_tables)
+
+    p = sub.add_parser("clone", help="pipe a dump from the source container straight into the target")
+    _add_section_args(p)
+    p.add_argument("--copy", help="also save the dump to this path on the host")
+    p.add_argument("--compression", choices=CODECS, help="compression codec for --copy")
+    p.add_argument("--level", type=int, help="compression level")
+    p.add_argument("--threads", type=int, help="compression threads (zstd)")
+    p.add_argument("--single-transaction", action="store_true", help="pg_restore into the target in one transaction")
+    p.add_argument("--verify", choices=VERIFY_MODES, help="compare the target with the source afterwards")
+    p.add_argument("-y", "--yes", action="store_true", help="do not ask for confirmation")
+    p.set_defaults(func=cmd_clone)
+
+    p = sub.add_parser("jobs", help="back up configured jobs with the scheduler")
+    p.add_argument("names", nargs="*", help="job names (default: all)")
+    p.add_argument("--max-workers", type=int)
+    p.add_argument("--per-container", type=int)
+    p.add_argument("--per-host", type=int)
+    p.add_argument("--backup-dir")
+    p.set_defaults(func=cmd_jobs)
+
+    p = sub.add_parser("history", help="show recent runs with timings and slowdowns")
+    p.add_argument("--job", help="job name (db_type for runs without a job)")
+    p.add_argument("--operation", choices=("backup", "restore", "clone"))
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--phases", action="store_true", help="show per-phase timings")
+    p.add_argument("--verify", action="store_true", help="show per-table verification results")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_history)
+
+    p = sub.add_parser("catalog", help="list backups from the catalog (newest first)")
+    p.add_argument("--job", help="job name (db_type for backups without a job)")
+    p.add_argument("--db-type", choices=("postgres", "mysql"))
+    p.add_argument("--search", help="match path, job, container, database or table name")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--no-scan", action="store_true", help="skip picking up new or deleted files first")
+    p.add_argument("--dir", action="append", help="extra directory to scan (repeatable)")
+    p.add_argument("--tables", action="store_true", help="show the tables recorded for each backup")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_catalog)
+
+    p = sub.add_parser("prune", help="delete old backups of a job by its retention policy")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--job", help="job name from config.json 'jobs'")
+    group.add_argument("--db-type", choices=("postgres", "mysql"), help="use the postgres/mysql section of config.json")
+    p.add_argument("--dir", help="backup directory (default: where backups of this job are written)")
+    p.add_argument("--dry-run", action="store_true", help="only list what would be deleted")
+    p.set_defaults(func=cmd_prune)
+
+    p = sub.add_parser("list-jobs", help="list configured jobs")
+    p.set_defaults(func=cmd_list_jobs)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    token = CancelToken()
+
+    def on_sigint(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        print("\nCancelling... (press Ctrl+C again to abort immediately)", file=sys.stderr)
+        token.cancel()
+
+    previous = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        with use_token(token):
+            config = load_config()
+            use_docker_api(config)
+            return args.func(config, args)
+    except OperationCancelled:
+        print("Cancelled", file=sys.stderr)
+        return 130
+    except (RuntimeError, FileNotFoundError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import gzip
+
+# codec ที่รองรับ: gzip ใช้ stdlib, zstd/lz4 ต้องติดตั้ง zstandard / lz4 เพิ่ม
+CODECS = ("none", "gzip", "zstd", "lz4")
+
+# นามสกุลไฟล์ที่ต่อท้ายชื่อ backup ตาม codec
+CODEC_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst", "lz4": ".lz4"}
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"\x04\x22\x4d\x18", "lz4"),
+)
+
+
+def get_compression(section: dict) -> dict:
+    """อ่าน section["compression"] แล้วเติมค่า default: codec, level, threads"""
+    opts = section.get("compression") or {}
+    codec = (opts.get("codec") or "none").lower()
+    if codec not in CODECS:
+        raise RuntimeError(f"Unsupported compression codec: {codec}")
+    return {
+        "codec": codec,
+        "level": opts.get("level"),
+        "threads": int(opts.get("threads") or 0),
+    }
+
+
+def detect_codec(header: bytes) -> str:
+    for magic, codec in _MAGIC:
+        if header.startswith(magic):
+            return codec
+    return "none"
+
+
+def detect_file_codec(path: str) -> str:
+    with open(path, "rb") as f:
+        return detect_codec(f.read(4))
+
+
+def _import_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def _import_lz4():
+    try:
+        import lz4.frame
+    except ImportError:
+        raise RuntimeError("lz4 compression requires the 'lz4' package (pip install lz4)")
+    return lz4.frame
+
+
+def open_writer(fileobj, codec: str, level=None, threads: int = 0):
+    """ห่อ fileobj ด้วยตัวบีบอัด; close() ของตัวที่คืนไปจะไม่ปิด fileobj"""
+    if codec == "none":
+        return _Passthrough(fileobj)
+    if codec == "gzip":
+        # gzip ของ stdlib ไม่รองรับ multithread จึงไม่ใช้ threads
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=6 if level is None else int(level))
+    if codec == "zstd":
+        zstandard = _import_zstd()
+        cctx = zstandard.ZstdCompressor(level=3 if level is None else int(level), threads=threads)
+        return cctx.stream_writer(fileobj, closefd=False)
+    if codec == "lz4":
+        lz4_frame = _import_lz4()
+        return lz4_frame.LZ4FrameFile(fileobj, mode="wb", compression_level=0 if level is None else int(level))
+    raise RuntimeError(f"Unsupported compression codec: {codec}")
+
+
+def open_reader(fileobj, codec: str | None = None):
+    """ห่อ fileobj ด้วยตัวคลายการบีบอัด; ถ้าไม่ระบุ codec จะตรวจจาก header ของไฟล์"""
+    if codec is None:
+        pos = fileobj.tell()
+        codec = detect_codec(fileobj.read(4))
+        fileobj.seek(pos)
+    if codec == "none":
+        return _Passthrough(fileobj)
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if codec == "zstd":
+        zstandard = _import_zstd()
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False, read_across_frames=True)
+    if codec == "lz4":
+        lz4_frame = _import_lz4()
+        return lz4_frame.LZ4FrameFile(fileobj, mode="rb")
+    raise RuntimeError(f"Unsupported compression codec: {codec}")
+
+
+class _Passthrough:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def write(self, data):
+        return self.fileobj.write(data)
+
+    def read(self, size=-1):
+        return self.fileobj.read(size)
+
+    def close(self):
+        pass
+
+
+def compress_bytes(data: bytes, codec: str, level=None) -> bytes:
+    """บีบอัดข้อมูลทั้งก้อน (ใช้กับ chunk ของ repository)"""
+    if codec == "none":
+        return data
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6 if level is None else int(level))
+    if codec == "zstd":
+        zstandard = _import_zstd()
+        return zstandard.ZstdCompressor(level=3 if level is None else int(level)).compress(data)
+    if codec == "lz4":
+        lz4_frame = _import_lz4()
+        return lz4_frame.compress(data, compression_level=0 if level is None else int(level))
+    raise RuntimeError(f"Unsupported compression codec: {codec}")
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    """คลายข้อมูลทั้งก้อน โดยตรวจ codec จาก header"""
+    codec = detect_codec(data[:4])
+    if codec == "none":
+        return data
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        zstandard = _import_zstd()
+        return zstandard.ZstdDecompressor().decompress(data)
+    return _import_lz4().decompress(data)
@@ -0,0 +1,584 @@
+"""คุยกับ Docker Engine API ผ่าน Unix socket โดยตรง แทนการ fork docker CLI ทุกขั้นตอน
+
+docker CLI แต่ละครั้งต้องเสียเวลาเริ่ม process และ handshake กับ daemon ใหม่ ซึ่งกินเวลาส่วนใหญ่ของ job
+ฐานข้อมูลเล็ก ๆ; ที่นี่ใช้ connection ที่ค้างไว้ใน pool สำหรับ request สั้น ๆ (สร้าง exec, ตรวจ exit code, ping)
+และเปิด stream ของ exec/archive ตรงจาก daemon
+
+เปิดใช้ใน config (ระดับบนสุด ใช้กับทุก job):
+    "docker_api": {"enabled": true, "socket": "/var/run/docker.sock"}
+
+รองรับเฉพาะ Docker host แบบ unix:// (หรือไม่ระบุ -H); host แบบ tcp:// หรือ ssh:// หรือเมื่อเปิด socket ไม่ได้
+จะใช้ docker CLI เหมือนเดิม คำสั่งยังสร้างเป็น argv ของ docker CLI ทุกที่ แล้วค่อยแปลงเป็น API call ตอนรัน
+"""
+import asyncio
+import http.client
+import json
+import os
+import socket
+import tarfile
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+# Docker 20.10 ขึ้นไป
+API_VERSION = "v1.41"
+
+# จำนวน connection ว่างที่เก็บไว้ใช้ซ้ำต่อ socket
+POOL_SIZE = 4
+REQUEST_TIMEOUT = 60
+CHUNK_SIZE = 1024 * 1024
+
+# ถ้าเปิด socket ไม่ได้ จะใช้ CLI ไปก่อนแล้วลองใหม่หลังจากนี้ (วินาที)
+RETRY_UNAVAILABLE_SECONDS = 30
+
+# exit code ของ exec ที่ถูก kill (ปิด connection) ก่อน process ใน container จบ เทียบกับ SIGKILL
+EXEC_KILLED = -9
+
+# stream id ใน header ของ multiplexed stream (Tty=false)
+_STDOUT, _STDERR = 1, 2
+
+
+def get_docker_api(config: dict) -> dict:
+    opts = config.get("docker_api") or {}
+    return {"enabled": bool(opts.get("enabled")), "socket": opts.get("socket") or DEFAULT_SOCKET}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None = REQUEST_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def _error_message(data: bytes) -> str:
+    try:
+        return json.loads(data)["message"]
+    except (ValueError, KeyError, TypeError):
+        return data[:200].decode(errors="replace").strip()
+
+
+class DockerClient:
+    """client ของ Docker Engine API บน Unix socket; request สั้น ๆ ใช้ connection จาก pool (keep-alive)"""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._idle: list[UnixHTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> tuple[UnixHTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return UnixHTTPConnection(self.socket_path), False
+
+    def _release(self, conn: UnixHTTPConnection):
+        with self._lock:
+            if len(self._idle) < POOL_SIZE:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _url(path: str, query: dict | None = None) -> str:
+        url = f"/{API_VERSION}{urllib.parse.quote(path)}"
+        if query:
+            url += "?" + urllib.parse.urlencode(query)
+        return url
+
+    def request(self, method: str, path: str, query: dict | None = None, body=None, ok=(200, 201, 204)):
+        """ส่ง request แล้วคืน (status, body ที่ decode JSON แล้วถ้าเป็น JSON)"""
+        headers = {}
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        while True:
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, self._url(path, query), body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused:
+                    # daemon ปิด keep-alive connection ไปแล้ว ลองใหม่ด้วย connection ใหม่
+                    continue
+                raise RuntimeError(f"Docker API {method} {path} failed: {e}")
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            break
+        if response.status not in ok:
+            raise RuntimeError(f"Docker API {method} {path} failed with HTTP {response.status}: {_error_message(data)}")
+        if data and (response.getheader("Content-Type") or "").startswith("application/json"):
+            return response.status, json.loads(data)
+        return response.status, data
+
+    @contextmanager
+    def open_stream(self, method: str, path: str, query: dict | None = None, body=None):
+        """request ที่อ่าน/ส่ง body แบบ stream (archive) ใช้ connection แยกแล้วปิดเมื่อจบ
+
+        body เป็น file object ได้ (ส่งแบบ chunked); yield response ที่ยังไม่อ่าน body
+        """
+        conn = UnixHTTPConnection(self.socket_path, timeout=None)
+        try:
+            try:
+                conn.request(method, self._url(path, query), body=body)
+                response = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                raise RuntimeError(f"Docker API {method} {path} failed: {e}")
+            if response.status not in (200, 201, 204):
+                raise RuntimeError(
+                    f"Docker API {method} {path} failed with HTTP {response.status}: {_error_message(response.read())}"
+                )
+            yield response
+        finally:
+            conn.close()
+
+    def ping(self):
+        self.request("GET", "/_ping")
+
+    def create_exec(self, container: str, argv: list[str], env: list[str] | None = None,
+                    attach_stdin: bool = False) -> str:
+        _, data = self.request("POST", f"/containers/{container}/exec", body={
+            "AttachStdin": attach_stdin, "AttachStdout": True, "AttachStderr": True, "Tty": False,
+            "Env": env or [], "Cmd": argv,
+        })
+        return data["Id"]
+
+    def start_exec(self, exec_id: str) -> tuple[socket.socket, object]:
+        """เริ่ม exec แล้วคืน (socket, reader) ของ connection ที่ถูก hijack เป็น stream ดิบ
+
+        ส่ง stdin โดยเขียนลง socket ตรง ๆ และปิดฝั่งเขียน (shutdown) เพื่อส่ง EOF; reader อ่าน stdout/stderr
+        ที่ multiplex กันมาเป็น frame
+        """
+        body = json.dumps({"Detach": False, "Tty": False}).encode()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(REQUEST_TIMEOUT)
+            sock.connect(self.socket_path)
+            sock.sendall((
+                f"POST {self._url(f'/exec/{exec_id}/start')} HTTP/1.1\r\nHost: localhost\r\n"
+                "Content-Type: application/json\r\nConnection: Upgrade\r\nUpgrade: tcp\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode() + body)
+            reader = sock.makefile("rb")
+            status_line = reader.readline().decode("latin-1")
+            headers = {}
+            while (line := reader.readline()) not in (b"\r\n", b"\n", b""):
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            parts = status_line.split()
+            status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+            # daemon รุ่นใหม่ตอบ 101 (upgrade), รุ่นเก่าตอบ 200 แล้ว stream ต่อใน connection เดิม
+            if status not in (101, 200):
+                data = reader.read(int(headers.get("content-length") or 0))
+                raise RuntimeError(f"Docker API start exec failed with HTTP {status}: {_error_message(data)}")
+            # dump อาจใช้เวลานาน ไม่ตั้ง timeout ให้ stream
+            sock.settimeout(None)
+        except OSError as e:
+            sock.close()
+            raise RuntimeError(f"Docker API start exec failed: {e}")
+        except BaseException:
+            sock.close()
+            raise
+        return sock, reader
+
+    def exec_exit_code(self, exec_id: str) -> int | None:
+        """exit code ของ exec หรือ None ถ้ายังรันอยู่"""
+        _, data = self.request("GET", f"/exec/{exec_id}/json")
+        return None if data.get("Running") else data.get("ExitCode")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _read_exactly(reader, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = reader.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class ExecProcess:
+    """process ใน container ที่รันผ่าน exec API มี interface ส่วนที่ engine ใช้จาก subprocess.Popen
+
+    stdin/stdout/stderr เป็น pipe ของ OS (thread แยก frame ของ stream ลงแต่ละ pipe) จึงมี back-pressure เหมือน
+    process ปกติ และ asyncio ใช้ต่อได้ด้วย connect_read_pipe/connect_write_pipe; output ที่ไม่ได้ขอ pipe ไว้
+    stdout จะถูกทิ้ง ส่วน stderr ส่งต่อไป stderr ของโปรแกรม (เหมือน docker CLI ที่ inherit ไว้)
+    """
+
+    # ไม่มี process บน host ให้ kill ด้วย pid (procengine ใช้ดูว่าต้อง killpg หรือไม่)
+    pid = None
+
+    def __init__(self, client: DockerClient, container: str, argv: list[str], env: list[str] | None = None,
+                 stdin: bool = False, stdout: bool = False, stderr: bool = False):
+        self.client = client
+        self.returncode = None
+        self.stdin = self.stdout = self.stderr = None
+        self._killed = False
+        self.exec_id = client.create_exec(container, argv, env, attach_stdin=stdin)
+        self._sock, self._reader = client.start_exec(self.exec_id)
+
+        self._targets = {_STDOUT: None, _STDERR: 2}
+        if stdout:
+            r, self._targets[_STDOUT] = os.pipe()
+            self.stdout = open(r, "rb")
+        if stderr:
+            r, self._targets[_STDERR] = os.pipe()
+            self.stderr = open(r, "rb")
+        self._demux = threading.Thread(target=self._demux_output, name="docker-exec-output", daemon=True)
+        self._demux.start()
+        if stdin:
+            self._stdin_fd, w = os.pipe()
+            self.stdin = open(w, "wb")
+            threading.Thread(target=self._pump_stdin, name="docker-exec-input", daemon=True).start()
+
+    def _demux_output(self):
+        try:
+            while True:
+                header = _read_exactly(self._reader, 8)
+                if len(header) < 8:
+                    return
+                fd = self._targets.get(header[0])
+                remaining = int.from_bytes(header[4:8], "big")
+                while remaining:
+                    data = self._reader.read(min(remaining, CHUNK_SIZE))
+                    if not data:
+                        return
+                    remaining -= len(data)
+                    if fd is None:
+                        continue
+                    try:
+                        _write_all(fd, data)
+                    except OSError:
+                        # ฝั่งอ่านปิด pipe ไปแล้ว ทิ้ง output ที่เหลือ
+                        if fd != 2:
+                            os.close(fd)
+                        self._targets[header[0]] = fd = None
+        except (OSError, ValueError):
+            # connection ถูกปิดจาก kill()
+            return
+        finally:
+            for stream in (_STDOUT, _STDERR):
+                fd = self._targets.get(stream)
+                if fd is not None and fd != 2:
+                    os.close(fd)
+            self._targets = {}
+
+    def _pump_stdin(self):
+        try:
+            while data := os.read(self._stdin_fd, CHUNK_SIZE):
+                self._sock.sendall(data)
+            # EOF ของ stdin: ปิดฝั่งเขียนของ connection daemon จะปิด stdin ของ process ใน container
+            self._sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        finally:
+            # ปิดฝั่งอ่านของ pipe ให้คนที่ยังเขียนอยู่ได้ BrokenPipeError เหมือน process จบไปแล้ว
+            os.close(self._stdin_fd)
+
+    def poll(self) -> int | None:
+        if self.returncode is None and not self._demux.is_alive():
+            self.wait()
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int:
+        """รอจน stream ปิด (process ใน container จบ) แล้วถาม exit code จาก daemon"""
+        if self.returncode is not None:
+            return self.returncode
+        self._demux.join(timeout)
+        if self._demux.is_alive():
+            raise TimeoutError(f"exec {self.exec_id} still running")
+        self._reader.close()
+        self._sock.close()
+        if self._killed:
+            self.returncode = EXEC_KILLED
+            return self.returncode
+        # daemon อาจยังไม่ได้อัปเดตสถานะทันทีที่ stream ปิด
+        for _ in range(50):
+            code = self.client.exec_exit_code(self.exec_id)
+            if code is not None:
+                self.returncode = code
+                return code
+            time.sleep(0.05)
+        self.returncode = EXEC_KILLED
+        return self.returncode
+
+    def kill(self):
+        """ตัด connection ของ exec (เหมือน kill docker CLI: process ใน container ต้องหยุดด้วย kill_in_container)"""
+        if self.returncode is not None:
+            return
+        self._killed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class AsyncExecProcess:
+    """ExecProcess ในรูปแบบ asyncio.subprocess.Process สำหรับ procengine"""
+
+    pid = None
+
+    def __init__(self, proc: ExecProcess):
+        self._proc = proc
+        self.stdin = self.stdout = self.stderr = None
+
+    @property
+    def returncode(self) -> int | None:
+        return self._proc.returncode
+
+    async def _connect(self, limit: int):
+        loop = asyncio.get_running_loop()
+        for name in ("stdout", "stderr"):
+            pipe = getattr(self._proc, name)
+            if pipe is not None:
+                reader = asyncio.StreamReader(limit=limit, loop=loop)
+                await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), pipe)
+                setattr(self, name, reader)
+        if self._proc.stdin is not None:
+            transport, protocol = await loop.connect_write_pipe(
+                lambda: asyncio.streams.FlowControlMixin(loop=loop), self._proc.stdin,
+            )
+            self.stdin = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    async def wait(self) -> int:
+        return await asyncio.to_thread(self._proc.wait)
+
+    def kill(self):
+        self._proc.kill()
+
+    async def communicate(self, input: bytes | None = None) -> tuple[bytes | None, bytes | None]:
+        async def feed():
+            if self.stdin is None:
+                return
+            try:
+                if input:
+                    self.stdin.write(input)
+                    await self.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                self.stdin.close()
+
+        async def read(stream):
+            return await stream.read() if stream is not None else None
+
+        _, out, err = await asyncio.gather(feed(), read(self.stdout), read(self.stderr))
+        await self.wait()
+        return out, err
+
+
+def parse_docker_cmd(cmd) -> dict | None:
+    """แยก argv ของ docker CLI ที่ API รองรับ (exec และ cp) คืน None ถ้าต้องใช้ CLI
+
+    คืน {"host", "command", "container", ...}: exec มี argv, env, interactive; cp มี src, dst
+    """
+    args = list(cmd)
+    if not args or os.path.basename(args[0]) != "docker":
+        return None
+    host = None
+    if args[1:2] == ["-H"]:
+        host, args = args[2], args[3:]
+    else:
+        args = args[1:]
+    if args[:1] == ["exec"]:
+        rest = args[1:]
+        env, interactive = [], False
+        while rest and rest[0].startswith("-"):
+            if rest[0] == "-e" and len(rest) > 1:
+                env.append(rest[1])
+                rest = rest[2:]
+            elif rest[0] == "-i":
+                interactive = True
+                rest = rest[1:]
+            else:
+                return None
+        if len(rest) < 2:
+            return None
+        return {
+            "host": host, "command": "exec", "container": rest[0], "argv": rest[1:], "env": env,
+            "interactive": interactive,
+        }
+    if args[:1] == ["cp"] and len(args) == 3:
+        src, dst = args[1], args[2]
+        # container:path อยู่ฝั่งใดฝั่งหนึ่ง (path บน host ของ Windows เช่น C:\... ไม่ใช้ socket อยู่แล้ว)
+        if ":" in src and not os.path.isabs(src):
+            container, src = src.split(":", 1)
+            return {"host": host, "command": "cp", "container": container, "direction": "from", "src": src, "dst": dst}
+        if ":" in dst and not os.path.isabs(dst):
+            container, dst = dst.split(":", 1)
+            return {"host": host, "command": "cp", "container": container, "direction": "to", "src": src, "dst": dst}
+    return None
+
+
+_settings = {"enabled": False, "socket": DEFAULT_SOCKET}
+_clients: dict[str, DockerClient] = {}
+_unavailable: dict[str, tuple[float, str]] = {}
+_clients_lock = threading.Lock()
+
+
+def configure_api(opts: dict):
+    """ตั้งค่าจาก get_docker_api(config); client ใน pool ถูกเก็บไว้ใช้ต่อข้าม job"""
+    _settings.update(opts)
+
+
+def _socket_path(host: str | None) -> str | None:
+    if host is None:
+        host = os.environ.get("DOCKER_HOST") or ""
+        if not host:
+            return _settings["socket"]
+    if host.startswith("unix://"):
+        return host[len("unix://"):]
+    return None
+
+
+def get_client(socket_path: str) -> tuple[DockerClient | None, str | None]:
+    """(client, None) ถ้าคุยกับ daemon ได้ หรือ (None, เหตุผล) ถ้าต้องใช้ CLI แทน"""
+    with _clients_lock:
+        client = _clients.get(socket_path)
+        if client:
+            return client, None
+        failed = _unavailable.get(socket_path)
+        if failed and time.monotonic() - failed[0] < RETRY_UNAVAILABLE_SECONDS:
+            return None, failed[1]
+        client = DockerClient(socket_path)
+        try:
+            client.ping()
+        except RuntimeError as e:
+            _unavailable[socket_path] = (time.monotonic(), str(e))
+            return None, str(e)
+        _unavailable.pop(socket_path, None)
+        _clients[socket_path] = client
+        return client, None
+
+
+def route(cmd) -> tuple[DockerClient, dict] | None:
+    """(client, คำสั่งที่แยกแล้ว) ถ้าควรรัน cmd ผ่าน API, None ถ้าให้ใช้ docker CLI"""
+    if not _settings["enabled"]:
+        return None
+    parsed = parse_docker_cmd(cmd)
+    if not parsed:
+        return None
+    socket_path = _socket_path(parsed["host"])
+    if not socket_path:
+        return None
+    client, _ = get_client(socket_path)
+    if not client:
+        return None
+    return client, parsed
+
+
+def popen_exec(cmd, stdin: bool = False, stdout: bool = False, stderr: bool = False) -> ExecProcess | None:
+    """ExecProcess ของ docker exec ใน cmd หรือ None ถ้าต้องใช้ subprocess.Popen ตามปกติ"""
+    routed = route(cmd)
+    if not routed or routed[1]["command"] != "exec":
+        return None
+    client, parsed = routed
+    return ExecProcess(client, parsed["container"], parsed["argv"], parsed["env"], stdin, stdout, stderr)
+
+
+async def spawn_exec(cmd, limit: int, stdin=None, stdout=None, stderr=None) -> AsyncExecProcess | None:
+    """เหมือน popen_exec() สำหรับ asyncio (ค่า stdin/stdout/stderr แบบ asyncio.subprocess)"""
+    if not _settings["enabled"]:
+        return None
+    # ครั้งแรกของแต่ละ socket ต้อง ping daemon จึงไม่ทำใน event loop
+    routed = await asyncio.to_thread(route, cmd)
+    if not routed or routed[1]["command"] != "exec":
+        return None
+    client, parsed = routed
+    pipe = asyncio.subprocess.PIPE
+    proc = await asyncio.to_thread(
+        ExecProcess, client, parsed["container"], parsed["argv"], parsed["env"],
+        stdin == pipe, stdout == pipe, stderr == pipe,
+    )
+    async_proc = AsyncExecProcess(proc)
+    try:
+        await async_proc._connect(limit)
+    except BaseException:
+        proc.kill()
+        raise
+    return async_proc
+
+
+def _member_name(name: str, new_root: str) -> str:
+    """เปลี่ยนชื่อชั้นบนสุดใน tar ของ archive เป็น new_root (เหมือน docker cp ไปยัง path ที่ยังไม่มี)"""
+    while name.startswith("./"):
+        name = name[2:]
+    rest = name.lstrip("/").split("/", 1)
+    return new_root + ("/" + rest[1] if len(rest) > 1 and rest[1] else "")
+
+
+def copy_from_container(client: DockerClient, container: str, src: str, dst: str):
+    """GET archive ของ src ใน container แล้วแตก tar แบบ stream ลง dst บน host (dst ต้องยังไม่มี)"""
+    parent = os.path.dirname(os.path.abspath(dst))
+    root = os.path.basename(os.path.abspath(dst))
+    with client.open_stream("GET", f"/containers/{container}/archive", {"path": src}) as response:
+        with tarfile.open(fileobj=response, mode="r|") as tar:
+            for member in tar:
+                member.name = _member_name(member.name, root)
+                tar.extract(member, parent, filter="data")
+
+
+def copy_to_container(client: DockerClient, container: str, src: str, dst: str):
+    """PUT archive: สร้าง tar ของ src บน host แบบ stream (ไม่มีไฟล์ชั่วคราว) แตกเป็น dst ใน container"""
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        try:
+            with open(write_fd, "wb") as out, tarfile.open(fileobj=out, mode="w|") as tar:
+                tar.add(src, arcname=os.path.basename(dst.rstrip("/")))
+        except OSError as e:
+            # BrokenPipeError เมื่อ request ล้มเหลวไปก่อน จะเห็น error ของ request แทน
+            errors.append(e)
+
+    producer = threading.Thread(target=produce, name="docker-archive", daemon=True)
+    producer.start()
+    try:
+        with open(read_fd, "rb") as body:
+            parent = os.path.dirname(dst.rstrip("/")) or "/"
+            with client.open_stream("PUT", f"/containers/{container}/archive", {"path": parent}, body) as response:
+                response.read()
+    finally:
+        producer.join()
+    if errors and not isinstance(errors[0], BrokenPipeError):
+        raise RuntimeError(f"Could not read {src}: {errors[0]}")
+
+
+def copy_archive(cmd) -> bool:
+    """รัน docker cp ใน cmd ผ่าน archive API; คืน False ถ้าต้องใช้ docker CLI"""
+    routed = route(cmd)
+    if not routed or routed[1]["command"] != "cp":
+        return False
+    client, parsed = routed
+    if parsed["direction"] == "from":
+        copy_from_container(client, parsed["container"], parsed["src"], parsed["dst"])
+    else:
+        copy_to_container(client, parsed["container"], parsed["src"], parsed["dst"])
+    return True
@@ -0,0 +1,2516 @@
+import sys
+import os
+import json
+import datetime
+import re
+import sqlite3
+import subprocess
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from catalog import CATALOG_FILE, cached_tables, list_backups, path_size, record_backup
+from cancel import OperationCancelled, bind_token, check_cancelled, current_token, on_cancel, shielded, wait_if_paused
+from checksums import SUMS_SUFFIX, HashingWriter, SumsWriter, VerifyingReader, load_sums, sums_path, verify_prefix
+from chunkstore import RepositoryReader, RepositoryWriter, is_manifest, is_manifest_file, load_manifest
+from compression import (
+    CODEC_EXTENSIONS, detect_file_codec, get_compression, open_reader, open_writer,
+)
+from dockerapi import configure_api, copy_archive, get_client, get_docker_api, popen_exec
+from history import HISTORY_FILE, record_phase, record_verification, track_run
+from logpipe import bind_context, log_context, set_phase
+from mysqlsplit import DeferredIndexReader, TableSplitter, assign_tables
+from objstore import (
+    TeeWriter, get_upload, is_remote_path, load_remote_sums, object_key, open_remote, parse_remote_path, remote_path,
+    S3Client, start_upload, upload_file,
+)
+from procengine import capture_process, get_engine, pipe_processes, run_process
+from progress import Progress
+from retention import get_retention, start_prune
+from shadow import (
+    PG_MAINTENANCE_DB, SWAP_LOCK_TIMEOUT, SWAP_RETRIES, SWAP_RETRY_DELAY, mysql_ident, mysql_literal, mysql_swap_sql,
+    pg_create_sql, pg_ident, pg_literal, pg_swap_sql, pg_terminate_sql, shadow_names,
+)
+from tables import (
+    get_table_filter, parse_toc, pg_fk_dependents_sql, quote_pg_table, select_tables, toc_data_list, toc_tables,
+)
+from verify import (
+    describe, get_verify, integer_key, mysql_bounds_sql, mysql_checksum_sql, mysql_columns_sql, mysql_count_sql,
+    pg_bounds_sql, pg_checksum_sql, pg_count_sql, pg_key_sql, plan_chunks, sample_chunks, table_status,
+)
+
+
+def get_base_dir() -> str:
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def get_config_path() -> str:
+    return os.path.join(get_base_dir(), "config.json")
+
+
+def get_history_path() -> str:
+    return os.path.join(get_base_dir(), HISTORY_FILE)
+
+
+def get_catalog_path() -> str:
+    return os.path.join(get_base_dir(), CATALOG_FILE)
+
+
+BASE_DIR = get_base_dir()
+
+
+def load_config() -> dict:
+    config_path = get_config_path()
+
+    if not os.path.exists(config_path):
+        # ถ้ารันแบบ onefile และมี default config bundle อยู่ ให้ copy ออกมาวางข้าง exe
+        if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
+            bundled_path = os.path.join(sys._MEIPASS, "config.json")
+            if os.path.exists(bundled_path):
+                try:
+                    shutil.copyfile(bundled_path, config_path)
+                except OSError:
+                    pass
+
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"Config file not found: {config_path}")
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_config(config: dict) -> None:
+    config_path = get_config_path()
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+
+# ขนาด chunk ที่อ่าน/เขียนระหว่าง stream ข้อมูลกับ docker exec
+CHUNK_SIZE = 1024 * 1024
+
+# query ขนาดฐานข้อมูลเป็นแค่ตัวช่วย progress ไม่ควรทำให้ backup ค้าง (วินาที)
+SIZE_QUERY_TIMEOUT = 60
+
+# pre-flight ต้องรู้ผลภายในไม่กี่วินาที ถ้าต่อฐานข้อมูลไม่ได้ในเวลานี้ถือว่าล้มเหลว (วินาที)
+PREFLIGHT_TIMEOUT = 30
+
+# เผื่อพื้นที่เกินขนาดที่ประมาณไว้ (ฐานข้อมูลโตขึ้นตั้งแต่ backup ครั้งก่อน)
+PREFLIGHT_MARGIN = 1.2
+
+# ขนาด dump เทียบกับ pg_database_size/ขนาดตาราง MySQL เมื่อยังไม่เคยมี backup ของ job นี้
+# (dump ไม่มี index และ bloat; none ของ Postgres ยังบีบอัดด้วย zlib ของ -Fc)
+OUTPUT_RATIO = {"none": 1.0, "gzip": 0.35, "zstd": 0.3, "lz4": 0.5}
+PG_CUSTOM_RATIO = 0.5
+
+# จำนวนครั้งที่ลองส่งไฟล์ต่อจากจุดที่ขาด (copy mode) ก่อนยอมแพ้
+TRANSFER_RETRIES = 3
+
+
+DB_TYPES = ("postgres", "mysql")
+
+# ที่เก็บ backup: file = ไฟล์ dump เต็ม, repository = chunk แบบ dedup + manifest
+STORAGE_MODES = ("file", "repository")
+
+# โหมดส่งไฟล์: stream = ส่งผ่าน stdout/stdin ของ docker exec, copy = dump ลงไฟล์ใน container แล้ว docker cp
+TRANSFER_MODES = ("stream", "copy")
+
+
+def log_message(msg: str, log_callback):
+    print(msg)
+    if log_callback:
+        log_callback(msg)
+
+
+def _creationflags() -> int:
+    if os.name == "nt" and hasattr(subprocess, "CREATE_NO_WINDOW"):
+        return subprocess.CREATE_NO_WINDOW
+    return 0
+
+
+def _popen(cmd, stdin=None, stdout=None, stderr=None):
+    """subprocess.Popen ของ cmd; docker exec จะรันผ่าน Docker Engine API แทนถ้าเปิด docker_api ไว้"""
+    pipe = subprocess.PIPE
+    proc = popen_exec(cmd, stdin == pipe, stdout == pipe, stderr == pipe)
+    if proc is not None:
+        return proc
+    return subprocess.Popen(cmd, shell=False, stdin=stdin, stdout=stdout, stderr=stderr, creationflags=_creationflags())
+
+
+def use_docker_api(config: dict, log_callback=None):
+    """ตั้งค่า docker_api ของ config ก่อนเริ่มงาน; ถ้าเปิดไว้แต่ต่อ socket ไม่ได้จะเตือนแล้วใช้ docker CLI"""
+    if "docker_api" not in config:
+        # config ย่อยของ job หรือของ CLI ({db_type: section}) ใช้ค่าที่ตั้งไว้จาก config หลัก
+        return
+    opts = get_docker_api(config)
+    configure_api(opts)
+    if opts["enabled"]:
+        _, error = get_client(opts["socket"])
+        if error:
+            log_message(f"Warning: Docker API is not available ({error}); using docker CLI", log_callback)
+
+
+def split_exec(cmd) -> tuple[list[str], str, list[str]] | None:
+    """แยกคำสั่ง docker exec เป็น (คำสั่ง docker รวม -H, container, argv ใน container); คืน None ถ้าไม่ใช่ exec"""
+    args = list(cmd)
+    if not args or os.path.basename(args[0]) != "docker":
+        return None
+    prefix = args[:3] if args[1:2] == ["-H"] else args[:1]
+    rest = args[len(prefix):]
+    if rest[:1] != ["exec"]:
+        return None
+    rest = rest[1:]
+    while rest and rest[0].startswith("-"):
+        rest = rest[2:] if rest[0] == "-e" else rest[1:]
+    if not rest:
+        return None
+    return prefix, rest[0], rest[1:]
+
+
+def phase_name(cmd) -> str:
+    """ชื่อ phase สำหรับ history เช่น "exec pg_dump", "cp" จากคำสั่ง docker"""
+    args = list(cmd)
+    if args and os.path.basename(args[0]) == "docker":
+        parsed = split_exec(args)
+        if parsed:
+            program_args = parsed[2]
+            program = program_args[0] if program_args else ""
+            if program == "sh" and len(program_args) > 2:
+                program = program_args[2].split()[0]
+            return f"exec {program}".strip()
+        args = args[3:] if args[1:2] == ["-H"] else args[1:]
+        return args[0] if args else "docker"
+    return os.path.basename(args[0]) if args else ""
+
+
+# kill process ใน container ที่ cmdline ขึ้นต้นด้วย pattern ใดก็ได้ใน "$@" (ใช้แค่ sh, tr และ /proc)
+_KILL_SCRIPT = (
+    'for d in /proc/[0-9]*; do p=${d#/proc/}; [ "$p" = "$$" ] && continue; '
+    'c=$(tr "\\0" " " < "$d/cmdline" 2>/dev/null) || continue; '
+    'for pat in "$@"; do case "$c" in "$pat"*) kill -9 "$p" 2>/dev/null;; esac; done; done'
+)
+
+# เวลารอคำสั่ง kill/cleanup หลังยกเลิก
+CANCEL_CLEANUP_TIMEOUT = 30
+
+
+def kill_in_container(cmd, log_callback):
+    """หยุด process ใน container ที่ cmd (docker exec) สั่งไว้
+
+    การ kill docker CLI บน host ไม่ได้หยุด process ใน container (เช่น pg_restore ที่อ่านไฟล์ใน /backup)
+    """
+    parsed = split_exec(cmd)
+    if not parsed or not parsed[2]:
+        return
+    prefix, container, argv = parsed
+    patterns = [" ".join(argv)]
+    if argv[:2] == ["sh", "-c"] and len(argv) > 2:
+        # sh -c "mysqldump ... > file": kill คำสั่งข้างในด้วย (ข้ามคำสั่งที่ไม่มี argument เช่น cat)
+        inner = re.split(r"[<>|]", argv[2])[0].strip()
+        if " " in inner:
+            patterns.append(inner)
+    with shielded():
+        try:
+            run_cmd(
+                [*prefix, "exec", container, "sh", "-c", _KILL_SCRIPT, "sh", *patterns],
+                log_callback, timeout=CANCEL_CLEANUP_TIMEOUT,
+            )
+        except RuntimeError:
+            log_message(f"Warning: could not stop {argv[0]} in container {container}", log_callback)
+
+
+def run_cmd(cmd, log_callback, timeout: float | None = None):
+    """รัน cmd ผ่าน ProcessEngine (asyncio) โดยส่ง stdout/stderr เข้า log ทีละบรรทัด"""
+    # pause มีผลระหว่างขั้นตอน: คำสั่งถัดไปจะรอจนกว่าจะ resume (หรือ cancel)
+    wait_if_paused()
+    set_phase(phase_name(cmd))
+    log_message("Running: " + " ".join(cmd), log_callback)
+
+    started = time.monotonic()
+    # docker cp ผ่าน archive API ของ Docker (ถ้าเปิด docker_api ไว้) ไม่ต้อง fork docker CLI
+    try:
+        copied = copy_archive(cmd)
+    except RuntimeError as e:
+        log_message(str(e), log_callback)
+        raise
+    if copied:
+        record_phase(phase_name(cmd), time.monotonic() - started, returncode=0)
+        return
+    try:
+        returncode, stderr_tail = get_engine().run(
+            # บรรทัดถูกส่งมาจาก thread ของ ProcessEngine จึงผูก log context ของ thread นี้ไว้
+            run_process(cmd, bind_context(lambda line: log_message(line, log_callback)), timeout, _creationflags())
+        )
+    except OperationCancelled:
+        kill_in_container(cmd, log_callback)
+        raise
+    record_phase(phase_name(cmd), time.monotonic() - started, returncode=returncode)
+    if returncode != 0:
+        err = f"Command failed with code {returncode}"
+        if stderr_tail:
+            err += f": {stderr_tail[-1]}"
+        log_message(err, log_callback)
+        raise RuntimeError(err)
+
+
+def capture_cmd(cmd, log_callback, input: bytes | None = None, timeout: float | None = None) -> str:
+    """รัน cmd แล้วคืน stdout (ใช้กับ query สั้น ๆ เช่นขนาดฐานข้อมูล); input ส่งเข้า stdin ถ้ามี"""
+    check_cancelled()
+    set_phase(phase_name(cmd))
+    log_message("Running: " + " ".join(cmd), log_callback)
+
+    started = time.monotonic()
+    returncode, out, err = get_engine().run(capture_process(cmd, input, timeout, _creationflags()))
+    record_phase(phase_name(cmd), time.monotonic() - started, returncode=returncode)
+    if returncode != 0:
+        err = f"Command failed with code {returncode}: {err.decode(errors='replace').strip()}"
+        log_message(err, log_callback)
+        raise RuntimeError(err)
+    return out.decode("utf-8", errors="replace").strip()
+
+
+def stream_cmd_to_file(cmd, dump_path: str, log_callback, compression: dict | None = None,
+                       repository: str | None = None, progress_callback=None, total: int | None = None,
+                       upload: dict | None = None):
+    """รัน cmd แล้วเขียน stdout ลง dump_path ทีละ chunk (ไม่มีไฟล์ชั่วคราวใน container)
+
+    ถ้าระบุ repository จะเก็บข้อมูลเป็น chunk ใน repository และเขียน manifest ลง dump_path แทน
+    ถ้าระบุ upload (get_upload) จะส่ง byte เดียวกับที่ลงไฟล์ขึ้น object storage แบบ multipart ไปพร้อมกัน
+    """
+    check_cancelled()
+    compression = compression or {"codec": "none", "level": None, "threads": 0}
+    suffix = f" ({compression['codec']})" if compression["codec"] != "none" else ""
+    if repository:
+        suffix = f" (repository {repository})"
+    set_phase("stream " + phase_name(cmd))
+    log_message("Streaming: " + " ".join(cmd) + f" > {dump_path}{suffix}", log_callback)
+
+    progress = Progress("backup", total, progress_callback) if progress_callback else None
+    started = time.monotonic()
+    transferred = 0
+    client = uploader = out = None
+    try:
+        if upload:
+            client, uploader = start_upload(upload, object_key(upload, dump_path))
+        out = _DumpFileWriter(dump_path, compression, repository, uploader)
+        proc = _popen(cmd, stdout=subprocess.PIPE)
+    except BaseException:
+        # เริ่มไม่สำเร็จ (เช่นไม่มี docker): ไม่ทิ้ง .part/.sums และ multipart upload ที่ยังไม่จบไว้
+        if out is not None:
+            out.discard()
+        if uploader:
+            with shielded():
+                uploader.abort()
+                client.close()
+        raise
+    try:
+        with on_cancel(proc.kill):
+            while True:
+                # pause: หยุดอ่าน pipe แล้ว dump ใน container จะหยุดรอเองเมื่อ pipe เต็ม
+                wait_if_paused()
+                chunk = proc.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+                transferred += len(chunk)
+                if progress:
+                    progress.update(len(chunk))
+            out.close()
+        returncode = proc.wait()
+        record_phase("stream " + phase_name(cmd), time.monotonic() - started, transferred, returncode)
+        check_cancelled()
+    except BaseException as e:
+        proc.kill()
+        proc.wait()
+        out.discard()
+        if uploader:
+            with shielded():
+                uploader.abort()
+                client.close()
+        if isinstance(e, OperationCancelled):
+            kill_in_container(cmd, log_callback)
+        raise
+    finally:
+        proc.stdout.close()
+
+    if returncode != 0:
+        out.discard()
+        if uploader:
+            uploader.abort()
+            client.close()
+        err = f"Command failed with code {returncode}"
+        log_message(err, log_callback)
+        raise RuntimeError(err)
+
+    out.commit()
+    if uploader:
+        _finish_upload(upload, client, uploader, dump_path, log_callback)
+    if progress:
+        progress.finish()
+    if repository:
+        log_message(out.repository_summary(), log_callback)
+
+
+class _DumpFileWriter:
+    """เขียนไฟล์ dump ลง <dump_path>.part พร้อม .sums แล้วค่อย rename เมื่อสำเร็จ
+
+    ไม่ให้เหลือไฟล์ dump ที่ไม่ครบ; ข้อมูลถูกบีบอัดตาม compression หรือเก็บเป็น chunk ใน repository
+    (เขียน manifest ลงไฟล์แทน) และส่งต่อให้ uploader ไปพร้อมกันถ้ามี
+    """
+
+    def __init__(self, dump_path: str, compression: dict, repository: str | None = None, uploader=None):
+        self.dump_path = dump_path
+        self.part_path = dump_path + ".part"
+        self.sums = SumsWriter(sums_path(self.part_path))
+        self.file = open(self.part_path, "wb")
+        # checksum คิดจาก byte ที่ลงดิสก์จริง (หลังบีบอัด) เพื่อใช้ตรวจไฟล์ตอน restore
+        out = HashingWriter(TeeWriter(self.file, uploader) if uploader else self.file, self.sums)
+        try:
+            if repository:
+                self.writer = RepositoryWriter(repository, out, compression["codec"], compression["level"])
+            else:
+                self.writer = open_writer(out, compression["codec"], compression["level"], compression["threads"])
+        except BaseException:
+            # เช่น codec ที่ไม่ได้ติดตั้ง: ลบ .part/.sums ที่เพิ่งสร้าง
+            self.discard()
+            raise
+
+    def write(self, data):
+        self.writer.write(data)
+
+    def close(self):
+        """flush ส่วนท้ายของตัวบีบอัด/repository แล้วปิดไฟล์ (ยังเป็น .part จนกว่าจะ commit)"""
+        try:
+            self.writer.close()
+        finally:
+            self.file.close()
+        self.sums.close()
+
+    def commit(self):
+        os.replace(self.part_path, self.dump_path)
+        os.replace(sums_path(self.part_path), sums_path(self.dump_path))
+
+    def discard(self):
+        self.file.close()
+        self.sums.abort()
+        _remove_quietly(self.part_path)
+        _remove_quietly(sums_path(self.part_path))
+
+    def repository_summary(self) -> str:
+        writer = self.writer
+        return f"Repository: {len(writer.chunks)} chunks, {writer.new_bytes} new of {writer.size} bytes"
+
+
+def _finish_upload(upload: dict, client: S3Client, uploader, dump_path: str, log_callback):
+    """รวม part ที่เหลือเป็น object แล้วส่ง .sums ตามขึ้นไป (ไฟล์บน host ยังอยู่ถ้า upload ล้มเหลว)"""
+    started = time.monotonic()
+    try:
+        uploader.close()
+        with open(sums_path(dump_path), "rb") as f:
+            client.put_object(uploader.bucket, uploader.key + SUMS_SUFFIX, f.read())
+    except BaseException:
+        uploader.abort()
+        raise
+    finally:
+        client.close()
+    record_phase("upload complete", time.monotonic() - started, uploader.size)
+    log_message(f"Uploaded to {remote_path(uploader.bucket, uploader.key)} ({uploader.size:,} bytes)", log_callback)
+
+
+def upload_backup(upload: dict, dump_path: str, log_callback, progress_callback=None):
+    """upload backup ที่เขียนเสร็จแล้วบน host (กรณีที่ไม่ได้ stream เช่น copy mode หรือ pg_dump -j)"""
+    if os.path.isdir(dump_path):
+        log_message(f"Warning: {dump_path} is a directory; upload supports single-file backups only", log_callback)
+        return
+    key = object_key(upload, dump_path)
+    set_phase("upload")
+    log_message(f"Uploading {dump_path} to {remote_path(upload['bucket'], key)}", log_callback)
+    started = time.monotonic()
+    size = os.path.getsize(dump_path)
+    progress = Progress("upload", size, progress_callback) if progress_callback else None
+    upload_file(upload, dump_path, key, progress)
+    if os.path.exists(sums_path(dump_path)):
+        client = S3Client(upload)
+        try:
+            with open(sums_path(dump_path), "rb") as f:
+                client.put_object(upload["bucket"], key + SUMS_SUFFIX, f.read())
+        finally:
+            client.close()
+    record_phase("upload", time.monotonic() - started, size)
+    if progress:
+        progress.finish()
+
+
+def open_dump_reader(f):
+    """เปิด dump บน host สำหรับอ่านแบบ stream: manifest ของ repository หรือไฟล์ที่อาจบีบอัดไว้"""
+    header = f.read(64)
+    f.seek(0)
+    if is_manifest(header):
+        return RepositoryReader(load_manifest(f))
+    return open_reader(f)
+
+
+def _open_dump_file(dump_path: str, remote: dict | None):
+    if remote:
+        return open_remote(remote, dump_path)
+    return open(dump_path, "rb")
+
+
+def stream_file_to_cmd(dump_path: str, cmd, log_callback, progress_callback=None, remote: dict | None = None,
+                       transform=None):
+    """ส่งไฟล์ dump_path เข้า stdin ของ cmd ทีละ chunk
+
+    ถ้าระบุ remote (get_upload) dump_path เป็น s3://bucket/key และอ่านแบบ stream จาก object storage โดยตรง
+    transform(reader) ห่อ reader หลังคลายการบีบอัดเพื่อแก้เนื้อหาระหว่างส่ง (เช่น DeferredIndexReader)
+    """
+    check_cancelled()
+    set_phase("stream " + phase_name(cmd))
+    log_message("Streaming: " + " ".join(cmd) + f" < {dump_path}", log_callback)
+
+    started = time.monotonic()
+    sent = 0
+    proc = _popen(cmd, stdin=subprocess.PIPE)
+    try:
+        with on_cancel(proc.kill), _open_dump_file(dump_path, remote) as f:
+            # ตรวจ checksum ราย chunk ไปพร้อมกับการส่ง (ถ้ามี .sums) ไม่ต้องอ่านไฟล์รอบแยก
+            sums = load_remote_sums(remote, dump_path) if remote else load_sums(sums_path(dump_path))
+            size = f.size if remote else os.path.getsize(dump_path)
+            source = f
+            if sums and sums["size"] is not None:
+                if sums["size"] != size:
+                    raise RuntimeError(f"Dump size does not match its checksum file: {dump_path}")
+                source = VerifyingReader(f, sums)
+            # คลายการบีบอัดตาม header ของไฟล์ (gzip/zstd/lz4) หรือประกอบจาก repository ระหว่างส่ง
+            reader = open_dump_reader(source)
+            # progress นับจากไฟล์บน host (ขนาดไฟล์จริง) ยกเว้น manifest ที่นับจากขนาด stream
+            from_manifest = isinstance(reader, RepositoryReader)
+            total = reader.manifest["size"] if from_manifest else size
+            progress = Progress("restore", total, progress_callback) if progress_callback else None
+            if transform:
+                reader = transform(reader)
+            while True:
+                wait_if_paused()
+                chunk = reader.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if progress:
+                    if from_manifest:
+                        progress.update(len(chunk))
+                    else:
+                        progress.update_to(f.tell())
+                try:
+                    proc.stdin.write(chunk)
+                    sent += len(chunk)
+                except BrokenPipeError:
+                    # ปลายทางปิด stdin ก่อน (เช่น restore ล้มเหลว) ให้ไปดู returncode แทน
+                    break
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = proc.wait()
+        record_phase("stream " + phase_name(cmd), time.monotonic() - started, sent, returncode)
+        check_cancelled()
+    except BaseException as e:
+        proc.kill()
+        proc.wait()
+        if isinstance(e, OperationCancelled):
+            kill_in_container(cmd, log_callback)
+        raise
+
+    if returncode != 0:
+        err = f"Command failed with code {returncode}"
+        log_message(err, log_callback)
+        raise RuntimeError(err)
+    if progress:
+        progress.finish()
+
+
+def capture_file_to_cmd(dump_path: str, cmd, log_callback) -> str:
+    """ส่ง dump_path เข้า stdin ของ cmd แล้วคืน stdout (เช่น pg_restore -l ที่อ่านแค่ส่วน TOC ต้นไฟล์)"""
+    set_phase(phase_name(cmd))
+    log_message("Running: " + " ".join(cmd) + f" < {dump_path}", log_callback)
+
+    started = time.monotonic()
+    proc = _popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def feed():
+        # เขียนใน thread แยก เพื่อไม่ให้ค้างเมื่อ stdout ของ cmd เต็ม
+        try:
+            with open(dump_path, "rb") as f:
+                reader = open_dump_reader(f)
+                while chunk := reader.read(CHUNK_SIZE):
+                    proc.stdin.write(chunk)
+        except (BrokenPipeError, OSError, ValueError):
+            # cmd อ่านพอแล้วปิด stdin ไปก่อน
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    check_cancelled()
+    feeder = threading.Thread(target=feed, name="capture-feed", daemon=True)
+    feeder.start()
+    try:
+        # ไม่ใช้ communicate() เพราะจะปิด stdin ที่ thread feed ยังเขียนอยู่
+        with on_cancel(proc.kill):
+            out = proc.stdout.read()
+            err = proc.stderr.read()
+            proc.wait()
+        check_cancelled()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        feeder.join()
+        proc.stdout.close()
+        proc.stderr.close()
+    record_phase(phase_name(cmd), time.monotonic() - started, returncode=proc.returncode)
+    if proc.returncode != 0:
+        err = f"Command failed with code {proc.returncode}: {err.decode(errors='replace').strip()}"
+        log_message(err, log_callback)
+        raise RuntimeError(err)
+    return out.decode("utf-8", errors="replace")
+
+
+def stream_cmd_to_cmd(src_cmd, dst_cmd, log_callback, copy_path: str | None = None,
+                      compression: dict | None = None, progress_callback=None, total: int | None = None,
+                      timeout: float | None = None):
+    """ต่อ stdout ของ src_cmd เข้า stdin ของ dst_cmd โดยตรง (ไม่มีไฟล์บน host)
+
+    ส่งข้อมูลผ่าน ProcessEngine ซึ่งรอปลายทาง drain ก่อนอ่านต้นทางต่อ (back-pressure) จึงพักข้อมูล
+    ในหน่วยความจำไม่กี่ MB; ถ้าระบุ copy_path จะเขียนสำเนา dump ลงไฟล์ไปพร้อมกัน
+    """
+    compression = compression or {"codec": "none", "level": None, "threads": 0}
+    copy_note = f" (copy to {copy_path})" if copy_path else ""
+    set_phase("clone " + phase_name(src_cmd) + " | " + phase_name(dst_cmd))
+    log_message("Streaming: " + " ".join(src_cmd) + " | " + " ".join(dst_cmd) + copy_note, log_callback)
+
+    part_path = copy_path + ".part" if copy_path else None
+    progress = Progress("clone", total, progress_callback) if progress_callback else None
+    started = time.monotonic()
+    copy_file = None
+    sums = None
+    writer = None
+
+    def discard_copy():
+        if copy_file:
+            copy_file.close()
+        if sums:
+            sums.abort()
+        if part_path:
+            _remove_quietly(part_path)
+            _remove_quietly(sums_path(part_path))
+
+    token = current_token()
+
+    def on_chunk(chunk):
+        # รันใน thread pool ของ engine จึงใช้ token ของ thread ที่เรียกโดยตรง
+        if token is not None:
+            token.wait_if_paused()
+        if writer:
+            writer.write(chunk)
+        if progress:
+            progress.update(len(chunk))
+
+    try:
+        if part_path:
+            copy_file = open(part_path, "wb")
+            sums = SumsWriter(sums_path(part_path))
+            writer = open_writer(
+                HashingWriter(copy_file, sums), compression["codec"], compression["level"], compression["threads"],
+            )
+        src_returncode, dst_returncode, sent = get_engine().run(pipe_processes(
+            src_cmd, dst_cmd, CHUNK_SIZE, on_chunk, bind_context(lambda line: log_message(line, log_callback)),
+            timeout, _creationflags(),
+        ))
+        if dst_returncode != 0 and src_returncode < 0:
+            # ต้นทางตายเพราะ kill/SIGPIPE หลังปลายทางล้มเหลว ให้รายงานเฉพาะความผิดพลาดของปลายทาง
+            src_returncode = 0
+        if writer:
+            writer.close()
+            copy_file.close()
+            sums.close()
+        record_phase(
+            "clone " + phase_name(src_cmd) + " | " + phase_name(dst_cmd),
+            time.monotonic() - started, sent, src_returncode or dst_returncode,
+        )
+    except BaseException as e:
+        discard_copy()
+        if isinstance(e, OperationCancelled):
+            kill_in_container(src_cmd, log_callback)
+            kill_in_container(dst_cmd, log_callback)
+        raise
+
+    for returncode, side in ((src_returncode, "Source"), (dst_returncode, "Target")):
+        if returncode != 0:
+            discard_copy()
+            err = f"{side} command failed with code {returncode}"
+            log_message(err, log_callback)
+            raise RuntimeError(err)
+
+    if part_path:
+        os.replace(part_path, copy_path)
+        os.replace(sums_path(part_path), sums_path(copy_path))
+    if progress:
+        progress.finish()
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def docker_cmd(endpoint: dict) -> list[str]:
+    """คำสั่ง docker สำหรับ source/target; ถ้ามี docker_host จะสั่งงาน Docker host นั้นผ่าน -H"""
+    docker_host = endpoint.get("docker_host")
+    if docker_host:
+        return ["docker", "-H", docker_host]
+    return ["docker"]
+
+
+def get_transfer_mode(section: dict) -> str:
+    mode = (section.get("transfer") or "stream").lower()
+    if mode not in TRANSFER_MODES:
+        raise RuntimeError(f"Unsupported transfer mode: {mode}")
+    return mode
+
+
+def get_storage(section: dict) -> tuple[str, str]:
+    """คืน (storage, repository path)"""
+    storage = (section.get("storage") or "file").lower()
+    if storage not in STORAGE_MODES:
+        raise RuntimeError(f"Unsupported storage: {storage}")
+    repository = section.get("repository") or os.path.join(BASE_DIR, "repository")
+    return storage, repository
+
+
+def get_parallel(section: dict) -> int:
+    try:
+        parallel = int(section.get("parallel") or 1)
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Invalid parallel value: {section.get('parallel')!r}")
+    return max(parallel, 1)
+
+
+def validate_config(config: dict) -> list[str]:
+    """ตรวจตัวเลือกใน section ของทุก db_type (transfer, storage, compression, ...) คืนรายการปัญหา (ว่าง = ใช้ได้)
+
+    GUI เรียกหลังหน้าต่างแสดงแล้วเพื่อเตือนล่วงหน้า; แต่ละงานยังตรวจ section ของตัวเองอีกครั้งตอนเริ่ม
+    """
+    problems = []
+    for db_type in DB_TYPES:
+        section = config.get(db_type)
+        if not section:
+            continue
+        for check in (
+            get_transfer_mode, get_parallel, get_storage, get_compression, get_retention, get_upload, get_verify,
+        ):
+            try:
+                check(section)
+            except (RuntimeError, TypeError, ValueError) as e:
+                problems.append(f"{db_type}: {e}")
+    return problems
+
+
+def single_transaction_args(db_type: str, section: dict, parallel: int, log_callback) -> list[str]:
+    """argument ของ pg_restore ให้ restore ใน transaction เดียว (section["single_transaction"])
+
+    ถ้า restore ล้มเหลวหรือถูกยกเลิก target จะกลับเป็นสภาพเดิมทั้งหมด; ใช้กับ pg_restore -j ไม่ได้
+    และ MySQL ทำไม่ได้เพราะ DDL ใน dump commit เองทุกคำสั่ง
+    """
+    if not section.get("single_transaction"):
+        return []
+    if db_type.lower() != "postgres":
+        log_message("Warning: single_transaction is not supported for MySQL dumps; ignoring", log_callback)
+        return []
+    if parallel > 1:
+        log_message("Warning: single_transaction cannot be combined with parallel restore; ignoring", log_callback)
+        return []
+    return ["--single-transaction"]
+
+
+def detect_artifact(dump_path: str) -> str:
+    """คืนชนิดของ backup บน host: dir (pg_dump -Fd), tar (tar ของ -Fd) หรือ file"""
+    if os.path.isdir(dump_path):
+        return "dir"
+    with open(dump_path, "rb") as f:
+        reader = open_dump_reader(f)
+        header = b""
+        while len(header) < 512:
+            data = reader.read(512 - len(header))
+            if not data:
+                break
+            header += data
+        reader.close()
+    if header[257:262] == b"ustar":
+        return "tar"
+    return "file"
+
+
+def _is_tar_path(dump_path: str) -> bool:
+    name = dump_path.lower()
+    for ext in CODEC_EXTENSIONS.values():
+        if ext and name.endswith(ext):
+            name = name[: -len(ext)]
+            break
+    return name.endswith(".tar")
+
+
+def _cleanup_container_path(endpoint: dict, path: str, log_callback):
+    container = endpoint["container"]
+    try:
+        # ลบให้ได้แม้งานถูกยกเลิกอยู่
+        with shielded():
+            run_cmd([*docker_cmd(endpoint), "exec", container, "rm", "-rf", path], log_callback)
+    except RuntimeError:
+        log_message(f"Warning: could not remove {container}:{path}", log_callback)
+
+
+def _container_file_info(endpoint: dict, path: str, log_callback) -> tuple[int, str]:
+    """(ขนาด, mtime) ของไฟล์ใน container"""
+    out = capture_cmd(
+        [*docker_cmd(endpoint), "exec", endpoint["container"], "stat", "-c", "%s %Y", path], log_callback,
+    )
+    size, mtime = out.split()[:2]
+    return int(size), mtime
+
+
+def _container_sha256(endpoint: dict, path: str, log_callback) -> str | None:
+    try:
+        out = capture_cmd([*docker_cmd(endpoint), "exec", endpoint["container"], "sha256sum", path], log_callback)
+        return out.split()[0]
+    except (RuntimeError, IndexError) as e:
+        # ยกเลิกระหว่างตรวจต้องไม่ถือว่าข้ามการตรวจได้ (ไม่อย่างนั้น .part จะกลายเป็นไฟล์ dump)
+        if isinstance(e, OperationCancelled):
+            raise
+        log_message("Warning: sha256sum is not available in the container; skipping end-to-end check", log_callback)
+        return None
+
+
+def pull_file_resumable(endpoint: dict, container_path: str, dump_path: str, log_callback, progress_callback=None):
+    """ดึงไฟล์จาก container มาที่ host ด้วย tail -c แทน docker cp เพื่อให้ต่อจากจุดที่ขาดได้
+
+    ระหว่างดึงจะเขียน <dump>.part และ <dump>.part.sums (checksum ราย chunk) ถ้า stream ขาดจะลองต่อจาก
+    byte ที่ได้แล้วอีก TRANSFER_RETRIES ครั้ง ถ้ายังไม่สำเร็จ การรันครั้งถัดไปจะตรวจ chunk ที่ได้แล้วและดึงต่อ
+    เมื่อครบจะเทียบ sha256 ของทั้งไฟล์กับ sha256sum ใน container
+    """
+    container = endpoint["container"]
+    size, mtime = _container_file_info(endpoint, container_path, log_callback)
+    source = f"{container}:{container_path} {size} {mtime}"
+    part_path = dump_path + ".part"
+    part_sums = sums_path(part_path)
+
+    resume = None
+    previous = load_sums(part_sums)
+    if previous and previous["source"] == source:
+        resume = verify_prefix(part_path, previous)
+    sums = SumsWriter(part_sums, source, resume=resume)
+    if sums.completed:
+        log_message(f"Resuming transfer at {sums.completed:,} of {size:,} bytes", log_callback)
+
+    progress = Progress("backup", size, progress_callback) if progress_callback else None
+    started = time.monotonic()
+    resumed_from = sums.completed
+    attempt = 0
+    try:
+        with open(part_path, "r+b" if os.path.exists(part_path) else "wb") as f:
+            while True:
+                written = sums.completed + sums.current_size
+                f.seek(written)
+                f.truncate()
+                if written >= size:
+                    break
+                if progress:
+                    progress.update_to(written)
+                cmd = [*docker_cmd(endpoint), "exec", container, "tail", "-c", f"+{written + 1}", container_path]
+                log_message("Streaming: " + " ".join(cmd) + f" >> {part_path}", log_callback)
+                proc = _popen(cmd, stdout=subprocess.PIPE)
+                try:
+                    with on_cancel(proc.kill):
+                        while True:
+                            wait_if_paused()
+                            chunk = proc.stdout.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            chunk = chunk[: size - written]
+                            f.write(chunk)
+                            sums.update(chunk)
+                            written += len(chunk)
+                            if progress:
+                                progress.update_to(written)
+                        returncode = proc.wait()
+                except BaseException:
+                    proc.kill()
+                    proc.wait()
+                    raise
+                finally:
+                    proc.stdout.close()
+                if returncode == 0 and written == size:
+                    break
+                check_cancelled()
+                attempt += 1
+                if attempt > TRANSFER_RETRIES:
+                    raise RuntimeError(
+                        f"Transfer failed at {written:,} of {size:,} bytes (code {returncode}); "
+                        "run the backup again to resume"
+                    )
+                log_message(
+                    f"Transfer interrupted at {written:,} of {size:,} bytes (code {returncode}); "
+                    f"retry {attempt}/{TRANSFER_RETRIES}",
+                    log_callback,
+                )
+                time.sleep(attempt)
+        digest = sums.close()
+    except BaseException as e:
+        # เก็บ .part และ .part.sums ไว้ให้รันครั้งถัดไป resume ได้ (รวมถึงเมื่อผู้ใช้กด Cancel)
+        sums.abort()
+        if isinstance(e, OperationCancelled):
+            log_message(f"Transfer cancelled at {sums.completed:,} of {size:,} bytes; run again to resume", log_callback)
+        raise
+    record_phase("pull", time.monotonic() - started, size - resumed_from, 0)
+
+    remote = _container_sha256(endpoint, container_path, log_callback)
+    if remote and remote != digest:
+        _remove_quietly(part_path)
+        _remove_quietly(part_sums)
+        raise RuntimeError(f"Checksum mismatch after transfer of {container}:{container_path}")
+    os.replace(part_path, dump_path)
+    os.replace(part_sums, sums_path(dump_path))
+    if progress:
+        progress.finish()
+
+
+def has_pending_pull(endpoint: dict, container_path: str, dump_path: str, log_callback) -> bool:
+    """มี transfer ที่ค้างจากรอบก่อน (<dump>.part.sums) และไฟล์ต้นทางใน container ยังเป็นไฟล์เดิมหรือไม่"""
+    previous = load_sums(sums_path(dump_path + ".part"))
+    if not previous:
+        return False
+    try:
+        size, mtime = _container_file_info(endpoint, container_path, log_callback)
+    except (RuntimeError, ValueError) as e:
+        if isinstance(e, OperationCancelled):
+            raise
+        return False
+    return previous["source"] == f"{endpoint['container']}:{container_path} {size} {mtime}"
+
+
+def push_file_resumable(endpoint: dict, dump_path: str, container_path: str, log_callback, progress_callback=None):
+    """ส่งไฟล์จาก host เข้า container ด้วย cat >> แทน docker cp; ถ้า stream ขาดจะต่อจากขนาดไฟล์ใน container
+
+    ถ้ามี .sums จะตรวจ chunk ระหว่างอ่านไฟล์ (เฉพาะรอบที่เริ่มจาก 0) และเทียบ sha256 ของทั้งไฟล์ใน container ตอนจบ
+    """
+    container = endpoint["container"]
+    size = os.path.getsize(dump_path)
+    sums = load_sums(sums_path(dump_path))
+    if sums and sums["size"] is not None and sums["size"] != size:
+        raise RuntimeError(f"Dump size does not match its checksum file: {dump_path}")
+
+    progress = Progress("restore", size, progress_callback) if progress_callback else None
+    started = time.monotonic()
+    run_cmd([*docker_cmd(endpoint), "exec", container, "rm", "-f", container_path], log_callback)
+    offset = 0
+    attempt = 0
+    while True:
+        cmd = [*docker_cmd(endpoint), "exec", "-i", container, "sh", "-c", 'cat >> "$0"', container_path]
+        log_message("Streaming: " + " ".join(cmd) + f" < {dump_path} (from byte {offset:,})", log_callback)
+        proc = _popen(cmd, stdin=subprocess.PIPE)
+        try:
+            with on_cancel(proc.kill), open(dump_path, "rb") as f:
+                source = VerifyingReader(f, sums) if sums and sums["size"] is not None and offset == 0 else f
+                f.seek(offset)
+                while True:
+                    wait_if_paused()
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    try:
+                        proc.stdin.write(chunk)
+                    except BrokenPipeError:
+                        break
+                    if progress:
+                        progress.update_to(f.tell())
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = proc.wait()
+            check_cancelled()
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        remote_size = _container_file_info(endpoint, container_path, log_callback)[0]
+        if returncode == 0 and remote_size == size:
+            break
+        attempt += 1
+        if attempt > TRANSFER_RETRIES or remote_size > size:
+            raise RuntimeError(f"Transfer failed at {remote_size:,} of {size:,} bytes (code {returncode})")
+        log_message(
+            f"Transfer interrupted at {remote_size:,} of {size:,} bytes (code {returncode}); "
+            f"retry {attempt}/{TRANSFER_RETRIES}",
+            log_callback,
+        )
+        offset = remote_size
+        time.sleep(attempt)
+    record_phase("push", time.monotonic() - started, size, 0)
+
+    if sums and sums["sha256"]:
+        remote = _container_sha256(endpoint, container_path, log_callback)
+        if remote and remote != sums["sha256"]:
+            raise RuntimeError(f"Checksum mismatch after transfer to {container}:{container_path}")
+    if progress:
+        progress.finish()
+
+
+def estimate_db_size(db_type: str, endpoint: dict, log_callback) -> int | None:
+    """ขนาดฐานข้อมูลโดยประมาณ (byte) ใช้เป็น total ของ progress ตอน backup; คืน None ถ้า query ไม่ได้"""
+    container = endpoint["container"]
+    if db_type.lower() == "postgres":
+        cmd = [
+            *docker_cmd(endpoint), "exec", "-e", f"PGPASSWORD={endpoint['db_password']}", container,
+            "psql", "-U", endpoint["db_user"], "-d", endpoint["db_name"], "-Atc",
+            "SELECT pg_database_size(current_database())",
+        ]
+    else:
+        cmd = [
+            *docker_cmd(endpoint), "exec", "-e", f"MYSQL_PWD={endpoint['db_password']}", container,
+            "mysql", "-u", endpoint["db_user"], "-N", "-B", "-e",
+            "SELECT COALESCE(SUM(data_length + index_length), 0) FROM information_schema.tables "
+            f"WHERE table_schema = '{endpoint['db_name']}'",
+        ]
+    try:
+        return int(capture_cmd(cmd, log_callback, timeout=SIZE_QUERY_TIMEOUT).split()[0])
+    except (RuntimeError, ValueError, IndexError, OSError) as e:
+        if isinstance(e, OperationCancelled):
+            raise
+        log_message("Warning: could not estimate database size; progress will have no ETA", log_callback)
+        return None
+
+
+def server_version(db_type: str, endpoint: dict, log_callback) -> str | None:
+    """version ของ database server (เก็บใน catalog) คืน None ถ้า query ไม่ได้"""
+    container = endpoint["container"]
+    if db_type.lower() == "postgres":
+        cmd = [
+            *docker_cmd(endpoint), "exec", "-e", f"PGPASSWORD={endpoint['db_password']}", container,
+            "psql", "-U", endpoint["db_user"], "-d", endpoint["db_name"], "-Atc", "SHOW server_version",
+        ]
+    else:
+        cmd = [
+            *docker_cmd(endpoint), "exec", "-e", f"MYSQL_PWD={endpoint['db_password']}", container,
+            "mysql", "-u", endpoint["db_user"], "-N", "-B", "-e", "SELECT VERSION()",
+        ]
+    try:
+        return capture_cmd(cmd, log_callback, timeout=SIZE_QUERY_TIMEOUT) or None
+    except RuntimeError as e:
+        if isinstance(e, OperationCancelled):
+            raise
+        log_message("Warning: could not read the server version", log_callback)
+        return None
+
+
+def check_database(db_type: str, endpoint: dict, role: str, log_callback):
+    """ต่อฐานข้อมูลด้วย user/password ของ endpoint; ถ้าฐานหรือ user ไม่มีจะ raise RuntimeError ทันที"""
+    if db_type.lower() not in DB_TYPES:
+        raise RuntimeError(f"Unsupported db_type: {db_type}")
+    container = endpoint["container"]
+    if not container or not endpoint.get("db_name"):
+        raise RuntimeError(f"Pre-flight: {role} container/db_name is not configured")
+    if db_type.lower() == "postgres":
+        cmd = [
+            *docker_cmd(endpoint), "exec", "-e", f"PGPASSWORD={endpoint['db_password']}", container,
+            "psql", "-U", endpoint["db_user"], "-d", endpoint["db_name"], "-Atc", "SELECT 1",
+        ]
+    else:
+        cmd = [
+            *docker_cmd(endpoint), "exec", "-e", f"MYSQL_PWD={endpoint['db_password']}", container,
+            "mysql", "-u", endpoint["db_user"], "-N", "-B", endpoint["db_name"], "-e", "SELECT 1",
+        ]
+    try:
+        capture_cmd(cmd, log_callback, timeout=PREFLIGHT_TIMEOUT)
+    except RuntimeError as e:
+        if isinstance(e, OperationCancelled):
+            raise
+        raise RuntimeError(
+            f"Pre-flight: cannot connect to {role} database '{endpoint['db_name']}' as '{endpoint['db_user']}' "
+            f"in {container}: {e}"
+        )
+
+
+def container_free_space(endpoint: dict, log_callback, path: str = "/backup") -> int | None:
+    """พื้นที่ว่าง (byte) ของ volume ที่ path ใน container อยู่; คืน None ถ้า df ใช้ไม่ได้"""
+    try:
+        out = capture_cmd([
+            *docker_cmd(endpoint), "exec", endpoint["container"], "sh", "-c", f"mkdir -p {path} && df -Pk {path}",
+        ], log_callback, timeout=PREFLIGHT_TIMEOUT)
+        return int(out.splitlines()[-1].split()[3]) * 1024
+    except (RuntimeError, ValueError, IndexError) as e:
+        if isinstance(e, OperationCancelled):
+            raise
+        log_message(f"Warning: could not check free space in {endpoint['container']}:{path}", log_callback)
+        return None
+
+
+def _require_space(where: str, free: int | None, needed: int, log_callback):
+    if free is None:
+        return
+    if free < needed:
+        raise RuntimeError(
+            f"Pre-flight: not enough space on {where}: {free / 1024 ** 3:,.2f} GiB free, "
+            f"about {needed / 1024 ** 3:,.2f} GiB needed"
+        )
+    log_message(f"Pre-flight: {where} has {free / 1024 ** 3:,.2f} GiB free ({needed / 1024 ** 3:,.2f} GiB needed)",
+                log_callback)
+
+
+def _host_free_space(path: str) -> int:
+    # ไฟล์ยังไม่มี วัดจาก directory ที่มีอยู่จริงใกล้ที่สุด
+    path = os.path.dirname(os.path.abspath(path))
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path).free
+
+
+def estimate_backup_size(db_type: str, section: dict, db_size: int | None, codec: str | None = None) -> int | None:
+    """ขนาดไฟล์ backup ที่คาดไว้: ใช้ backup ล่าสุดของ job ใน catalog ถ้ามี ไม่งั้นประมาณจากขนาดฐานข้อมูล
+
+    codec = "none" ใช้ประมาณ dump ดิบที่เขียนใน container (ยังไม่ผ่าน codec ของ host)
+    """
+    codec = codec or get_compression(section)["codec"]
+    try:
+        previous = [
+            b for b in list_backups(get_catalog_path(), job=section.get("name") or db_type.lower(), limit=5)
+            if b["codec"] == codec and b["storage"] == "file" and b["size"]
+        ]
+    except sqlite3.Error:
+        previous = []
+    if previous:
+        return int(previous[0]["size"] * PREFLIGHT_MARGIN)
+    if db_size is None:
+        return None
+    ratio = PG_CUSTOM_RATIO if db_type.lower() == "postgres" and codec == "none" else OUTPUT_RATIO[codec]
+    return int(db_size * ratio * PREFLIGHT_MARGIN)
+
+
+def preflight_backup(db_type: str, section: dict, dump_path: str, log_callback) -> int | None:
+    """ตรวจก่อน backup: ต่อ source ได้, พื้นที่บน host และ /backup ใน container พอ; คืนขนาดฐานข้อมูล (ถ้ารู้)"""
+    src = section["source"]
+    check_database(db_type, src, "source", log_callback)
+    db_size = estimate_db_size(db_type, src, log_callback)
+    if not section.get("preflight", True):
+        return db_size
+    needed = estimate_backup_size(db_type, section, db_size)
+    if needed is None:
+        log_message("Warning: could not estimate the backup size; skipping the free space check", log_callback)
+        return db_size
+
+    # copy แบบไฟล์เดียวได้ dump ดิบทั้งใน container และบน host (codec/repository ใช้ไม่ได้);
+    # postgres แบบ parallel dump ดิบลง container แล้วบีบอัดตอนดึงออกมา
+    plain_copy = get_transfer_mode(section) == "copy" and get_parallel(section) == 1
+    in_container = plain_copy or (db_type.lower() == "postgres" and get_parallel(section) > 1)
+    raw = (estimate_backup_size(db_type, section, db_size, codec="none") or needed) if in_container else needed
+
+    storage, repository = get_storage(section)
+    if storage == "repository" and not plain_copy:
+        # chunk ใหม่ไม่เกินขนาดข้อมูลที่บีบอัดแล้ว (manifest เองเล็กมาก)
+        _require_space(f"repository {repository}", _host_free_space(os.path.join(repository, "chunks")),
+                       needed, log_callback)
+    else:
+        _require_space(f"host ({os.path.dirname(os.path.abspath(dump_path))})", _host_free_space(dump_path),
+                       raw if plain_copy else needed, log_callback)
+    if in_container:
+        _require_space(f"{src['container']}:/backup", container_free_space(src, log_callback), raw, log_callback)
+    return db_size
+
+
+def _restore_payload_size(dump_path: str) -> int:
+    # ขนาดขั้นต่ำของข้อมูลที่ส่งเข้า container (ไฟล์บีบอัดจะใหญ่ขึ้นหลังคลาย จึงใช้เป็นแค่ขอบล่าง)
+    if os.path.isdir(dump_path):
+        return path_size(dump_path)
+    if is_manifest_file(dump_path):
+        with open(dump_path, "rb") as f:
+            return load_manifest(f)["size"]
+    return os.path.getsize(dump_path)
+
+
+def remote_settings(section: dict) -> dict:
+    """การตั้งค่า upload ของ job สำหรับอ่าน s3://bucket/key กลับ (bucket มาจาก path)"""
+    upload = get_upload(section)
+    if not upload:
+        raise RuntimeError("Restoring from object storage needs the upload settings (url, keys) of this job")
+    return upload
+
+
+def preflight_restore(db_type: str, section: dict, dump_path: str, tables, log_callback):
+    """ตรวจก่อน restore: มีไฟล์, ต่อฐานและ user ของ target ได้, /backup ใน container มีที่พอถ้าต้องส่งไฟล์เข้าไป"""
+    tgt = section["target"]
+    if is_remote_path(dump_path):
+        bucket, key = parse_remote_path(dump_path)
+        client = S3Client(remote_settings(section))
+        try:
+            if client.head_object(bucket, key) is None:
+                raise RuntimeError(f"Pre-flight: object does not exist: {dump_path}")
+        finally:
+            client.close()
+        check_database(db_type, tgt, "target", log_callback)
+        return
+    if not os.path.exists(dump_path):
+        raise RuntimeError(f"Pre-flight: dump file does not exist: {dump_path}")
+    check_database(db_type, tgt, "target", log_callback)
+    if not section.get("preflight", True):
+        return
+    kind = detect_artifact(dump_path)
+    if db_type.lower() == "postgres":
+        in_container = (
+            get_parallel(section) > 1 or kind != "file" or tables
+            or (get_transfer_mode(section) == "copy" and detect_file_codec(dump_path) == "none"
+                and not is_manifest_file(dump_path))
+        )
+    else:
+        in_container = kind != "dir" and get_transfer_mode(section) == "copy" and detect_file_codec(dump_path) == "none"
+    if in_container:
+        _require_space(f"{tgt['container']}:/backup", container_free_space(tgt, log_callback),
+                       _restore_payload_size(dump_path), log_callback)
+
+
+def preflight_clone(db_type: str, section: dict, copy_path: str | None, log_callback) -> int | None:
+    """ตรวจก่อน clone: ต่อ source และ target ได้, พื้นที่บน host พอสำหรับสำเนา (ถ้ามี); คืนขนาดฐานข้อมูล"""
+    check_database(db_type, section["source"], "source", log_callback)
+    check_database(db_type, section["target"], "target", log_callback)
+    db_size = estimate_db_size(db_type, section["source"], log_callback)
+    if copy_path and section.get("preflight", True):
+        needed = estimate_backup_size(db_type, section, db_size)
+        if needed is not None:
+            _require_space(f"host ({os.path.dirname(os.path.abspath(copy_path))})", _host_free_space(copy_path),
+                           needed, log_callback)
+    return db_size
+
+
+def _pg_parallel_backup(src: dict, dump_path: str, parallel: int, compression: dict,
+                        repository: str | None, log_callback, progress_callback=None, total=None, table_args=()):
+    container = src["container"]
+    # pg_dump -j ใช้ได้กับ directory format (-Fd) เท่านั้น จึงต้อง dump ลง /backup ใน container ก่อน
+    container_dir = "/backup/" + os.path.basename(dump_path) + ".d"
+
+    as_tar = _is_tar_path(dump_path)
+    if not as_tar and os.path.exists(dump_path):
+        raise RuntimeError(f"Backup directory already exists: {dump_path}")
+
+    run_cmd([*docker_cmd(src), "exec", container, "mkdir", "-p", "/backup"], log_callback)
+    run_cmd([*docker_cmd(src), "exec", container, "rm", "-rf", container_dir], log_callback)
+    try:
+        run_cmd([
+            *docker_cmd(src), "exec", "-e", f"PGPASSWORD={src['db_password']}", container,
+            "pg_dump", "-U", src["db_user"], "-d", src["db_name"],
+            "-Fd", "-j", str(parallel), "-C", "-f", container_dir, *table_args,
+        ], log_callback)
+
+        if as_tar:
+            # ห่อ directory เป็น tar แล้ว stream ออกมาเป็นไฟล์เดียวบน host
+            stream_cmd_to_file(
+                [*docker_cmd(src), "exec", container, "tar", "-C", container_dir, "-cf", "-", "."],
+                dump_path, log_callback, compression, repository, progress_callback, total,
+            )
+        else:
+            run_cmd([*docker_cmd(src), "cp", f"{container}:{container_dir}", dump_path], log_callback)
+    finally:
+        _cleanup_container_path(src, container_dir, log_callback)
+
+
+@contextmanager
+def _pg_dump_in_container(tgt: dict, dump_path: str, kind: str, mode: str, log_callback, progress_callback=None):
+    """ส่ง backup (file/dir/tar) เข้า /backup ของ target container แล้ว yield path ใน container; ลบทิ้งเมื่อจบ"""
+    container = tgt["container"]
+    container_path = "/backup/" + os.path.basename(dump_path.rstrip("/\\"))
+    if kind == "tar":
+        container_path += ".d"
+
+    run_cmd([*docker_cmd(tgt), "exec", container, "mkdir", "-p", "/backup"], log_callback)
+    run_cmd([*docker_cmd(tgt), "exec", container, "rm", "-rf", container_path], log_callback)
+    try:
+        if kind == "dir":
+            run_cmd([*docker_cmd(tgt), "cp", dump_path, f"{container}:{container_path}"], log_callback)
+        elif kind == "tar":
+            run_cmd([*docker_cmd(tgt), "exec", container, "mkdir", "-p", container_path], log_callback)
+            stream_file_to_cmd(
+                dump_path,
+                [*docker_cmd(tgt), "exec", "-i", container, "tar", "-C", container_path, "-xf", "-"],
+                log_callback, progress_callback,
+            )
+        elif mode == "stream":
+            # pg_restore -j ต้องอ่านไฟล์ที่ seek ได้ จึง stream ลงไฟล์ใน container ก่อน
+            stream_file_to_cmd(
+                dump_path,
+                [*docker_cmd(tgt), "exec", "-i", container, "sh", "-c", 'cat > "$0"', container_path],
+                log_callback, progress_callback,
+            )
+        else:
+            push_file_resumable(tgt, dump_path, container_path, log_callback, progress_callback)
+        yield container_path
+    finally:
+        _cleanup_container_path(tgt, container_path, log_callback)
+
+
+def _pg_restore_in_container(tgt: dict, dump_path: str, kind: str, mode: str, parallel: int, log_callback,
+                             progress_callback=None, tables=None, extra_args=()):
+    container = tgt["container"]
+    with _pg_dump_in_container(tgt, dump_path, kind, mode, log_callback, progress_callback) as container_path:
+        restore_cmd = [
+            *docker_cmd(tgt), "exec", "-e", f"PGPASSWORD={tgt['db_password']}", container,
+            "pg_restore", "-U", tgt["db_user"],
+            "-d", tgt["db_name"], *extra_args,
+        ]
+        if parallel > 1:
+            restore_cmd += ["-j", str(parallel)]
+        if not tables:
+            run_cmd(restore_cmd + ["--clean", "--if-exists", "--no-owner", container_path], log_callback)
+            return
+        list_path = container_path.rstrip("/") + ".list"
+        try:
+            _pg_restore_tables(tgt, container_path, list_path, tables, log_callback)
+            # ปิด trigger (รวม foreign key) ระหว่างโหลด: ลำดับตารางใน TOC ไม่รับประกันว่าแม่มาก่อนลูก
+            run_cmd(restore_cmd + ["--data-only", "--disable-triggers", "-L", list_path, container_path], log_callback)
+        finally:
+            _cleanup_container_path(tgt, list_path, log_callback)
+
+
+def _pg_restore_tables(tgt: dict, container_path: str, list_path: str, tables, log_callback):
+    """เตรียม restore บางตาราง: เลือก TABLE DATA จาก TOC เขียนเป็น list file ใน container แล้ว TRUNCATE ตารางนั้น
+
+    restore เฉพาะข้อมูลเข้าโครงสร้างเดิมของ target จึงไม่ลบ index/constraint ของตาราง
+    TRUNCATE ใช้ CASCADE (ไม่อย่างนั้นล้มเมื่อมีตารางอื่นมี foreign key ชี้มา) ตารางที่ถูกล้างตามไปด้วยจะแจ้งเตือนก่อน
+    """
+    container = tgt["container"]
+    entries = parse_toc(capture_cmd(
+        [*docker_cmd(tgt), "exec", container, "pg_restore", "-l", container_path], log_callback,
+    ))
+    selected = select_tables(toc_tables(entries), tables, [])
+    if not selected:
+        raise RuntimeError("No tables in the dump match: " + ", ".join(tables))
+    log_message(f"Restoring data of {len(selected)} table(s): {', '.join(selected)}", log_callback)
+
+    capture_cmd(
+        [*docker_cmd(tgt), "exec", "-i", container, "sh", "-c", 'cat > "$0"', list_path],
+        log_callback, input=toc_data_list(entries, selected).encode("utf-8"),
+    )
+    psql = [
+        *docker_cmd(tgt), "exec", "-e", f"PGPASSWORD={tgt['db_password']}", container,
+        "psql", "-U", tgt["db_user"], "-d", tgt["db_name"], "-v", "ON_ERROR_STOP=1",
+    ]
+    dependents = [
+        name for name in capture_cmd(psql + ["-Atc", pg_fk_dependents_sql(selected)], log_callback).splitlines()
+        if name and name not in selected
+    ]
+    if dependents:
+        log_message(
+            f"WARNING: TRUNCATE ... CASCADE also empties {len(dependents)} table(s) with foreign keys to the "
+            f"selected tables (not restored): {', '.join(dependents)}",
+            log_callback,
+        )
+    run_cmd(psql + [
+        "-c", "TRUNCATE TABLE " + ", ".join(quote_pg_table(name) for name in selected) + " CASCADE",
+    ], log_callback)
+
+
+def build_dump_cmd(db_type: str, src: dict, table_args=(), options=()) -> list[str]:
+    """คำสั่ง dump ที่เขียนออก stdout (pg_dump -Fc หรือ mysqldump); table_args จาก dump_table_args
+
+    options ต่อท้ายชื่อโปรแกรม (ก่อนชื่อฐานและรายชื่อตาราง) เช่น --single-transaction
+    """
+    container = src["container"]
+    if db_type.lower() == "postgres":
+        return [
+            *docker_cmd(src), "exec", "-e", f"PGPASSWORD={src['db_password']}", container,
+            "pg_dump", *options, "-U", src["db_user"], "-d", src["db_name"], "-Fc", "-C", *table_args,
+        ]
+    return [
+        *docker_cmd(src), "exec", "-e", f"MYSQL_PWD={src['db_password']}", container,
+        "mysqldump", *options, "-u", src["db_user"], src["db_name"], *table_args,
+    ]
+
+
+def list_mysql_tables(endpoint: dict, log_callback) -> list[tuple[str, int]]:
+    """ตารางจริง (ไม่รวม view) ของฐาน MySQL พร้อมขนาดโดยประมาณ เรียงจากใหญ่ไปเล็ก"""
+    out = capture_cmd([
+        *docker_cmd(endpoint), "exec", "-e", f"MYSQL_PWD={endpoint['db_password']}", endpoint["container"],
+        "mysql", "-u", endpoint["db_user"], "-N", "-B", "-e",
+        "SELECT table_name, COALESCE(data_length + index_length, 0) FROM information_schema.tables "
+        f"WHERE table_schema = '{endpoint['db_name']}' AND table_type = 'BASE TABLE' ORDER BY 2 DESC, 1",
+    ], log_callback)
+    tables = []
+    for line in out.splitlines():
+        parts = line.split("\t")
+        if len(parts) >= 2 and parts[0]:
+            try:
+                tables.append((parts[0], int(parts[1])))
+            except ValueError:
+                tables.append((parts[0], 0))
+    return tables
+
+
+def dump_table_args(db_type: str, section: dict, src: dict, log_callback) -> list[str]:
+    """argument เลือกตารางของ pg_dump (-t/-T ใช้ pattern ได้เอง) หรือรายชื่อตารางของ mysqldump"""
+    include, exclude = get_table_filter(section)
+    if not include and not exclude:
+        return []
+    if db_type.lower() == "postgres":
+        args = []
+        for pattern in include:
+            args += ["-t", pattern]
+        for pattern in exclude:
+            args += ["-T", pattern]
+        return args
+    # mysqldump ไม่รองรับ pattern จึงต้องดึงรายชื่อตารางมากรองเอง
+    tables = select_tables([name for name, _ in list_mysql_tables(src, log_callback)], include, exclude)
+    if not tables:
+        raise RuntimeError("No tables match the include/exclude patterns")
+    return tables
+
+
+def build_stream_restore_cmd(db_type: str, tgt: dict, extra_args=()) -> list[str]:
+    """คำสั่ง restore ที่อ่าน dump จาก stdin (pg_restore หรือ mysql); extra_args ใช้กับ pg_restore เท่านั้น"""
+    container = tgt["container"]
+    if db_type.lower() == "postgres":
+        return [
+            *docker_cmd(tgt), "exec", "-i", "-e", f"PGPASSWORD={tgt['db_password']}", container,
+            "pg_restore", "-U", tgt["db_user"],
+            "-d", tgt["db_name"],
+            "--clean", "--if-exists", "--no-owner", *extra_args,
+        ]
+    return [
+        *docker_cmd(tgt), "exec", "-i", "-e", f"MYSQL_PWD={tgt['db_password']}", container,
+        "mysql", "-u", tgt["db_user"], tgt["db_name"],
+    ]
+
+
+def _aggregate_progress(phase: str, total: int | None, progress_callback):
+    """รวม progress ของหลาย stream ที่ทำพร้อมกันเป็น event เดียว คืน (progress, ตัวสร้าง callback ต่อ stream)"""
+    if not progress_callback:
+        return None, lambda key: None
+    progress = Progress(phase, total, progress_callback)
+    lock = threading.Lock()
+    sizes = {}
+
+    def for_stream(key):
+        def on_event(event):
+            with lock:
+                sizes[key] = event["bytes"]
+                progress.update_to(sum(sizes.values()))
+        return on_event
+
+    return progress, for_stream
+
+
+# เวลาสูงสุดที่ถือ global read lock รอให้ทุก worker เปิด snapshot (write บน source ถูกบล็อกตลอดช่วงนี้)
+SNAPSHOT_LOCK_TIMEOUT = 60
+
+# ไม่ lock ถ้ามี query ที่รันนานกว่านี้ (วินาที): FLUSH TABLES WITH READ LOCK ต้องรอ query นั้นจบ
+# และระหว่างรอ write ทั้งฐานจะค้างไปด้วย
+LONG_QUERY_GUARD = 60
+
+
+def _mysql_lock_for_snapshot(src: dict, log_callback):
+    """เปิด session ที่ถือ FLUSH TABLES WITH READ LOCK ไว้ ให้ worker ทุกตัวเปิด snapshot ที่จุดเดียวกัน
+
+    คืน process ของ session (ปลดด้วย _mysql_unlock) หรือ None ถ้า lock ไม่ได้ เช่นไม่มีสิทธิ์ RELOAD
+    หรือมี query ที่รันนานค้างอยู่; กรณีนั้นแต่ละ worker ยังได้ snapshot ของตัวเองแต่ไม่ตรงกันระหว่าง worker
+    """
+    container = src["container"]
+    long_queries = capture_cmd([
+        *docker_cmd(src), "exec", "-e", f"MYSQL_PWD={src['db_password']}", container,
+        "mysql", "-u", src["db_user"], "-N", "-B", "-e",
+        "SELECT COUNT(*) FROM information_schema.processlist "
+        f"WHERE command = 'Query' AND time > {LONG_QUERY_GUARD} AND id <> CONNECTION_ID()",
+    ], log_callback)
+    if long_queries not in ("", "0"):
+        log_message(
+            f"Warning: {long_queries} queries have run longer than {LONG_QUERY_GUARD}s; "
+            "tables are dumped without a shared snapshot",
+            log_callback,
+        )
+        return None
+
+    cmd = [
+        *docker_cmd(src), "exec", "-i", "-e", f"MYSQL_PWD={src['db_password']}", container,
+        "mysql", "-u", src["db_user"], "-N", "-B", "--unbuffered",
+    ]
+    log_message("Running: " + " ".join(cmd), log_callback)
+    proc = _popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        with on_cancel(proc.kill):
+            try:
+                proc.stdin.write(
+                    f"SET SESSION lock_wait_timeout = {SNAPSHOT_LOCK_TIMEOUT};\n"
+                    "FLUSH TABLES WITH READ LOCK;\n"
+                    "SELECT 'locked';\n".encode()
+                )
+                proc.stdin.flush()
+            except BrokenPipeError:
+                pass
+            # mysql ออกทันทีเมื่อคำสั่งใด error จึงไม่ค้างรอบรรทัดนี้
+            line = proc.stdout.readline()
+        check_cancelled()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    if line.strip() == b"locked":
+        return proc
+
+    _close_quietly(proc.stdin)
+    error = proc.stderr.read().decode(errors="replace").strip()
+    proc.wait()
+    for stream in (proc.stdout, proc.stderr):
+        _close_quietly(stream)
+    log_message(
+        f"Warning: could not lock tables for a shared snapshot ({error or 'no response'}); "
+        "tables are dumped without a shared snapshot",
+        log_callback,
+    )
+    return None
+
+
+def _mysql_unlock(proc, locked_at: float, log_callback):
+    """ปลด global read lock ที่ได้จาก _mysql_lock_for_snapshot แล้วปิด session"""
+    try:
+        proc.stdin.write(b"UNLOCK TABLES;\n")
+        proc.stdin.close()
+    except OSError:
+        # session หลุดไปแล้ว lock ก็ถูกปลดไปพร้อมกัน
+        pass
+    returncode = proc.wait()
+    for stream in (proc.stdout, proc.stderr):
+        _close_quietly(stream)
+    held = time.monotonic() - locked_at
+    record_phase("mysql snapshot lock", held, returncode=returncode)
+    log_message(f"Released global read lock after {held:.2f}s", log_callback)
+
+
+def _close_quietly(stream):
+    try:
+        stream.close()
+    except OSError:
+        pass
+
+
+def _wait_for_snapshots(ready: list, futures: list, log_callback):
+    """รอจน worker ทุกตัวเปิด transaction แล้ว (หรือจบไปก่อนเพราะ error) ไม่เกิน SNAPSHOT_LOCK_TIMEOUT"""
+    deadline = time.monotonic() + SNAPSHOT_LOCK_TIMEOUT
+    for event, future in zip(ready, futures):
+        while not event.wait(0.05) and not future.done():
+            check_cancelled()
+            if time.monotonic() > deadline:
+                log_message(
+                    f"Warning: not every dump started within {SNAPSHOT_LOCK_TIMEOUT}s; "
+                    "releasing the lock and the snapshot may not be shared",
+                    log_callback,
+                )
+                return
+
+
+def _mysql_dump_tables(src: dict, tables: list[str], dump_path: str, ext: str, compression: dict,
+                       repository: str | None, log_callback, progress_callback=None, on_snapshot=None):
+    """mysqldump --single-transaction หลายตารางใน stream เดียว แล้วแยกเขียนเป็นไฟล์ <table><ext> ใน dump_path
+
+    on_snapshot() ถูกเรียกเมื่อตารางแรกเริ่มออกมา (mysqldump เปิด transaction ไปแล้ว)
+    """
+    check_cancelled()
+    cmd = build_dump_cmd("mysql", src, tables, ["--single-transaction"])
+    log_message("Streaming: " + " ".join(cmd) + f" > {dump_path}{os.sep}<table>{ext}", log_callback)
+
+    progress = Progress("backup", None, progress_callback) if progress_callback else None
+    started = time.monotonic()
+    transferred = 0
+    files = []
+
+    def open_table(name):
+        if files:
+            files[-1].close()
+        elif on_snapshot:
+            on_snapshot()
+        files.append(_DumpFileWriter(os.path.join(dump_path, name + ext), compression, repository))
+        return files[-1]
+
+    splitter = TableSplitter(open_table)
+    proc = _popen(cmd, stdout=subprocess.PIPE)
+    try:
+        with on_cancel(proc.kill):
+            while True:
+                wait_if_paused()
+                chunk = proc.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                splitter.write(chunk)
+                transferred += len(chunk)
+                if progress:
+                    progress.update(len(chunk))
+            splitter.close()
+            if files:
+                files[-1].close()
+        returncode = proc.wait()
+        record_phase("stream " + phase_name(cmd), time.monotonic() - started, transferred, returncode)
+        check_cancelled()
+    except BaseException as e:
+        proc.kill()
+        proc.wait()
+        for f in files:
+            f.discard()
+        if isinstance(e, OperationCancelled):
+            kill_in_container(cmd, log_callback)
+        raise
+    finally:
+        proc.stdout.close()
+
+    missing = [table for table in tables if table not in splitter.tables]
+    if returncode != 0 or missing:
+        for f in files:
+            f.discard()
+        err = f"Command failed with code {returncode}"
+        if returncode == 0:
+            err = "mysqldump output is missing tables: " + ", ".join(missing)
+        log_message(err, log_callback)
+        raise RuntimeError(err)
+    for f in files:
+        f.commit()
+    if progress:
+        progress.finish()
+
+
+def _mysql_parallel_backup(src: dict, section: dict, dump_path: str, parallel: int, compression: dict,
+                           repository: str | None, log_callback, progress_callback=None, total=None):
+    """mysqldump พร้อมกัน parallel stream จาก snapshot เดียวกัน ลง directory dump_path แบบตารางละไฟล์
+
+    ตารางถูกแบ่งให้ worker ตามขนาดให้แต่ละตัวเสร็จใกล้กัน; worker ทุกตัวเปิด --single-transaction
+    ระหว่างที่อีก session ถือ FLUSH TABLES WITH READ LOCK ไว้ จึงเห็นข้อมูล ณ จุดเดียวกันทั้งหมด
+    (lock ถูกปลดทันทีที่ทุก worker เปิด transaction แล้ว) เหมือน snapshot ที่ pg_dump -j ใช้ร่วมกัน
+    แต่ละตารางเป็นไฟล์ <table>.sql (+ นามสกุลของ codec หรือ .manifest) ที่ restore แยกกันได้
+    หมายเหตุ: ไม่รวม view/routine
+    """
+    if os.path.exists(dump_path):
+        raise RuntimeError(f"Backup directory already exists: {dump_path}")
+
+    include, exclude = get_table_filter(section)
+    sizes = dict(list_mysql_tables(src, log_callback))
+    tables = select_tables(list(sizes), include, exclude)
+    if not tables:
+        raise RuntimeError("No tables to back up")
+    ext = ".sql" + (".manifest" if repository else CODEC_EXTENSIONS[compression["codec"]])
+    groups = assign_tables({table: sizes[table] for table in tables}, parallel)
+    log_message(
+        f"Dumping {len(tables)} tables with {len(groups)} parallel streams from one snapshot "
+        "(views/routines are not included)",
+        log_callback,
+    )
+
+    progress, for_stream = _aggregate_progress("backup", total, progress_callback)
+    started = time.monotonic()
+    os.makedirs(dump_path)
+    try:
+        lock = _mysql_lock_for_snapshot(src, log_callback)
+        locked_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            ready = [threading.Event() for _ in groups]
+            futures = [
+                pool.submit(
+                    bind_token(bind_context(_mysql_dump_tables)), src, group, dump_path, ext, compression, repository,
+                    log_callback, for_stream(i), ready[i].set,
+                )
+                for i, group in enumerate(groups)
+            ]
+            # ปลด lock ก่อนรอ worker ทำงานจนเสร็จเสมอ แม้ worker บางตัวล้มเหลวหรือถูกยกเลิก
+            try:
+                if lock:
+                    _wait_for_snapshots(ready, futures, log_callback)
+            finally:
+                if lock:
+                    _mysql_unlock(lock, locked_at, log_callback)
+            for future in futures:
+                future.result()
+    except BaseException:
+        shutil.rmtree(dump_path, ignore_errors=True)
+        raise
+    written = sum(os.path.getsize(path) for path in _mysql_dump_dir_tables(dump_path).values())
+    record_phase("parallel mysqldump", time.monotonic() - started, written, 0)
+    if progress:
+        progress.finish()
+
+
+def _mysql_dump_dir_tables(dump_path: str) -> dict:
+    """ชื่อตาราง -> ไฟล์ ใน directory ที่ได้จาก _mysql_parallel_backup"""
+    tables = {}
+    for name in sorted(os.listdir(dump_path)):
+        if ".sql" in name and not name.endswith((".part", SUMS_SUFFIX)):
+            tables[name[: name.index(".sql")]] = os.path.join(dump_path, name)
+    return tables
+
+
+def _mysql_restore_dir(tgt: dict, dump_path: str, parallel: int, tables, log_callback, progress_callback=None):
+    """restore directory แบบตารางละไฟล์ พร้อมกัน parallel ตัว (ไฟล์ใหญ่ก่อน)
+
+    secondary index และ foreign key ถูกตัดออกจาก CREATE TABLE ระหว่างโหลดข้อมูล แล้วค่อยเพิ่มด้วย
+    ALTER TABLE เมื่อโหลดครบทุกตาราง (index ก่อน แล้วจึง foreign key)
+    """
+    files = _mysql_dump_dir_tables(dump_path)
+    names = select_tables(list(files), tables, []) if tables else list(files)
+    if not names:
+        raise RuntimeError(f"No matching tables in {dump_path}")
+    names.sort(key=lambda name: os.path.getsize(files[name]), reverse=True)
+    log_message(
+        f"Restoring {len(names)} tables with {parallel} parallel streams (indexes are built after the data load)",
+        log_callback,
+    )
+
+    total = sum(os.path.getsize(files[name]) for name in names)
+    progress, for_stream = _aggregate_progress("restore", total, progress_callback)
+    readers = {}
+
+    def defer_indexes(name):
+        def transform(reader):
+            readers[name] = DeferredIndexReader(reader)
+            return readers[name]
+        return transform
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = [
+            pool.submit(
+                bind_token(bind_context(stream_file_to_cmd)), files[name], build_stream_restore_cmd("mysql", tgt),
+                log_callback, for_stream(name), None, defer_indexes(name),
+            )
+            for name in names
+        ]
+        for future in futures:
+            future.result()
+    record_phase("parallel mysql", time.monotonic() - started, total, 0)
+
+    statements = [readers[name].alter_statements() for name in names if name in readers]
+    _mysql_alter_tables(tgt, [index for index, _ in statements if index], parallel, "indexes", log_callback)
+    _mysql_alter_tables(tgt, [fk for _, fk in statements if fk], parallel, "foreign keys", log_callback)
+    if progress:
+        progress.finish()
+
+
+def _mysql_alter_tables(tgt: dict, statements: list[str], parallel: int, what: str, log_callback):
+    """รัน ALTER TABLE (ตารางละคำสั่ง) พร้อมกัน parallel ตัว
+
+    foreign_key_checks=0 ทำให้เพิ่ม foreign key ได้โดยไม่ต้องไล่ตรวจทุกแถว (ข้อมูลมาจาก snapshot เดียวกันแล้ว)
+    """
+    if not statements:
+        return
+    log_message(f"Adding {what} to {len(statements)} tables", log_callback)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = [
+            pool.submit(bind_token(bind_context(run_cmd)), [
+                *docker_cmd(tgt), "exec", "-e", f"MYSQL_PWD={tgt['db_password']}", tgt["container"],
+                "mysql", "-u", tgt["db_user"], tgt["db_name"], "-e", "SET SESSION foreign_key_checks = 0; " + statement,
+            ], log_callback)
+            for statement in statements
+        ]
+        for future in futures:
+            future.result()
+    record_phase(f"mysql add {what}", time.monotonic() - started, returncode=0)
+
+
+def list_dump_tables(db_type: str, config: dict, dump_path: str, log_callback=None,
+                     progress_callback=None) -> list[str]:
+    """รายชื่อตารางใน backup (schema.table สำหรับ Postgres) เพื่อให้ผู้ใช้เลือก restore บางตาราง
+
+    Postgres อ่าน TOC ด้วย pg_restore -l ใน target container, MySQL ใช้ได้กับ backup แบบตารางละไฟล์
+    """
+    section = config.get(db_type)
+    if not section:
+        raise RuntimeError(f"Config not found for db_type={db_type}")
+    tgt = section["target"]
+    kind = detect_artifact(dump_path)
+
+    if db_type.lower() == "mysql":
+        if kind != "dir":
+            raise RuntimeError("Table listing for MySQL needs a per-table backup (parallel > 1)")
+        return list(_mysql_dump_dir_tables(dump_path))
+
+    # TOC ที่บันทึกไว้ใน catalog ตอน backup ใช้ได้ทันทีโดยไม่ต้องรัน pg_restore -l
+    tables = cached_tables(get_catalog_path(), dump_path)
+    if tables is not None:
+        return tables
+
+    if kind == "file":
+        # pg_restore -l อ่านแค่ TOC ต้นไฟล์ จึงไม่ต้องส่งไฟล์ทั้งก้อนเข้า container
+        toc = capture_file_to_cmd(dump_path, [
+            *docker_cmd(tgt), "exec", "-i", tgt["container"], "pg_restore", "-l",
+        ], log_callback)
+    else:
+        with _pg_dump_in_container(tgt, dump_path, kind, "stream", log_callback, progress_callback) as container_path:
+            toc = capture_cmd(
+                [*docker_cmd(tgt), "exec", tgt["container"], "pg_restore", "-l", container_path], log_callback,
+            )
+    return toc_tables(parse_toc(toc))
+
+
+def backup_tables(db_type: str, section: dict, dump_path: str, log_callback) -> list[str] | None:
+    """รายชื่อตารางใน backup ที่เพิ่งทำ (TOC summary ของ catalog); คืน None ถ้าหาไม่ได้โดยไม่เปิดทั้งไฟล์
+
+    Postgres อ่าน TOC ด้วย pg_restore -l ใน source container (ไฟล์ส่งแค่ส่วนต้น, -Fd ส่งแค่ toc.dat)
+    ส่วน tar ของ -Fd ต้องแตกทั้งไฟล์จึงข้าม; MySQL ใช้ชื่อไฟล์ของแต่ละตารางหรือรายชื่อตารางจากต้นทาง
+    """
+    src = section["source"]
+    kind = detect_artifact(dump_path)
+    try:
+        if db_type.lower() == "mysql":
+            if kind == "dir":
+                return list(_mysql_dump_dir_tables(dump_path))
+            include, exclude = get_table_filter(section)
+            return select_tables([name for name, _ in list_mysql_tables(src, log_callback)], include, exclude)
+        if kind == "file":
+            toc = capture_file_to_cmd(dump_path, [
+                *docker_cmd(src), "exec", "-i", src["container"], "pg_restore", "-l",
+            ], log_callback)
+        elif kind == "dir":
+            # pg_restore -l ของ directory format อ่านแค่ toc.dat
+            toc = capture_file_to_cmd(os.path.join(dump_path, "toc.dat"), [
+                *docker_cmd(src), "exec", "-i", src["container"], "sh", "-c",
+                'd=$(mktemp -d) && cat > "$d/toc.dat" && pg_restore -l "$d"; rc=$?; rm -rf "$d"; exit $rc',
+            ], log_callback)
+        else:
+            return None
+    except (RuntimeError, OSError) as e:
+        if isinstance(e, OperationCancelled):
+            raise
+        log_message(f"Warning: could not list the tables of {dump_path}: {e}", log_callback)
+        return None
+    return toc_tables(parse_toc(toc))
+
+
+def _record_catalog(db_type: str, section: dict, dump_path: str, entry: dict, log_callback):
+    src = section["source"]
+    entry = {
+        "path": dump_path,
+        "job": section.get("name") or db_type,
+        "db_type": db_type.lower(),
+        "container": src["container"],
+        "db_name": src["db_name"],
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        **entry,
+    }
+    try:
+        record_backup(get_catalog_path(), entry)
+    except (sqlite3.Error, OSError) as e:
+        log_message(f"Warning: could not update the backup catalog: {e}", log_callback)
+
+
+def default_dump_name(db_type: str, section: dict, prefix: str | None = None) -> str:
+    """ชื่อ <prefix>_<YYYYmmddHHMMSS>.<ext>; prefix เริ่มต้นเป็นชื่อ job หรือ db_type
+
+    prefix ต้องไม่ซ้ำกันระหว่าง section/job ที่วางไฟล์ใน directory เดียวกัน เพราะ retention แยก backup ตาม prefix
+    """
+    prefix = prefix or section.get("name") or db_type.lower()
+    # parallel mode ของ postgres ได้ผลเป็น directory จึงใช้ .tar เป็นค่าเริ่มต้น
+    ext = ".tar" if db_type.lower() == "postgres" and get_parallel(section) > 1 else ".dump"
+    if db_type.lower() == "mysql" and get_parallel(section) > 1:
+        # MySQL แบบตารางละไฟล์เป็น directory (ไฟล์ข้างในบีบอัด/เป็น manifest แยกกันเอง)
+        return datetime.datetime.now().strftime(f"{prefix}_%Y%m%d%H%M%S") + ".d"
+    if get_storage(section)[0] == "repository":
+        # ข้อมูลจริงอยู่ใน repository ไฟล์ที่ได้เป็นเพียง manifest
+        ext += ".manifest"
+    else:
+        ext += CODEC_EXTENSIONS[get_compression(section)["codec"]]
+    return datetime.datetime.now().strftime(f"{prefix}_%Y%m%d%H%M%S") + ext
+
+
+def do_backup(db_type: str, config: dict, dump_path: str, log_callback=None, progress_callback=None):
+    section = config.get(db_type)
+    if not section:
+        raise RuntimeError(f"Config not found for db_type={db_type}")
+    use_docker_api(config, log_callback)
+    policy = get_retention(section)
+    upload = get_upload(section)
+    if upload and get_storage(section)[0] == "repository":
+        # manifest อ้าง chunk ใน repository บน host จึงใช้แทน backup บน object storage ไม่ได้
+        log_message("Warning: upload is not supported with repository storage; skipping upload", log_callback)
+        upload = None
+
+    with log_context(job=section.get("name") or db_type, operation="backup"), track_run(
+        get_history_path(), "backup", section.get("name") or db_type, db_type, section["source"], dump_path,
+        lambda text: log_message(text, log_callback),
+    ):
+        db_size = preflight_backup(db_type, section, dump_path, log_callback)
+        started = time.monotonic()
+        _backup(db_type, section, dump_path, log_callback, progress_callback, db_size, upload)
+        duration = time.monotonic() - started
+        # metadata สำหรับ catalog (query สั้น ๆ และอ่านแค่ TOC ต้นไฟล์)
+        entry = {
+            "duration": duration,
+            "server_version": server_version(db_type, section["source"], log_callback),
+            "tables": backup_tables(db_type, section, dump_path, log_callback),
+        }
+    _record_catalog(db_type, section, dump_path, entry, log_callback)
+    if policy:
+        # ลบ backup เก่าตาม retention ใน background ไม่ให้ job ถัดไปต้องรอ
+        start_prune(dump_path, policy, get_catalog_path(), lambda text: log_message(text, log_callback))
+
+
+def _backup(db_type: str, section: dict, dump_path: str, log_callback, progress_callback, db_size=None,
+            upload=None):
+    src = section["source"]
+    container = src["container"]
+    db_name = src["db_name"]
+    db_user = src["db_user"]
+    db_password = src["db_password"]
+    mode = get_transfer_mode(section)
+    parallel = get_parallel(section)
+    compression = get_compression(section)
+    storage, repository = get_storage(section)
+    if storage != "repository":
+        repository = None
+
+    if db_type.lower() not in ("postgres", "mysql"):
+        raise RuntimeError(f"Unsupported db_type: {db_type}")
+
+    total = None
+    if progress_callback and (mode == "stream" or parallel > 1):
+        total = db_size if db_size is not None else estimate_db_size(db_type, src, log_callback)
+
+    if db_type.lower() == "mysql" and parallel > 1:
+        if mode == "copy":
+            log_message("Per-table MySQL backup always streams; ignoring transfer=copy", log_callback)
+        _mysql_parallel_backup(
+            src, section, dump_path, parallel, compression, repository, log_callback, progress_callback, total,
+        )
+        log_message(f"Backup completed to: {dump_path}", log_callback)
+        if upload:
+            upload_backup(upload, dump_path, log_callback, progress_callback)
+        return
+
+    table_args = dump_table_args(db_type, section, src, log_callback)
+
+    if db_type.lower() == "postgres" and parallel > 1:
+        _pg_parallel_backup(
+            src, dump_path, parallel, compression, repository, log_callback, progress_callback, total, table_args,
+        )
+        log_message(f"Backup completed to: {dump_path}", log_callback)
+        if upload:
+            upload_backup(upload, dump_path, log_callback, progress_callback)
+        return
+
+    dump_cmd = build_dump_cmd(db_type, src, table_args)
+
+    if mode == "stream":
+        if db_type.lower() == "postgres" and (compression["codec"] != "none" or repository):
+            # ปิดการบีบอัด zlib ของ -Fc เพราะจะบีบอัดอีกชั้นบน host อยู่แล้ว
+            # (และข้อมูลที่ไม่บีบอัดจะ dedup ใน repository ได้ดีกว่ามาก)
+            dump_cmd += ["-Z", "0"]
+        # dump ออกทาง stdout ของ docker exec แล้วเขียนลงไฟล์บน host โดยตรง
+        stream_cmd_to_file(
+            dump_cmd, dump_path, log_callback, compression, repository, progress_callback, total, upload,
+        )
+    else:
+        if compression["codec"] != "none" or repository:
+            log_message(
+                "Warning: compression/repository storage requires transfer=stream; writing a plain dump",
+                log_callback,
+            )
+
+        container_dump_path = "/backup/" + os.path.basename(dump_path)
+
+        # สร้างโฟลเดอร์ /backup ใน container (ถ้ายังไม่มี)
+        run_cmd([*docker_cmd(src), "exec", container, "mkdir", "-p", "/backup"], log_callback)
+
+        if has_pending_pull(src, container_dump_path, dump_path, log_callback):
+            # dump ในรอบก่อนเสร็จแล้วแต่ดึงออกมาไม่ครบ ดึงต่อจากไฟล์เดิมโดยไม่ dump ใหม่
+            log_message(f"Found an interrupted transfer of {container}:{container_dump_path}", log_callback)
+        else:
+            try:
+                if db_type.lower() == "postgres":
+                    # pg_dump ใน container
+                    run_cmd(dump_cmd + ["-f", container_dump_path], log_callback)
+                else:
+                    # mysqldump ใน container (ใช้ sh -c เพื่อ redirect ออกไฟล์)
+                    shell_cmd = (
+                        " ".join(["mysqldump", "-u", db_user, db_name, *table_args]) + f" > {container_dump_path}"
+                    )
+                    run_cmd([
+                        *docker_cmd(src), "exec", "-e", f"MYSQL_PWD={db_password}", container,
+                        "sh", "-c", shell_cmd,
+                    ], log_callback)
+            except OperationCancelled:
+                # dump ที่เขียนไม่ครบใช้ต่อไม่ได้
+                _cleanup_container_path(src, container_dump_path, log_callback)
+                raise
+
+        # ดึงไฟล์ออกมาที่ Windows host (ต่อจากจุดที่ขาดได้ ต่างจาก docker cp)
+        pull_file_resumable(src, container_dump_path, dump_path, log_callback, progress_callback)
+        if upload:
+            upload_backup(upload, dump_path, log_callback, progress_callback)
+
+    log_message(f"Backup completed to: {dump_path}", log_callback)
+
+
+def do_restore(db_type: str, config: dict, dump_path: str, log_callback=None, progress_callback=None,
+               tables=None):
+    """restore dump_path เข้า target; ถ้าระบุ tables (ชื่อหรือ pattern) จะ restore เฉพาะข้อมูลของตารางนั้น"""
+    section = config.get(db_type)
+    if not section:
+        raise RuntimeError(f"Config not found for db_type={db_type}")
+    use_docker_api(config, log_callback)
+
+    with log_context(job=section.get("name") or db_type, operation="restore"), track_run(
+        get_history_path(), "restore", section.get("name") or db_type, db_type, section["target"], dump_path,
+        lambda text: log_message(text, log_callback),
+    ):
+        preflight_restore(db_type, section, dump_path, tables, log_callback)
+        if section.get("shadow_restore") and tables:
+            log_message("Warning: shadow_restore replaces the whole database; restoring the tables in place", log_callback)
+        if section.get("shadow_restore") and not tables:
+            # ตรวจฐาน shadow ก่อนสลับ
+            _shadow_restore(db_type, section, dump_path, log_callback, progress_callback)
+        else:
+            _restore(db_type, section, dump_path, log_callback, progress_callback, tables)
+            verify_databases(db_type, section, log_callback, tables=tables)
+
+
+def _restore(db_type: str, section: dict, dump_path: str, log_callback, progress_callback, tables=None):
+    tgt = section["target"]
+    container = tgt["container"]
+    db_name = tgt["db_name"]
+    db_user = tgt["db_user"]
+    db_password = tgt["db_password"]
+    mode = get_transfer_mode(section)
+    parallel = get_parallel(section)
+
+    if db_type.lower() not in ("postgres", "mysql"):
+        raise RuntimeError(f"Unsupported db_type: {db_type}")
+    txn_args = single_transaction_args(db_type, section, parallel, log_callback)
+
+    if is_remote_path(dump_path):
+        # อ่านจาก object storage เข้า stdin ของ pg_restore/mysql โดยตรง (ไม่ดาวน์โหลดลง host)
+        if parallel > 1 or tables:
+            raise RuntimeError("Restoring from object storage streams one dump; set parallel=1 and restore all tables")
+        stream_file_to_cmd(
+            dump_path, build_stream_restore_cmd(db_type, tgt, txn_args), log_callback, progress_callback,
+            remote=remote_settings(section),
+        )
+        log_message(f"Restore completed into DB: {db_name}", log_callback)
+        return
+
+    kind = detect_artifact(dump_path)
+    if kind != "dir" and mode == "copy" and (
+        detect_file_codec(dump_path) != "none" or is_manifest_file(dump_path)
+    ):
+        # ไฟล์ที่บีบอัดไว้หรือ manifest ต้องแปลงบน host ระหว่าง stream จึง docker cp ตรง ๆ ไม่ได้
+        log_message("Compressed or repository dump detected; using transfer=stream", log_callback)
+        mode = "stream"
+
+    if db_type.lower() == "mysql" and kind == "dir":
+        # backup แบบตารางละไฟล์ restore พร้อมกันหลายตาราง
+        _mysql_restore_dir(tgt, dump_path, parallel, tables, log_callback, progress_callback)
+    elif db_type.lower() == "mysql" and tables:
+        raise RuntimeError("Restoring selected MySQL tables needs a per-table backup (parallel > 1)")
+    elif db_type.lower() == "postgres" and (parallel > 1 or kind != "file" or tables):
+        # directory/tar dump, pg_restore -j หรือการเลือกตาราง (-L) ต้องมีไฟล์อยู่ใน container
+        _pg_restore_in_container(
+            tgt, dump_path, kind, mode, parallel, log_callback, progress_callback, tables, txn_args,
+        )
+    elif mode == "stream":
+        # ส่งไฟล์จาก host เข้า stdin ของ pg_restore/mysql โดยตรง ไม่ต้อง copy เข้า container
+        stream_file_to_cmd(
+            dump_path, build_stream_restore_cmd(db_type, tgt, txn_args), log_callback, progress_callback,
+        )
+    else:
+        file_name = os.path.basename(dump_path)
+        container_dump_path = f"/backup/{file_name}"
+
+        # สร้างโฟลเดอร์ /backup ใน container ปลายทาง (ถ้ายังไม่มี)
+        run_cmd([*docker_cmd(tgt), "exec", container, "mkdir", "-p", "/backup"], log_callback)
+
+        try:
+            # copy ไฟล์จาก Windows host เข้า container (ต่อจากจุดที่ขาดได้และตรวจ checksum)
+            push_file_resumable(tgt, dump_path, container_dump_path, log_callback, progress_callback)
+
+            if db_type.lower() == "postgres":
+                # pg_restore ทับฐาน db_name โดยไม่ตั้ง owner จาก dump
+                run_cmd([
+                    *docker_cmd(tgt), "exec", "-e", f"PGPASSWORD={db_password}", container,
+                    "pg_restore", "-U", db_user,
+                    "-d", db_name,
+                    "--clean", "--if-exists", "--no-owner", *txn_args,
+                    container_dump_path,
+                ], log_callback)
+            else:
+                # mysql restore ภายใน container ด้วย sh -c และ redirect
+                shell_cmd = f"mysql -u {db_user} {db_name} < {container_dump_path}"
+                run_cmd([
+                    *docker_cmd(tgt), "exec", "-e", f"MYSQL_PWD={db_password}", container,
+                    "sh", "-c", shell_cmd,
+                ], log_callback)
+        except OperationCancelled:
+            # ไม่ทิ้งไฟล์ที่ส่งไม่ครบไว้ใน /backup
+            _cleanup_container_path(tgt, container_dump_path, log_callback)
+            if not txn_args:
+                log_message(f"Restore cancelled; database {db_name} may be partially restored", log_callback)
+            raise
+
+    log_message(f"Restore completed into DB: {db_name}", log_callback)
+
+
+def _pg_admin(tgt: dict, sql: str, log_callback) -> str:
+    """รัน SQL ผ่านฐาน maintenance ของ Postgres (สร้าง/ลบ/เปลี่ยนชื่อฐาน)"""
+    return capture_cmd([
+        *docker_cmd(tgt), "exec", "-e", f"PGPASSWORD={tgt['db_password']}", tgt["container"],
+        "psql", "-U", tgt["db_user"], "-d", PG_MAINTENANCE_DB, "-v", "ON_ERROR_STOP=1", "-Atc", sql,
+    ], log_callback)
+
+
+def _mysql_admin(tgt: dict, sql: str, log_callback) -> str:
+    """รัน SQL ของ MySQL โดยส่งทาง stdin (RENAME TABLE ของทั้งฐานยาวเกิน command line ของ Windows ได้)"""
+    return capture_cmd([
+        *docker_cmd(tgt), "exec", "-i", "-e", f"MYSQL_PWD={tgt['db_password']}", tgt["container"],
+        "mysql", "-u", tgt["db_user"], "-N", "-B",
+    ], log_callback, input=sql.encode("utf-8"))
+
+
+def _base_tables(db_type: str, endpoint: dict, log_callback) -> list[str]:
+    """ตารางจริงของฐาน endpoint (schema.table สำหรับ Postgres)"""
+    if db_type.lower() == "postgres":
+        out = capture_cmd([
+            *docker_cmd(endpoint), "exec", "-e", f"PGPASSWORD={endpoint['db_password']}", endpoint["container"],
+            "psql", "-U", endpoint["db_user"], "-d", endpoint["db_name"], "-Atc",
+            "SELECT schemaname || '.' || tablename FROM pg_catalog.pg_tables "
+            "WHERE schemaname NOT IN ('pg_catalog', 'information_schema') ORDER BY 1",
+        ], log_callback)
+    else:
+        out = _mysql_admin(
+            endpoint,
+            "SELECT table_name FROM information_schema.tables "
+            f"WHERE table_schema = {mysql_literal(endpoint['db_name'])} AND table_type = 'BASE TABLE' ORDER BY 1",
+            log_callback,
+        )
+    return [line for line in out.splitlines() if line]
+
+
+def _mysql_schema_objects(tgt: dict, db_name: str, log_callback) -> tuple[int, int, int]:
+    """จำนวน (view, trigger, routine) ในฐาน db_name
+
+    RENAME TABLE ย้ายได้แค่ตาราง: view และ procedure/function ค้างอยู่ที่ฐานเดิมโดยอ้างตารางที่ถูกสลับออกไป
+    ส่วนตารางที่มี trigger ย้ายข้ามฐานไม่ได้เลย
+    """
+    out = _mysql_admin(tgt, (
+        "SELECT (SELECT COUNT(*) FROM information_schema.views WHERE table_schema = {name}), "
+        "(SELECT COUNT(*) FROM information_schema.triggers WHERE trigger_schema = {name}), "
+        "(SELECT COUNT(*) FROM information_schema.routines WHERE routine_schema = {name})"
+    ).format(name=mysql_literal(db_name)), log_callback)
+    try:
+        views, triggers, routines = (int(n) for n in out.split())
+    except ValueError:
+        raise RuntimeError(f"Unexpected output while checking views/triggers/routines of {db_name}: {out}")
+    return views, triggers, routines
+
+
+def _create_shadow(db_type: str, tgt: dict, shadow: str, log_callback):
+    """สร้างฐาน shadow ว่าง (ลบของรอบก่อนที่ค้างอยู่) ให้ encoding/collation เหมือนฐานจริง"""
+    db_name = tgt["db_name"]
+    if db_type.lower() == "postgres":
+        row = _pg_admin(tgt, (
+            "SELECT pg_encoding_to_char(encoding), datcollate, datctype FROM pg_database "
+            f"WHERE datname = {pg_literal(db_name)}"
+        ), log_callback)
+        settings = row.split("|")
+        if len(settings) != 3:
+            raise RuntimeError(f"Database {db_name} not found in {tgt['container']}")
+        _pg_admin(tgt, f"DROP DATABASE IF EXISTS {pg_ident(shadow)}", log_callback)
+        _pg_admin(tgt, pg_create_sql(shadow, *settings), log_callback)
+        return
+    views, triggers, routines = _mysql_schema_objects(tgt, db_name, log_callback)
+    if views or triggers or routines:
+        raise RuntimeError(
+            f"Shadow restore can only swap base tables: {db_name} has {views} view(s), {triggers} trigger(s) "
+            f"and {routines} stored routine(s); use an in-place restore (shadow_restore: false)"
+        )
+    row = _mysql_admin(tgt, (
+        "SELECT default_character_set_name, default_collation_name FROM information_schema.schemata "
+        f"WHERE schema_name = {mysql_literal(db_name)}"
+    ), log_callback)
+    settings = row.split("\t")
+    if len(settings) != 2:
+        raise RuntimeError(f"Database {db_name} not found in {tgt['container']}")
+    _mysql_admin(tgt, (
+        f"DROP DATABASE IF EXISTS {mysql_ident(shadow)}; "
+        f"CREATE DATABASE {mysql_ident(shadow)} CHARACTER SET {settings[0]} COLLATE {settings[1]}"
+    ), log_callback)
+
+
+def _drop_shadow(db_type: str, tgt: dict, shadow: str, log_callback):
+    with shielded():
+        try:
+            if db_type.lower() == "postgres":
+                _pg_admin(tgt, f"DROP DATABASE IF EXISTS {pg_ident(shadow)}", log_callback)
+            else:
+                _mysql_admin(tgt, f"DROP DATABASE IF EXISTS {mysql_ident(shadow)}", log_callback)
+        except RuntimeError:
+            log_message(f"Warning: could not drop shadow database {shadow}", log_callback)
+
+
+def _validate_shadow(db_type: str, shadow_tgt: dict, dump_path: str, log_callback) -> list[str]:
+    """ตรวจฐาน shadow ก่อนสลับ: มีตาราง และมีครบทุกตารางที่ catalog บันทึกไว้ตอน backup; คืนรายชื่อตาราง"""
+    tables = _base_tables(db_type, shadow_tgt, log_callback)
+    if not tables:
+        raise RuntimeError(f"Shadow database {shadow_tgt['db_name']} has no tables after the restore")
+    expected = cached_tables(get_catalog_path(), dump_path) if not is_remote_path(dump_path) else None
+    missing = sorted(set(expected or []) - set(tables))
+    if missing:
+        raise RuntimeError(f"Shadow database is missing {len(missing)} table(s) from the backup: {', '.join(missing)}")
+    if db_type.lower() == "mysql":
+        views, triggers, routines = _mysql_schema_objects(shadow_tgt, shadow_tgt["db_name"], log_callback)
+        if views or triggers or routines:
+            raise RuntimeError(
+                f"Shadow restore can only move base tables: the dump created {views} view(s), "
+                f"{triggers} trigger(s) and {routines} stored routine(s)"
+            )
+    log_message(f"Shadow database {shadow_tgt['db_name']} has {len(tables)} tables", log_callback)
+    return tables
+
+
+def _pg_swap(tgt: dict, shadow: str, previous: str, log_callback):
+    """ปิดการเชื่อมต่อใหม่, ตัด session เดิม แล้วเปลี่ยนชื่อทั้งสองฐานใน transaction เดียว"""
+    db_name = tgt["db_name"]
+    _pg_admin(tgt, pg_terminate_sql(previous), log_callback)
+    _pg_admin(tgt, f"DROP DATABASE IF EXISTS {pg_ident(previous)}", log_callback)
+    _pg_admin(tgt, f"ALTER DATABASE {pg_ident(db_name)} ALLOW_CONNECTIONS false", log_callback)
+    try:
+        for attempt in range(SWAP_RETRIES):
+            _pg_admin(tgt, pg_terminate_sql(db_name), log_callback)
+            try:
+                _pg_admin(tgt, pg_swap_sql(db_name, shadow, previous), log_callback)
+                break
+            except RuntimeError as e:
+                # backend ที่ถูก terminate ยังออกไม่หมด
+                if isinstance(e, OperationCancelled) or "being accessed by other users" not in str(e) \
+                        or attempt == SWAP_RETRIES - 1:
+                    raise
+                time.sleep(SWAP_RETRY_DELAY)
+    except BaseException:
+        with shielded():
+            try:
+                _pg_admin(tgt, f"ALTER DATABASE {pg_ident(db_name)} ALLOW_CONNECTIONS true", log_callback)
+            except RuntimeError:
+                log_message(f"Warning: could not re-enable connections to {db_name}", log_callback)
+        raise
+    _pg_admin(tgt, f"ALTER DATABASE {pg_ident(previous)} ALLOW_CONNECTIONS true", log_callback)
+
+
+def _mysql_swap(tgt: dict, shadow: str, previous: str, shadow_tables: list[str], log_callback):
+    """ย้ายตารางจริงไป previous และตารางจาก shadow เข้าแทนด้วย RENAME TABLE คำสั่งเดียว"""
+    db_name = tgt["db_name"]
+    live_tables = _base_tables("mysql", tgt, log_callback)
+    _mysql_admin(tgt, (
+        f"DROP DATABASE IF EXISTS {mysql_ident(previous)}; "
+        f"CREATE DATABASE {mysql_ident(previous)}; "
+        f"SET SESSION lock_wait_timeout = {SWAP_LOCK_TIMEOUT}; "
+        + mysql_swap_sql(db_name, shadow, previous, live_tables, shadow_tables)
+    ), log_callback)
+    _mysql_admin(tgt, f"DROP DATABASE {mysql_ident(shadow)}", log_callback)
+
+
+def _shadow_restore(db_type: str, section: dict, dump_path: str, log_callback, progress_callback):
+    """restore ลงฐาน <db_name>_shadow แล้วสลับเข้าแทนฐานจริง (ดู shadow.py)
+
+    ฐานจริงใช้งานได้ตลอดการ restore; ถ้า restore หรือการตรวจล้มเหลวจะลบ shadow ทิ้งโดยไม่แตะฐานจริง
+    """
+    tgt = section["target"]
+    db_name = tgt["db_name"]
+    shadow, previous = shadow_names(db_name)
+    shadow_section = {**section, "target": {**tgt, "db_name": shadow}}
+    log_message(f"Shadow restore: loading into {shadow}; {db_name} stays online until the swap", log_callback)
+
+    _create_shadow(db_type, tgt, shadow, log_callback)
+    try:
+        _restore(db_type, shadow_section, dump_path, log_callback, progress_callback)
+        tables = _validate_shadow(db_type, shadow_section["target"], dump_path, log_callback)
+        verify_databases(db_type, section, log_callback, target=shadow_section["target"])
+    except BaseException:
+        _drop_shadow(db_type, tgt, shadow, log_callback)
+        log_message(f"Shadow restore failed; database {db_name} was not changed", log_callback)
+        raise
+
+    set_phase("shadow swap")
+    started = time.monotonic()
+    try:
+        if db_type.lower() == "postgres":
+            _pg_swap(tgt, shadow, previous, log_callback)
+        else:
+            _mysql_swap(tgt, shadow, previous, tables, log_callback)
+    except BaseException:
+        # restore เสร็จแล้ว เก็บ shadow ไว้ให้สลับเองได้ (รอบถัดไปจะลบทิ้งก่อนเริ่ม)
+        log_message(f"Swap failed; database {db_name} was not changed and {shadow} is kept", log_callback)
+        raise
+    swap_time = time.monotonic() - started
+    record_phase("shadow swap", swap_time, returncode=0)
+    log_message(
+        f"Swapped {shadow} into {db_name} in {swap_time:.1f}s; the previous database is kept as {previous}",
+        log_callback,
+    )
+
+
+def _verify_query(db_type: str, endpoint: dict, sql: str) -> list[list[str]]:
+    """query ของการตรวจ คืนแถวที่แยกคอลัมน์แล้ว (รันเป็นร้อยครั้งจึงไม่ส่งคำสั่งเข้า log; error ยังเป็น RuntimeError)"""
+    if db_type.lower() == "postgres":
+        out = capture_cmd([
+            *docker_cmd(endpoint), "exec", "-e", f"PGPASSWORD={endpoint['db_password']}", endpoint["container"],
+            "psql", "-X", "-U", endpoint["db_user"], "-d", endpoint["db_name"], "-v", "ON_ERROR_STOP=1",
+            "-At", "-F", "\t", "-c", sql,
+        ], None)
+    else:
+        out = capture_cmd([
+            *docker_cmd(endpoint), "exec", "-i", "-e", f"MYSQL_PWD={endpoint['db_password']}", endpoint["container"],
+            "mysql", "-u", endpoint["db_user"], "-N", "-B", endpoint["db_name"],
+        ], None, input=sql.encode("utf-8"))
+    return [line.split("\t") for line in out.splitlines() if line]
+
+
+def _verify_row(db_type: str, endpoint: dict, sql: str, columns: int) -> list[str]:
+    """แถวแรกของ query ที่ต้องได้ผลเสมอ (count, min/max, checksum); ผลผิดรูปเป็น RuntimeError (error ของตารางนั้น)"""
+    rows = _verify_query(db_type, endpoint, sql)
+    if not rows or len(rows[0]) < columns:
+        raise RuntimeError(f"Unexpected result from {endpoint['container']}/{endpoint['db_name']}: {rows[:1]!r}")
+    return rows[0]
+
+
+def _plan_verify_table(db_type: str, src: dict, tgt: dict, table: str, opts: dict) -> dict:
+    """หา primary key, คอลัมน์ (MySQL) และช่วง key ที่จะ checksum ของตารางหนึ่ง
+
+    จำนวนแถวโดยประมาณมาจาก source เพราะ target เพิ่ง restore และยังไม่มีสถิติ; ช่วง key ครอบทั้งสองฝั่ง
+    """
+    plan = {"table": table, "key": None, "columns": None, "est_rows": 0, "chunks": []}
+    if opts["mode"] == "count":
+        return plan
+    postgres = db_type.lower() == "postgres"
+    if postgres:
+        rows = key_rows = _verify_query(db_type, src, pg_key_sql(table))
+    else:
+        rows = _verify_query(db_type, src, mysql_columns_sql(src["db_name"], table))
+        plan["columns"] = [row[0] for row in rows]
+        key_rows = [row for row in rows if row[2] == "1"]
+    if rows:
+        try:
+            plan["est_rows"] = max(int(float(rows[0][-1])), 0)
+        except ValueError:
+            # ใช้แค่กำหนดขนาดช่วง ไม่รู้ก็ถือว่า key เรียงติดกัน
+            plan["est_rows"] = 0
+    plan["key"] = integer_key(db_type, key_rows)
+    if plan["key"] is None:
+        return plan
+
+    bounds_sql = pg_bounds_sql(table, plan["key"]) if postgres else mysql_bounds_sql(table, plan["key"])
+    lows, highs = [], []
+    for endpoint in (src, tgt):
+        low, high = _verify_row(db_type, endpoint, bounds_sql, 2)[:2]
+        # ตารางว่าง: psql -A พิมพ์ NULL เป็นค่าว่าง, mysql -B พิมพ์ NULL
+        if low in ("", "NULL") or high in ("", "NULL"):
+            continue
+        try:
+            lows.append(int(low))
+            highs.append(int(high))
+        except ValueError:
+            raise RuntimeError(f"Unexpected key range of {table}.{plan['key']}: {low!r}, {high!r}")
+    if lows:
+        plan["chunks"] = plan_chunks(min(lows), max(highs), plan["est_rows"], opts["chunk_rows"])
+    return plan
+
+
+def _verify_chunk(db_type: str, src: dict, tgt: dict, plan: dict, what: str, chunk) -> list[list[str]]:
+    """รัน count หรือ checksum (ทั้งตารางหรือช่วง key) กับ source และ target คืน [แถวของ source, แถวของ target]"""
+    table = plan["table"]
+    key = plan["key"] if chunk is not None else None
+    if db_type.lower() == "postgres":
+        sql = pg_count_sql(table) if what == "count" else pg_checksum_sql(table, key, chunk)
+    else:
+        sql = mysql_count_sql(table) if what == "count" else mysql_checksum_sql(table, plan["columns"], key, chunk)
+    return [_verify_row(db_type, endpoint, sql, 1 if what == "count" else 2) for endpoint in (src, tgt)]
+
+
+def _verify_tasks(plan: dict, mode: str) -> list[tuple[str, tuple[int, int] | None]]:
+    if mode == "count":
+        return [("count", None)]
+    if mode == "sample":
+        return [("count", None)] + [("checksum", chunk) for chunk in sample_chunks(plan["chunks"])]
+    if plan["key"] is None:
+        return [("checksum", None)]
+    return [("checksum", chunk) for chunk in plan["chunks"]]
+
+
+def verify_databases(db_type: str, section: dict, log_callback, target: dict | None = None, tables=None):
+    """เทียบ target (หรือฐานที่ระบุ เช่น shadow) กับ source ทีละตารางตาม section["verify"] (ดู verify.py)
+
+    ตรวจพร้อมกันไม่เกิน workers query ต่อฝั่ง; ผลทุกตารางบันทึกใน history ของ run และตารางที่ไม่ตรง
+    ทำให้ล้มเหลวด้วย RuntimeError; tables (ชื่อหรือ pattern) จำกัดให้ตรวจเฉพาะตารางที่ restore
+    """
+    opts = get_verify(section)
+    if opts is None:
+        return
+    src = section.get("source") or {}
+    tgt = target or section["target"]
+    if not src.get("container") or not src.get("db_name"):
+        log_message("Warning: verify needs the source database in config; skipping verification", log_callback)
+        return
+
+    include, exclude = get_table_filter(section)
+    source_tables = select_tables(_base_tables(db_type, src, log_callback), include, exclude)
+    target_tables = select_tables(_base_tables(db_type, tgt, log_callback), include, exclude)
+    if tables:
+        source_tables = select_tables(source_tables, tables, [])
+        target_tables = select_tables(target_tables, tables, [])
+    names = sorted(set(source_tables) | set(target_tables))
+    if not names:
+        log_message("Warning: no tables to verify", log_callback)
+        return
+    log_message(
+        f"Verifying {len(names)} tables against {src['container']}/{src['db_name']} "
+        f"(mode={opts['mode']}, workers={opts['workers']})",
+        log_callback,
+    )
+
+    set_phase("verify")
+    started = time.monotonic()
+    results = {}
+    for name in names:
+        missing = "target" if name not in target_tables else "source" if name not in source_tables else None
+        rows = 0 if opts["mode"] == "full" else None
+        results[name] = {
+            "table": name, "key": None, "missing": missing, "source_rows": rows, "target_rows": rows,
+            "chunks": 0, "bad_chunks": [], "errors": [],
+        }
+
+    with ThreadPoolExecutor(max_workers=opts["workers"]) as pool:
+        planned = [
+            (name, pool.submit(bind_token(bind_context(_plan_verify_table)), db_type, src, tgt, name, opts))
+            for name in names if not results[name]["missing"]
+        ]
+        plans = []
+        for name, future in planned:
+            try:
+                plans.append(future.result())
+            except OperationCancelled:
+                raise
+            except RuntimeError as e:
+                results[name]["errors"].append(str(e))
+
+        # ตารางใหญ่เข้าคิวก่อน ไม่ให้ตารางใหญ่ตัวสุดท้ายรันอยู่ตัวเดียวตอนท้าย
+        futures = []
+        for plan in sorted(plans, key=lambda p: p["est_rows"], reverse=True):
+            results[plan["table"]]["key"] = plan["key"]
+            for what, chunk in _verify_tasks(plan, opts["mode"]):
+                futures.append((
+                    plan["table"], what, chunk,
+                    pool.submit(bind_token(bind_context(_verify_chunk)), db_type, src, tgt, plan, what, chunk),
+                ))
+        for name, what, chunk, future in futures:
+            result = results[name]
+            try:
+                source_row, target_row = future.result()
+            except OperationCancelled:
+                raise
+            except RuntimeError as e:
+                result["errors"].append(str(e))
+                continue
+            try:
+                source_count, target_count = int(source_row[0]), int(target_row[0])
+            except ValueError:
+                result["errors"].append(f"Unexpected row count: source={source_row[0]!r} target={target_row[0]!r}")
+                continue
+            if what == "count":
+                result["source_rows"], result["target_rows"] = source_count, target_count
+                continue
+            result["chunks"] += 1
+            if source_row != target_row:
+                result["bad_chunks"].append(chunk)
+            if opts["mode"] == "full":
+                result["source_rows"] += source_count
+                result["target_rows"] += target_count
+    elapsed = time.monotonic() - started
+
+    records = []
+    for name in names:
+        result = results[name]
+        status = table_status(result)
+        if status != "ok":
+            log_message("Verify " + describe(result), log_callback)
+        records.append({
+            "table": name, "status": status, "source_rows": result["source_rows"],
+            "target_rows": result["target_rows"], "chunks": result["chunks"],
+            "bad_chunks": len(result["bad_chunks"]), "detail": describe(result),
+        })
+    record_verification(records)
+    bad = [r["table"] for r in records if r["status"] != "ok"]
+    record_phase("verify", elapsed, returncode=len(bad))
+    log_message(
+        f"Verification ({opts['mode']}): {len(names) - len(bad)} of {len(names)} tables match the source, "
+        f"{sum(r['chunks'] for r in records)} chunk(s) checksummed in {elapsed:.1f}s",
+        log_callback,
+    )
+    if bad:
+        raise RuntimeError(
+            f"Verification failed: {len(bad)} table(s) differ from the source: "
+            + ", ".join(bad[:10]) + (" ..." if len(bad) > 10 else "")
+        )
+
+
+def do_clone(db_type: str, config: dict, copy_path: str | None = None, log_callback=None, progress_callback=None):
+    """dump จาก source แล้ว restore เข้า target ใน pass เดียว (ไม่ผ่านไฟล์บน host หรือ docker cp)
+
+    ถ้าระบุ copy_path จะเก็บสำเนา dump ไว้บน host ด้วย (บีบอัดตาม compression ของ section)
+    """
+    section = config.get(db_type)
+    if not section:
+        raise RuntimeError(f"Config not found for db_type={db_type}")
+    use_docker_api(config, log_callback)
+
+    with log_context(job=section.get("name") or db_type, operation="clone"), track_run(
+        get_history_path(), "clone", section.get("name") or db_type, db_type, section["target"], copy_path or "",
+        lambda text: log_message(text, log_callback),
+    ):
+        db_size = preflight_clone(db_type, section, copy_path, log_callback)
+        _clone(db_type, section, copy_path, log_callback, progress_callback, db_size)
+        verify_databases(db_type, section, log_callback)
+
+
+def _clone(db_type: str, section: dict, copy_path: str | None, log_callback, progress_callback, db_size=None):
+    src = section["source"]
+    tgt = section["target"]
+    compression = get_compression(section)
+
+    if db_type.lower() not in ("postgres", "mysql"):
+        raise RuntimeError(f"Unsupported db_type: {db_type}")
+    if get_parallel(section) > 1:
+        # pg_dump -j เขียนได้เฉพาะ directory จึงต่อท่อตรงไม่ได้
+        log_message("Warning: clone streams a single dump; parallel is ignored", log_callback)
+    if get_storage(section)[0] == "repository" and copy_path:
+        log_message("Warning: clone writes its copy as a plain file, not into the repository", log_callback)
+
+    txn_args = single_transaction_args(db_type, section, 1, log_callback)
+    total = None
+    if progress_callback:
+        total = db_size if db_size is not None else estimate_db_size(db_type, src, log_callback)
+
+    dump_cmd = build_dump_cmd(db_type, src, dump_table_args(db_type, section, src, log_callback))
+    if db_type.lower() == "postgres":
+        # ข้อมูลวิ่งผ่าน pipe บนเครื่องเดียวกัน บีบอัดใน pg_dump แล้วคลายใน pg_restore ก็เปลือง CPU เปล่า ๆ
+        dump_cmd += ["-Z", "0"]
+    stream_cmd_to_cmd(
+        dump_cmd, build_stream_restore_cmd(db_type, tgt, txn_args), log_callback,
+        copy_path, compression, progress_callback, total,
+    )
+
+    log_message(
+        f"Clone completed: {src['container']}/{src['db_name']} -> {tgt['container']}/{tgt['db_name']}",
+        log_callback,
+    )
+    if copy_path:
+        log_message(f"Dump copy saved to: {copy_path}", log_callback)
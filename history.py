@@ -0,0 +1,216 @@
+"""ประวัติการรัน backup/restore: เวลาแต่ละขั้นตอน, จำนวน byte, peak memory และผลการตรวจ (verify) เก็บใน SQLite"""
+import datetime
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows ไม่มี resource
+    resource = None
+
+HISTORY_FILE = "history.db"
+
+# run ที่ช้ากว่าค่า median ของรอบก่อน ๆ เกินกี่เท่าถือว่าช้าผิดปกติ
+SLOWDOWN_FACTOR = 1.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    job TEXT NOT NULL,
+    db_type TEXT NOT NULL,
+    container TEXT,
+    db_name TEXT,
+    dump_path TEXT,
+    success INTEGER NOT NULL,
+    error TEXT,
+    duration REAL NOT NULL,
+    bytes INTEGER,
+    peak_rss_kb INTEGER
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    duration REAL NOT NULL,
+    bytes INTEGER,
+    returncode INTEGER
+);
+CREATE TABLE IF NOT EXISTS verifications (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    table_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    source_rows INTEGER,
+    target_rows INTEGER,
+    chunks INTEGER NOT NULL,
+    bad_chunks INTEGER NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_job ON runs(job, operation, id);
+"""
+
+_local = threading.local()
+
+
+class RunRecord:
+    def __init__(self, operation: str, job: str, db_type: str, endpoint: dict, dump_path: str):
+        self.operation = operation
+        self.job = job
+        self.db_type = db_type
+        self.container = endpoint.get("container", "")
+        self.db_name = endpoint.get("db_name", "")
+        self.dump_path = dump_path
+        self.started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.success = False
+        self.error = None
+        self.phases: list[dict] = []
+        self.verifications: list[dict] = []
+
+    @property
+    def bytes(self) -> int | None:
+        sizes = [p["bytes"] for p in self.phases if p["bytes"] is not None]
+        return max(sizes) if sizes else None
+
+    def summary(self) -> str:
+        parts = [f"{p['name']} {p['duration']:.1f}s" for p in self.phases]
+        return f"Timing: total {self.duration:.1f}s" + (" (" + ", ".join(parts) + ")" if parts else "")
+
+
+def peak_rss_kb() -> int | None:
+    """peak RSS (KB) ของ process นี้หรือ child process ที่ใหญ่ที่สุด (เฉพาะระบบที่มี resource)"""
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children)
+
+
+def record_phase(name: str, duration: float, nbytes: int | None = None, returncode: int | None = None):
+    """บันทึกเวลาของขั้นตอนหนึ่งเข้า run ที่กำลังทำใน thread นี้ (ถ้ามี)"""
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.phases.append({"name": name, "duration": duration, "bytes": nbytes, "returncode": returncode})
+
+
+def record_verification(results: list[dict]):
+    """บันทึกผลตรวจรายตาราง (table, status, source_rows, target_rows, chunks, bad_chunks, detail) เข้า run นี้"""
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.verifications.extend(results)
+
+
+@contextmanager
+def track_run(db_path: str, operation: str, job: str, db_type: str, endpoint: dict, dump_path: str,
+              log_callback=None):
+    """จับเวลา run ทั้งหมดและทุก phase ที่ record_phase ส่งมา แล้วบันทึกลง history เมื่อจบ"""
+    run = RunRecord(operation, job, db_type, endpoint, dump_path)
+    previous = getattr(_local, "run", None)
+    _local.run = run
+    try:
+        yield run
+        run.success = True
+    except BaseException as e:
+        run.error = str(e)
+        raise
+    finally:
+        _local.run = previous
+        run.duration = time.monotonic() - run.started
+        if log_callback:
+            log_callback(run.summary())
+        try:
+            save_run(db_path, run)
+        except sqlite3.Error as e:
+            if log_callback:
+                log_callback(f"Warning: could not write run history: {e}")
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def save_run(db_path: str, run: RunRecord):
+    conn = connect(db_path)
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO runs (started_at, operation, job, db_type, container, db_name, dump_path, "
+                "success, error, duration, bytes, peak_rss_kb) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run.started_at, run.operation, run.job, run.db_type, run.container, run.db_name,
+                    run.dump_path, int(run.success), run.error, run.duration, run.bytes, peak_rss_kb(),
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO phases (run_id, seq, name, duration, bytes, returncode) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (cur.lastrowid, seq, p["name"], p["duration"], p["bytes"], p["returncode"])
+                    for seq, p in enumerate(run.phases)
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO verifications (run_id, table_name, status, source_rows, target_rows, chunks, bad_chunks, "
+                "detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        cur.lastrowid, v["table"], v["status"], v["source_rows"], v["target_rows"], v["chunks"],
+                        v["bad_chunks"], v["detail"],
+                    )
+                    for v in run.verifications
+                ],
+            )
+    finally:
+        conn.close()
+
+
+def list_runs(db_path: str, job: str | None = None, operation: str | None = None, limit: int = 20) -> list[dict]:
+    """run ล่าสุด (ใหม่สุดก่อน) พร้อม phase, ผลตรวจ และ flag slowdown เทียบกับ median ของ run ก่อนหน้า"""
+    conn = connect(db_path)
+    try:
+        where, params = [], []
+        if job:
+            where.append("job = ?")
+            params.append(job)
+        if operation:
+            where.append("operation = ?")
+            params.append(operation)
+        sql = "SELECT * FROM runs" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY id DESC LIMIT ?"
+        runs = [dict(row) for row in conn.execute(sql, (*params, limit))]
+        for run in runs:
+            run["phases"] = [
+                dict(row) for row in conn.execute(
+                    "SELECT name, duration, bytes, returncode FROM phases WHERE run_id = ? ORDER BY seq",
+                    (run["id"],),
+                )
+            ]
+            run["verifications"] = [
+                dict(row) for row in conn.execute(
+                    "SELECT table_name, status, source_rows, target_rows, chunks, bad_chunks, detail "
+                    "FROM verifications WHERE run_id = ? ORDER BY rowid",
+                    (run["id"],),
+                )
+            ]
+            previous = [
+                row[0] for row in conn.execute(
+                    "SELECT duration FROM runs WHERE job = ? AND operation = ? AND success = 1 AND id < ? "
+                    "ORDER BY id DESC LIMIT 10",
+                    (run["job"], run["operation"], run["id"]),
+                )
+            ]
+            run["baseline"] = statistics.median(previous) if previous else None
+            run["slowdown"] = (
+                run["duration"] / run["baseline"]
+                if run["baseline"] and run["duration"] > run["baseline"] * SLOWDOWN_FACTOR
+                else None
+            )
+        return runs
+    finally:
+        conn.close()
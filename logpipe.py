@@ -0,0 +1,163 @@
+"""ทางเดินของ log จาก engine ไปหน้าจอและไฟล์ โดยไม่ให้ log จำนวนมาก (เช่น pg_restore -v) ถ่วง GUI
+
+    thread ที่ทำงาน --emit()--> LogRing (ring buffer) --GUI ดึงเป็นชุดตามรอบ timer--> หน้าจอ
+                           \\--> JsonLinesLog (queue) --thread เขียนไฟล์--> logs/dockdbback.jsonl (หมุนไฟล์ตามขนาด)
+
+emit() แค่ต่อท้าย deque และใส่ queue จึงเรียกจาก event loop ของ ProcessEngine ได้โดยไม่ถ่วง process อื่น
+ถ้าหน้าจอดึงไม่ทัน บรรทัดเก่าสุดใน ring ถูกทิ้ง (นับไว้แสดงเป็นจำนวนที่ข้าม) แต่ไฟล์ได้ครบทุกบรรทัด
+
+แต่ละบรรทัดในไฟล์เป็น JSON: {"ts", "job", "operation", "phase", "msg"}; job/operation/phase มาจาก
+log_context()/set_phase() ของ thread ที่ log (แบบเดียวกับ token ใน cancel และ run ใน history)
+thread ที่แตกออกไปต้องห่อฟังก์ชันด้วย bind_context() เพื่อใช้ context เดียวกัน
+
+config:
+    "log": {"dir": "", "max_mb": 10, "backups": 5, "max_lines": 5000}   (dir ว่าง = logs ข้าง config.json)
+"""
+import collections
+import datetime
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+LOG_FILE = "dockdbback.jsonl"
+
+DEFAULT_MAX_MB = 10
+DEFAULT_BACKUPS = 5
+
+# จำนวนบรรทัดสูงสุดในช่อง log ของหน้าต่าง (บรรทัดเก่าถูกลบออกเอง)
+DEFAULT_MAX_LINES = 5000
+
+# บรรทัดที่รอหน้าจอดึงได้มากสุด; เกินนี้ทิ้งบรรทัดเก่าสุด
+RING_CAPACITY = 20000
+
+_local = threading.local()
+
+
+def get_log_options(config: dict, base_dir: str) -> dict:
+    """อ่าน config["log"] แล้วเติมค่า default: dir, max_mb, backups, max_lines"""
+    opts = config.get("log") or {}
+    try:
+        return {
+            "dir": opts.get("dir") or os.path.join(base_dir, "logs"),
+            "max_mb": max(int(opts.get("max_mb") or DEFAULT_MAX_MB), 1),
+            "backups": max(int(opts.get("backups") if opts.get("backups") is not None else DEFAULT_BACKUPS), 0),
+            "max_lines": max(int(opts.get("max_lines") or DEFAULT_MAX_LINES), 100),
+        }
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Invalid log value: {opts!r}")
+
+
+def current_context() -> dict:
+    return getattr(_local, "context", None) or {}
+
+
+@contextmanager
+def log_context(**fields):
+    """เพิ่ม field (job, operation, ...) ให้ทุกบรรทัดที่ thread นี้ log ระหว่างอยู่ใน block"""
+    previous = current_context()
+    _local.context = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+def set_phase(phase: str):
+    """ตั้ง phase ปัจจุบันของ thread นี้ (อยู่จนกว่าจะตั้งใหม่หรือออกจาก log_context ที่ครอบอยู่)"""
+    _local.context = {**current_context(), "phase": phase}
+
+
+def bind_context(fn):
+    """ห่อ fn ให้ log ด้วย context ของ thread ที่เรียก bind_context (ใช้ก่อนส่งงานเข้า thread อื่น)"""
+    context = current_context()
+
+    def bound(*args, **kwargs):
+        previous = current_context()
+        _local.context = context
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.context = previous
+    return bound
+
+
+class LogRing:
+    """ring buffer ของบรรทัดที่รอแสดง (thread-safe); drain() คืนทุกบรรทัดที่ค้างพร้อมจำนวนที่ถูกทิ้ง"""
+
+    def __init__(self, capacity: int = RING_CAPACITY):
+        self._lock = threading.Lock()
+        self._lines = collections.deque(maxlen=capacity)
+        self._dropped = 0
+
+    def append(self, text: str):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append(text)
+
+    def drain(self) -> tuple[list[str], int]:
+        with self._lock:
+            lines = list(self._lines)
+            dropped = self._dropped
+            self._lines.clear()
+            self._dropped = 0
+        return lines, dropped
+
+
+class JsonLinesLog:
+    """เขียน log เป็น JSON หนึ่งบรรทัดต่อ record ลงไฟล์ที่หมุนตามขนาด ใน thread แยก (write() ไม่รอ disk)"""
+
+    def __init__(self, directory: str, max_mb: int = DEFAULT_MAX_MB, backups: int = DEFAULT_BACKUPS):
+        # logging.handlers ดึง socket/pickle มาด้วย จึง import ตอนเปิดไฟล์ (หลังหน้าต่างแสดงแล้ว)
+        import logging.handlers
+
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, LOG_FILE)
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=max_mb * 1024 * 1024, backupCount=backups, encoding="utf-8", delay=True,
+        )
+        self._make_record = logging.makeLogRecord
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+
+    def write(self, record: dict):
+        self._queue.put(self._make_record({"msg": json.dumps(record, ensure_ascii=False)}))
+
+    def close(self):
+        """เขียนบรรทัดที่ค้างใน queue ให้หมดแล้วปิดไฟล์"""
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+
+
+class LogPipeline:
+    """จุดรับ log ของ GUI: emit() ส่งบรรทัดเข้า ring (หน้าจอ) และไฟล์ JSON-lines (ถ้าเปิดไว้)"""
+
+    def __init__(self, ring: LogRing | None = None):
+        self.ring = ring or LogRing()
+        self.file: JsonLinesLog | None = None
+
+    def open_file(self, directory: str, max_mb: int = DEFAULT_MAX_MB, backups: int = DEFAULT_BACKUPS):
+        self.close_file()
+        self.file = JsonLinesLog(directory, max_mb, backups)
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def emit(self, text: str):
+        self.ring.append(text)
+        file = self.file
+        if file is not None:
+            context = current_context()
+            file.write({
+                "ts": datetime.datetime.now().isoformat(timespec="milliseconds"),
+                "job": context.get("job"),
+                "operation": context.get("operation"),
+                "phase": context.get("phase"),
+                "msg": text,
+            })
@@ -0,0 +1,164 @@
+"""แยก output ของ mysqldump หลายตารางเป็นไฟล์ละตาราง และเลื่อนการสร้าง index ไปหลังโหลดข้อมูลตอน restore"""
+import re
+
+# ตารางใหม่ใน output ของ mysqldump เริ่มที่ "--\n-- Table structure for table `name`\n"
+_TABLE_MARKER = b"\n--\n-- Table structure for table `"
+
+# ชื่อตารางยาวได้ 64 ตัวอักษร (UTF-8 สูงสุด 4 byte และ ` ถูก escape เป็น ``)
+_MAX_NAME_BYTES = 64 * 4 * 2
+
+# CREATE TABLE อยู่ต้นไฟล์ของแต่ละตาราง; ถ้าอ่านเกินนี้แล้วยังไม่เจอจะส่งไฟล์ต่อไปตามเดิม
+HEAD_LIMIT = 1024 * 1024
+
+_CREATE_TABLE = re.compile(rb"^CREATE TABLE `((?:[^`]|``)+)` \($", re.M)
+_INDEX_DEF = re.compile(r"^(?:UNIQUE )?KEY `(?:[^`]|``)+` \(`((?:[^`]|``)+)`")
+_FOREIGN_KEY_DEF = re.compile(r"^CONSTRAINT `(?:[^`]|``)+` FOREIGN KEY ")
+_COLUMN_DEF = re.compile(r"^`((?:[^`]|``)+)` ")
+
+
+def assign_tables(sizes: dict, workers: int) -> list[list[str]]:
+    """แบ่งตาราง (ชื่อ -> ขนาด) ให้ worker ให้ขนาดรวมใกล้กันที่สุด; ตารางใหญ่เข้าก่อน"""
+    groups = [[] for _ in range(max(1, min(workers, len(sizes))))]
+    totals = [0] * len(groups)
+    for name in sorted(sizes, key=lambda n: sizes[n], reverse=True):
+        i = totals.index(min(totals))
+        groups[i].append(name)
+        totals[i] += sizes[name]
+    return [group for group in groups if group]
+
+
+def quote_mysql_name(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+class TableSplitter:
+    """รับ output ของ mysqldump (หลายตารางใน transaction เดียว) แล้วแยกเขียนเป็นตารางละ writer
+
+    open_table(name) ถูกเรียกเมื่อเริ่มตารางใหม่และต้องคืน writer ของตารางนั้น (ปิด writer ก่อนหน้าเอง)
+    ส่วน header ของ dump (SET NAMES, FOREIGN_KEY_CHECKS=0 ฯลฯ) เขียนซ้ำต้นทุกตารางเพื่อให้ restore แยกกันได้
+    """
+
+    def __init__(self, open_table):
+        self.open_table = open_table
+        self.header = bytearray()
+        self.buffer = bytearray()
+        self.writer = None
+        self.tables = []
+
+    def write(self, data):
+        self.buffer += data
+        while True:
+            i = self.buffer.find(_TABLE_MARKER)
+            if i < 0:
+                break
+            name_start = i + len(_TABLE_MARKER)
+            name_end = self.buffer.find(b"`\n", name_start)
+            if name_end < 0:
+                # ชื่อตารางถูกตัดกลาง chunk รออ่านเพิ่ม
+                return
+            self._emit(self.buffer[:i + 1])
+            name = bytes(self.buffer[name_start:name_end]).replace(b"``", b"`").decode("utf-8")
+            del self.buffer[:i + 1]
+            self.tables.append(name)
+            self.writer = self.open_table(name)
+            self.writer.write(bytes(self.header))
+        # เก็บท้าย buffer ไว้เผื่อ marker คาบเกี่ยวระหว่าง chunk
+        keep = len(_TABLE_MARKER) + _MAX_NAME_BYTES
+        if len(self.buffer) > keep:
+            self._emit(self.buffer[:-keep])
+            del self.buffer[:-keep]
+
+    def _emit(self, data):
+        if self.writer is None:
+            self.header += data
+        else:
+            self.writer.write(bytes(data))
+
+    def close(self):
+        """ส่งข้อมูลที่ค้างให้ตารางสุดท้าย (ส่วนท้ายของ dump อยู่ในไฟล์ของตารางสุดท้าย)"""
+        if self.buffer:
+            self._emit(self.buffer)
+            self.buffer.clear()
+
+
+def split_create_table(statement: str) -> tuple[str, list[str], list[str]]:
+    """ตัด secondary index และ foreign key ออกจาก CREATE TABLE ที่ได้จาก SHOW CREATE TABLE
+
+    คืน (CREATE TABLE ที่เหลือ, index ที่ตัดออก, foreign key ที่ตัดออก); เก็บ PRIMARY KEY, FULLTEXT/SPATIAL
+    และ index ที่ขึ้นต้นด้วยคอลัมน์ AUTO_INCREMENT (InnoDB บังคับให้มี) ไว้ตามเดิม
+    """
+    lines = statement.split("\n")
+    close = max(i for i, line in enumerate(lines) if line.startswith(")"))
+    definitions = [line.strip().rstrip(",") for line in lines[1:close]]
+    auto_increment = set()
+    for definition in definitions:
+        m = _COLUMN_DEF.match(definition)
+        if m and " AUTO_INCREMENT" in definition:
+            auto_increment.add(m.group(1))
+    kept, indexes, foreign_keys = [], [], []
+    for definition in definitions:
+        m = _INDEX_DEF.match(definition)
+        if m and m.group(1) not in auto_increment:
+            indexes.append(definition)
+        elif _FOREIGN_KEY_DEF.match(definition):
+            foreign_keys.append(definition)
+        else:
+            kept.append(definition)
+    if not indexes and not foreign_keys:
+        return statement, [], []
+    body = ",\n".join("  " + definition for definition in kept)
+    return "\n".join([lines[0], body, *lines[close:]]), indexes, foreign_keys
+
+
+class DeferredIndexReader:
+    """ห่อ reader ของ dump ตารางเดียว ให้ CREATE TABLE ไม่มี secondary index และ foreign key
+
+    InnoDB ต้องอัปเดตทุก index ทีละแถวระหว่าง INSERT; สร้างทีหลังด้วย ALTER TABLE (sort ครั้งเดียว) เร็วกว่า
+    definition ที่ตัดออกอยู่ใน indexes / foreign_keys และได้คำสั่งจาก alter_statements() หลังอ่านจบ
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.table = None
+        self.indexes = []
+        self.foreign_keys = []
+        self.pending = b""
+        self.scanned = False
+
+    def read(self, size=-1):
+        if not self.scanned:
+            self.scanned = True
+            self.pending = self._rewrite_head()
+        if self.pending:
+            if size < 0 or size >= len(self.pending):
+                data, self.pending = self.pending, b""
+            else:
+                data, self.pending = self.pending[:size], self.pending[size:]
+            return data
+        return self.reader.read(size)
+
+    def _rewrite_head(self) -> bytes:
+        head = bytearray()
+        while len(head) < HEAD_LIMIT:
+            chunk = self.reader.read(64 * 1024)
+            if not chunk:
+                break
+            head += chunk
+            m = _CREATE_TABLE.search(head)
+            end = head.find(b";\n", m.end()) if m else -1
+            if end < 0:
+                continue
+            statement = bytes(head[m.start():end]).decode("utf-8")
+            create, self.indexes, self.foreign_keys = split_create_table(statement)
+            self.table = m.group(1).replace(b"``", b"`").decode("utf-8")
+            return bytes(head[:m.start()]) + create.encode("utf-8") + bytes(head[end:])
+        return bytes(head)
+
+    def alter_statements(self) -> tuple[str | None, str | None]:
+        """(ALTER TABLE เพิ่ม index, ALTER TABLE เพิ่ม foreign key); None ถ้าไม่มีอะไรต้องเพิ่ม"""
+        return self._alter(self.indexes), self._alter(self.foreign_keys)
+
+    def _alter(self, definitions: list[str]) -> str | None:
+        if not self.table or not definitions:
+            return None
+        return f"ALTER TABLE {quote_mysql_name(self.table)} " + ", ".join("ADD " + d for d in definitions)
@@ -0,0 +1,436 @@
+"""ส่ง backup ขึ้น object storage แบบ S3 (AWS S3, MinIO และที่เข้ากันได้) ระหว่าง dump และอ่านกลับตอน restore
+
+ใช้แค่ stdlib: ลงชื่อ request ด้วย AWS Signature V4 และใช้ path-style URL (<url>/<bucket>/<key>)
+backup ที่ stream อยู่จะถูกแบ่งเป็น part แล้ว upload หลาย part พร้อมกัน (multipart upload) ระหว่างที่ dump ยังเขียนอยู่
+จึงไม่ต้องอ่านไฟล์หลายกิกะไบต์ซ้ำอีกรอบ ไฟล์บน host ยังเขียนเหมือนเดิม (catalog/retention/.sums ใช้ต่อได้)
+
+config:
+    "upload": {"url": "http://127.0.0.1:9000", "bucket": "backups", "prefix": "erp/", "region": "us-east-1",
+               "access_key": "...", "secret_key": "...", "part_size_mb": 16, "concurrency": 4}
+
+object ที่ upload แล้วอ้างถึงด้วย s3://<bucket>/<key> (ใช้เป็น dump path ของ restore ได้)
+"""
+import datetime
+import hashlib
+import hmac
+import http.client
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from checksums import SUMS_SUFFIX, load_sums
+
+REMOTE_SCHEME = "s3://"
+
+# S3 กำหนด part ขั้นต่ำ 5 MiB (ยกเว้น part สุดท้าย) และไม่เกิน 10,000 part ต่อ object
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_SIZE = 5 * 1024 * 1024 * 1024
+MAX_PARTS = 10000
+# ทุก ๆ PART_GROWTH part ขนาด part จะเพิ่มเป็นสองเท่า (ยังไม่รู้ขนาด dump ล่วงหน้า จึงเผื่อไว้สำหรับ dump ใหญ่มาก)
+PART_GROWTH = 1000
+
+DEFAULT_PART_SIZE_MB = 16
+DEFAULT_CONCURRENCY = 4
+
+# ลองส่ง request ใหม่เมื่อ network ขาดหรือ server ตอบ 5xx
+REQUEST_RETRIES = 3
+REQUEST_TIMEOUT = 120
+
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+def get_upload(section: dict) -> dict | None:
+    """อ่าน section["upload"] แล้วเติมค่า default; คืน None ถ้าไม่ได้ตั้ง url"""
+    opts = section.get("upload") or {}
+    if not opts.get("url"):
+        return None
+    if not opts.get("bucket"):
+        raise RuntimeError("Upload needs a bucket")
+    if urllib.parse.urlsplit(opts["url"]).scheme not in ("http", "https"):
+        raise RuntimeError(f"Unsupported upload url: {opts['url']}")
+    try:
+        part_size = int(float(opts.get("part_size_mb") or DEFAULT_PART_SIZE_MB) * 1024 * 1024)
+        concurrency = int(opts.get("concurrency") or DEFAULT_CONCURRENCY)
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Invalid upload option: {opts!r}")
+    return {
+        "url": opts["url"].rstrip("/"),
+        "bucket": opts["bucket"],
+        "prefix": opts.get("prefix") or "",
+        "region": opts.get("region") or "us-east-1",
+        "access_key": opts.get("access_key") or "",
+        "secret_key": opts.get("secret_key") or "",
+        "part_size": min(max(part_size, MIN_PART_SIZE), MAX_PART_SIZE),
+        "concurrency": max(concurrency, 1),
+    }
+
+
+def is_remote_path(path: str) -> bool:
+    return path.startswith(REMOTE_SCHEME)
+
+
+def remote_path(bucket: str, key: str) -> str:
+    return f"{REMOTE_SCHEME}{bucket}/{key}"
+
+
+def parse_remote_path(path: str) -> tuple[str, str]:
+    bucket, _, key = path[len(REMOTE_SCHEME):].partition("/")
+    if not bucket or not key:
+        raise RuntimeError(f"Invalid object path: {path}")
+    return bucket, key
+
+
+def object_key(opts: dict, dump_path: str) -> str:
+    return opts["prefix"] + os.path.basename(dump_path.rstrip("/\\"))
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return urllib.parse.quote(value, safe=safe)
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_v4(method: str, host: str, path: str, query: dict, headers: dict, payload_hash: str,
+            access_key: str, secret_key: str, region: str, now: datetime.datetime | None = None) -> dict:
+    """คืน headers ที่เติม x-amz-date, x-amz-content-sha256 และ Authorization (AWS Signature V4 ของ s3)"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = now.strftime("%Y%m%d")
+    headers = {**headers, "host": host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash}
+    canonical = {k.lower(): " ".join(str(v).split()) for k, v in headers.items()}
+    signed_headers = ";".join(sorted(canonical))
+    canonical_request = "\n".join([
+        method,
+        _quote(path, safe="-_.~/"),
+        "&".join(f"{_quote(k)}={_quote(str(v))}" for k, v in sorted(query.items())),
+        "".join(f"{k}:{canonical[k]}\n" for k in sorted(canonical)),
+        signed_headers,
+        payload_hash,
+    ])
+    scope = f"{date}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    key = _hmac(_hmac(_hmac(_hmac(("AWS4" + secret_key).encode("utf-8"), date), region), "s3"), "aws4_request")
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    headers["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+def _find(root: ET.Element, tag: str) -> str | None:
+    # response ของ S3 มี namespace แต่ของ server บางตัวไม่มี จึงเทียบเฉพาะชื่อ tag
+    for element in root.iter():
+        if element.tag == tag or element.tag.endswith("}" + tag):
+            return element.text
+    return None
+
+
+class S3Client:
+    """client แบบ path-style; แต่ละ thread มี connection ของตัวเอง (keep-alive)"""
+
+    def __init__(self, opts: dict):
+        self.opts = opts
+        url = urllib.parse.urlsplit(opts["url"])
+        self.scheme = url.scheme
+        self.host = url.netloc
+        self.base_path = url.path.rstrip("/")
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.host, timeout=REQUEST_TIMEOUT)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def request(self, method: str, bucket: str, key: str = "", query: dict | None = None, body: bytes = b"",
+                headers: dict | None = None, stream: bool = False, ok=(200, 204, 206)):
+        """ส่ง request แล้วคืน (status, headers, body); stream=True คืน response ที่ยังไม่อ่าน body แทน body"""
+        query = query or {}
+        path = f"{self.base_path}/{bucket}" + (f"/{key}" if key else "")
+        url = _quote(path, safe="-_.~/")
+        if query:
+            url += "?" + "&".join(f"{_quote(k)}={_quote(str(v))}" for k, v in sorted(query.items()))
+        payload_hash = hashlib.sha256(body).hexdigest() if body else _EMPTY_SHA256
+        for attempt in range(REQUEST_RETRIES + 1):
+            signed = sign_v4(
+                method, self.host, path, query, {**(headers or {}), "content-length": str(len(body))}, payload_hash,
+                self.opts["access_key"], self.opts["secret_key"], self.opts["region"],
+            )
+            try:
+                conn = self._connection()
+                conn.request(method, url, body=body or None, headers=signed)
+                response = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection()
+                if attempt == REQUEST_RETRIES:
+                    raise RuntimeError(f"{method} {remote_path(bucket, key)} failed: {e}")
+                time.sleep(2 ** attempt)
+                continue
+            if response.status >= 500 and attempt < REQUEST_RETRIES:
+                response.read()
+                time.sleep(2 ** attempt)
+                continue
+            if response.status not in ok:
+                data = response.read()
+                message = _find(ET.fromstring(data), "Message") if data.startswith(b"<") else None
+                raise RuntimeError(
+                    f"{method} {remote_path(bucket, key)} failed with HTTP {response.status}: "
+                    f"{message or data[:200].decode(errors='replace')}"
+                )
+            if stream:
+                return response.status, response, response
+            return response.status, response, response.read()
+
+    def put_object(self, bucket: str, key: str, data: bytes):
+        self.request("PUT", bucket, key, body=data)
+
+    def head_object(self, bucket: str, key: str) -> int | None:
+        """ขนาดของ object หรือ None ถ้าไม่มี"""
+        status, response, _ = self.request("HEAD", bucket, key, ok=(200, 404))
+        if status == 404:
+            return None
+        return int(response.getheader("Content-Length"))
+
+    def get_object(self, bucket: str, key: str):
+        """response ของ GET สำหรับอ่านแบบ stream (ต้องอ่านจนจบหรือ close)"""
+        return self.request("GET", bucket, key, stream=True)[1]
+
+    def close(self):
+        self._drop_connection()
+
+
+class MultipartUpload:
+    """รับข้อมูลผ่าน write() แล้ว upload ทีละ part พร้อมกันหลาย thread
+
+    write() จะรอเมื่อมี part ค้างอยู่ concurrency + 1 part (memory จำกัดตามนั้น และ dump จะช้าลงตาม network)
+    object ที่เล็กกว่า part เดียวจะ PUT ครั้งเดียวตอน close()
+    """
+
+    def __init__(self, client: S3Client, bucket: str, key: str, part_size: int, concurrency: int):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buf = bytearray()
+        self.size = 0
+        self.upload_id = None
+        self.parts: dict[int, str] = {}
+        self.futures = []
+        self.next_part = 1
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="upload")
+        self.slots = threading.BoundedSemaphore(concurrency + 1)
+        self.error: BaseException | None = None
+
+    def write(self, data):
+        self.buf += data
+        self.size += len(data)
+        while len(self.buf) >= self.part_size:
+            part = bytes(self.buf[:self.part_size])
+            del self.buf[:self.part_size]
+            self._submit(part)
+        return len(data)
+
+    def _submit(self, data: bytes):
+        if self.error:
+            raise RuntimeError(f"Upload of {remote_path(self.bucket, self.key)} failed: {self.error}")
+        if self.upload_id is None:
+            _, _, body = self.client.request("POST", self.bucket, self.key, query={"uploads": ""})
+            self.upload_id = _find(ET.fromstring(body), "UploadId")
+            if not self.upload_id:
+                raise RuntimeError("Server did not return an UploadId")
+        number = self.next_part
+        if number > MAX_PARTS:
+            raise RuntimeError(f"Upload of {remote_path(self.bucket, self.key)} exceeds {MAX_PARTS} parts")
+        self.next_part += 1
+        if number % PART_GROWTH == 0:
+            self.part_size = min(self.part_size * 2, MAX_PART_SIZE)
+        self.slots.acquire()
+        self.futures.append(self.pool.submit(self._upload_part, number, data))
+
+    def _upload_part(self, number: int, data: bytes):
+        try:
+            _, response, _ = self.client.request(
+                "PUT", self.bucket, self.key, query={"partNumber": str(number), "uploadId": self.upload_id}, body=data,
+            )
+            self.parts[number] = response.getheader("ETag")
+        except BaseException as e:
+            self.error = self.error or e
+            raise
+        finally:
+            self.slots.release()
+
+    def close(self):
+        """upload ส่วนที่เหลือแล้วรวม part เป็น object"""
+        if self.upload_id is None:
+            self.pool.shutdown()
+            self.client.put_object(self.bucket, self.key, bytes(self.buf))
+            self.buf = bytearray()
+            return
+        if self.buf:
+            self._submit(bytes(self.buf))
+            self.buf = bytearray()
+        for future in self.futures:
+            future.result()
+        self.pool.shutdown()
+        body = "<CompleteMultipartUpload>" + "".join(
+            f"<Part><PartNumber>{n}</PartNumber><ETag>{self.parts[n]}</ETag></Part>" for n in sorted(self.parts)
+        ) + "</CompleteMultipartUpload>"
+        _, _, data = self.client.request(
+            "POST", self.bucket, self.key, query={"uploadId": self.upload_id}, body=body.encode("utf-8"),
+        )
+        # complete อาจตอบ 200 แต่ body เป็น <Error> ถ้ารวม part ไม่สำเร็จ
+        root = ET.fromstring(data) if data.strip() else None
+        if root is not None and (root.tag == "Error" or root.tag.endswith("}Error")):
+            raise RuntimeError(f"Completing upload of {remote_path(self.bucket, self.key)} failed: "
+                               f"{_find(root, 'Message')}")
+
+    def abort(self):
+        """ทิ้ง part ที่ upload ไปแล้ว (ไม่ให้ค้างเป็นค่าใช้จ่ายบน server)"""
+        for future in self.futures:
+            future.cancel()
+        self.pool.shutdown(wait=True)
+        if self.upload_id is not None:
+            try:
+                self.client.request("DELETE", self.bucket, self.key, query={"uploadId": self.upload_id})
+            except RuntimeError:
+                pass
+
+
+class TeeWriter:
+    """เขียนข้อมูลชุดเดียวกันลงไฟล์และ upload (tell() ตามไฟล์)"""
+
+    def __init__(self, fileobj, upload: MultipartUpload):
+        self.fileobj = fileobj
+        self.upload = upload
+
+    def write(self, data):
+        n = self.fileobj.write(data)
+        self.upload.write(data)
+        return n
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def tell(self) -> int:
+        return self.fileobj.tell()
+
+
+def start_upload(opts: dict, key: str) -> tuple[S3Client, MultipartUpload]:
+    client = S3Client(opts)
+    try:
+        return client, MultipartUpload(client, opts["bucket"], key, opts["part_size"], opts["concurrency"])
+    except BaseException:
+        client.close()
+        raise
+
+
+def upload_file(opts: dict, path: str, key: str, progress=None):
+    """upload ไฟล์ที่มีอยู่แล้ว (backup ที่ไม่ได้ stream เช่น copy mode) แบบ multipart"""
+    client, upload = start_upload(opts, key)
+    try:
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(upload.part_size)
+                if not data:
+                    break
+                upload.write(data)
+                if progress:
+                    progress.update(len(data))
+        upload.close()
+    except BaseException:
+        upload.abort()
+        raise
+    finally:
+        client.close()
+
+
+class RemoteObject:
+    """อ่าน object แบบ stream; seek ย้อนกลับได้เฉพาะภายในส่วนต้น (HEAD_SIZE) สำหรับตรวจ header"""
+
+    HEAD_SIZE = 64 * 1024
+
+    def __init__(self, client: S3Client, bucket: str, key: str):
+        self.client = client
+        self.size = client.head_object(bucket, key)
+        if self.size is None:
+            raise RuntimeError(f"Object not found: {remote_path(bucket, key)}")
+        self.response = client.get_object(bucket, key)
+        self.head = b""
+        self.position = 0
+        self.fetched = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size
+        out = b""
+        if self.position < len(self.head):
+            out = self.head[self.position:self.position + size]
+            self.position += len(out)
+            size -= len(out)
+        if size > 0 and self.position == self.fetched:
+            data = self.response.read(size)
+            if self.fetched < self.HEAD_SIZE:
+                self.head += data[:self.HEAD_SIZE - self.fetched]
+            self.fetched += len(data)
+            self.position += len(data)
+            out += data
+        return out
+
+    def seek(self, offset, whence=0):
+        if whence != 0 or offset > len(self.head) or (self.fetched > len(self.head) and offset != self.fetched):
+            raise OSError("Remote objects can only seek within their header")
+        self.position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        self.response.close()
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_remote(opts: dict, path: str) -> RemoteObject:
+    bucket, key = parse_remote_path(path)
+    return RemoteObject(S3Client(opts), bucket, key)
+
+
+def load_remote_sums(opts: dict, path: str) -> dict | None:
+    """โหลด <key>.sums ที่ upload คู่กับ backup (ถ้ามี) เพื่อตรวจ checksum ระหว่าง restore"""
+    bucket, key = parse_remote_path(path)
+    client = S3Client(opts)
+    try:
+        if client.head_object(bucket, key + SUMS_SUFFIX) is None:
+            return None
+        _, _, data = client.request("GET", bucket, key + SUMS_SUFFIX)
+    finally:
+        client.close()
+    fd, local = tempfile.mkstemp(suffix=SUMS_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return load_sums(local)
+    finally:
+        os.remove(local)
@@ -0,0 +1,242 @@
+"""รัน process ภายนอกด้วย asyncio: event loop เดียว (thread แยก) ขับทุก docker exec ที่ทำงานพร้อมกัน
+
+thread ไหนก็ส่งงานเข้า ProcessEngine ได้ (เช่น QThread Worker หรือ thread ของ scheduler) โดยไม่ต้องมี
+thread ต่อ process; stdout/stderr ถูกอ่านทีละบรรทัดส่งเข้า log, ยกเลิกได้และตั้ง timeout ได้
+"""
+import asyncio
+import concurrent.futures
+import os
+import signal
+import threading
+
+from cancel import OperationCancelled, on_cancel
+from dockerapi import spawn_exec
+
+# ขนาด buffer ของ StreamReader: บรรทัดที่ยาวกว่านี้จะถูกตัดเป็นท่อน และเป็นเพดาน back-pressure ของ pipe
+STREAM_LIMIT = 1024 * 1024
+
+# เก็บ stderr กี่บรรทัดล่าสุดไว้ใส่ในข้อความ error
+STDERR_TAIL_LINES = 20
+
+
+async def _read_lines(stream: asyncio.StreamReader, on_line, tail: list | None = None):
+    while True:
+        try:
+            line = await stream.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            # บรรทัดยาวเกิน STREAM_LIMIT (เช่น output แบบ binary) อ่านเป็นท่อนแทน
+            line = await stream.read(STREAM_LIMIT)
+        if not line:
+            return
+        text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+        if on_line:
+            on_line(text)
+        if tail is not None:
+            tail.append(text)
+            del tail[:-STDERR_TAIL_LINES]
+
+
+async def _spawn(cmd, creationflags: int = 0, **kwargs) -> asyncio.subprocess.Process:
+    # docker exec ผ่าน Docker Engine API ถ้าเปิด docker_api ไว้ (ไม่ต้อง fork docker CLI)
+    proc = await spawn_exec(
+        cmd, kwargs.get("limit", STREAM_LIMIT), kwargs.get("stdin"), kwargs.get("stdout"), kwargs.get("stderr"),
+    )
+    if proc is not None:
+        return proc
+    # POSIX: ให้แต่ละคำสั่งเป็น process group ของตัวเอง จะได้ kill ลูกหลานของมัน (เช่นคำสั่งใต้ sh -c) ไปพร้อมกัน
+    if os.name != "nt":
+        kwargs["start_new_session"] = True
+    return await asyncio.create_subprocess_exec(*cmd, creationflags=creationflags, **kwargs)
+
+
+async def _kill(proc: asyncio.subprocess.Process):
+    """kill process (และ process group บน POSIX) แล้วรอจนจบ; ถ้าเหลือลูกหลานถือ pipe ไว้ wait() จะค้าง"""
+    if proc.returncode is None:
+        try:
+            # pid เป็น None สำหรับ exec ผ่าน Docker API (ไม่มี process บน host)
+            if os.name != "nt" and proc.pid is not None:
+                os.killpg(proc.pid, signal.SIGKILL)
+            else:
+                proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+
+async def run_process(cmd, on_line=None, timeout: float | None = None, creationflags: int = 0) -> tuple[int, list[str]]:
+    """รัน cmd จนจบ ส่ง stdout/stderr ทีละบรรทัดให้ on_line คืน (returncode, stderr ช่วงท้าย)
+
+    ถ้าเกิน timeout หรือ task ถูก cancel จะ kill process ก่อน raise
+    """
+    proc = await _spawn(
+        cmd, creationflags, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=STREAM_LIMIT,
+    )
+    tail: list[str] = []
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(_read_lines(proc.stdout, on_line), _read_lines(proc.stderr, on_line, tail), proc.wait()),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        raise RuntimeError(f"Command timed out after {timeout:g}s")
+    except BaseException:
+        await _kill(proc)
+        raise
+    return proc.returncode, tail
+
+
+async def capture_process(cmd, input: bytes | None = None, timeout: float | None = None,
+                          creationflags: int = 0) -> tuple[int, bytes, bytes]:
+    """รัน cmd แล้วคืน (returncode, stdout, stderr) ทั้งก้อน; input ส่งเข้า stdin ถ้ามี"""
+    proc = await _spawn(
+        cmd, creationflags, stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(input), timeout)
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        raise RuntimeError(f"Command timed out after {timeout:g}s")
+    except BaseException:
+        await _kill(proc)
+        raise
+    return proc.returncode, out, err
+
+
+async def pipe_processes(src_cmd, dst_cmd, chunk_size: int, on_chunk=None, on_line=None,
+                         timeout: float | None = None, creationflags: int = 0) -> tuple[int, int, int]:
+    """ต่อ stdout ของ src_cmd เข้า stdin ของ dst_cmd คืน (returncode ต้นทาง, returncode ปลายทาง, byte ที่ส่ง)
+
+    back-pressure: รอ drain() ของปลายทางก่อนอ่านต้นทางต่อ และ StreamReader หยุดอ่าน pipe ต้นทางเมื่อ
+    buffer เกิน STREAM_LIMIT จึงใช้หน่วยความจำไม่เกินราว 2 * STREAM_LIMIT ต่อ pipeline
+    on_chunk (ถ้ามี) ถูกเรียกใน thread pool สำหรับงานที่ block เช่นเขียนสำเนาลงดิสก์
+    """
+    src = await _spawn(
+        src_cmd, creationflags, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=STREAM_LIMIT,
+    )
+    try:
+        dst = await _spawn(
+            dst_cmd, creationflags, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except BaseException:
+        await _kill(src)
+        raise
+    sent = 0
+
+    async def pump():
+        nonlocal sent
+        try:
+            while chunk := await src.stdout.read(chunk_size):
+                try:
+                    dst.stdin.write(chunk)
+                    await dst.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    # ปลายทางจบก่อน (restore ล้มเหลว) ไปดู returncode แทน
+                    return
+                sent += len(chunk)
+                if on_chunk:
+                    await asyncio.to_thread(on_chunk, chunk)
+        finally:
+            dst.stdin.close()
+
+    async def run():
+        readers = asyncio.gather(
+            _read_lines(src.stderr, on_line),
+            _read_lines(dst.stdout, on_line),
+            _read_lines(dst.stderr, on_line),
+        )
+        try:
+            await pump()
+            dst_returncode = await dst.wait()
+            if dst_returncode != 0:
+                # ต้นทางอาจค้างเขียน pipe ที่ไม่มีใครอ่านแล้ว
+                await _kill(src)
+            src_returncode = await src.wait()
+            await readers
+        except BaseException:
+            readers.cancel()
+            # รอให้ reader จบและรับ CancelledError ไว้ ไม่ให้ asyncio เตือนว่า exception ไม่ถูกอ่าน
+            await asyncio.gather(readers, return_exceptions=True)
+            raise
+        return src_returncode, dst_returncode
+
+    try:
+        src_returncode, dst_returncode = await asyncio.wait_for(run(), timeout)
+    except asyncio.TimeoutError:
+        await _kill(src)
+        await _kill(dst)
+        raise RuntimeError(f"Pipeline timed out after {timeout:g}s")
+    except BaseException:
+        await _kill(src)
+        await _kill(dst)
+        raise
+    return src_returncode, dst_returncode, sent
+
+
+class ProcessEngine:
+    """event loop ใน thread แยก ให้ thread อื่นส่ง coroutine มารันแล้วรอผล"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="process-engine", daemon=True)
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """ส่ง coroutine เข้า loop คืน concurrent.futures.Future (cancel() แล้ว process จะถูก kill)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """รัน coroutine แล้วรอผลใน thread ที่เรียก; ถ้า thread นี้ถูกขัดจังหวะจะยกเลิกงานใน loop ด้วย
+
+        ถ้า CancelToken ของ thread นี้ถูกยกเลิก จะ cancel task แล้วรอให้ kill process เสร็จก่อน
+        raise OperationCancelled
+        """
+        task = None
+
+        async def tracked():
+            nonlocal task
+            task = asyncio.current_task()
+            return await coro
+
+        future = self.submit(tracked())
+
+        def cancel_in_loop():
+            # รันใน thread ของ loop: ถ้า task เริ่มแล้ว cancel task เพื่อให้ kill process ก่อนจบ future
+            if task is not None:
+                task.cancel()
+            else:
+                future.cancel()
+
+        try:
+            with on_cancel(lambda: self.loop.call_soon_threadsafe(cancel_in_loop)):
+                return future.result()
+        except concurrent.futures.CancelledError:
+            raise OperationCancelled()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def cancel_all(self):
+        """ยกเลิกทุก process ที่ engine กำลังรันอยู่"""
+        def cancel():
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+        self.loop.call_soon_threadsafe(cancel)
+
+
+_engine: ProcessEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> ProcessEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ProcessEngine()
+        return _engine
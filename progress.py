@@ -0,0 +1,82 @@
+import time
+
+# ส่ง event ไม่ถี่กว่านี้ (วินาที) เพื่อไม่ให้ GUI/log ท่วม
+DEFAULT_INTERVAL = 0.5
+
+
+class Progress:
+    """นับ byte ที่ส่งแล้วคำนวณ MB/s และ ETA แล้วส่งเป็น event (dict) ให้ callback
+
+    event: {"phase", "bytes", "total", "rate", "eta", "elapsed", "done"}
+    total/eta เป็น None ถ้าไม่รู้ขนาดทั้งหมด
+    """
+
+    def __init__(self, phase: str, total: int | None, callback, interval: float = DEFAULT_INTERVAL):
+        self.phase = phase
+        self.total = total
+        self.callback = callback
+        self.interval = interval
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.last_emit = 0.0
+
+    def update(self, n: int):
+        self.bytes += n
+        self._maybe_emit()
+
+    def update_to(self, position: int):
+        self.bytes = position
+        self._maybe_emit()
+
+    def finish(self):
+        self._emit(done=True)
+
+    def _maybe_emit(self):
+        now = time.monotonic()
+        if now - self.last_emit >= self.interval:
+            self.last_emit = now
+            self._emit(done=False)
+
+    def _emit(self, done: bool):
+        if not self.callback:
+            return
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.bytes / elapsed
+        eta = None
+        if self.total and rate > 0 and not done:
+            eta = max(self.total - self.bytes, 0) / rate
+        self.callback({
+            "phase": self.phase,
+            "bytes": self.bytes,
+            "total": self.total,
+            "rate": rate,
+            "eta": eta,
+            "elapsed": elapsed,
+            "done": done,
+        })
+
+
+def format_progress(event: dict) -> str:
+    mb = event["bytes"] / (1024 * 1024)
+    rate = event["rate"] / (1024 * 1024)
+    text = f"{event['phase']}: {mb:,.1f} MB"
+    if event["total"]:
+        pct = min(event["bytes"] * 100 / event["total"], 100)
+        text += f" / {event['total'] / (1024 * 1024):,.1f} MB ({pct:.0f}%)"
+    text += f" at {rate:,.1f} MB/s"
+    if event["eta"] is not None:
+        text += f", ETA {format_duration(event['eta'])}"
+    elif event["done"]:
+        text += f" in {format_duration(event['elapsed'])}"
+    return text
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    if h:
+        return f"{h}h{m:02d}m{s:02d}s"
+    if m:
+        return f"{m}m{s:02d}s"
+    return f"{s}s"
@@ -28,14 +28,14 @@ def main() -> None:
     container_dump_path = f"/backup/{file_name}"
 
     # สร้างโฟลเดอร์ /backup ใน container ปลายทาง (ถ้ายังไม่มี)
-    run(["docker", "exec", "-it", TARGET_CONTAINER, "mkdir", "-p", "/backup"])
+    run(["docker", "exec", TARGET_CONTAINER, "mkdir", "-p", "/backup"])
 
     # copy ไฟล์จาก Windows host เข้า container
     run(["docker", "cp", dump_path, f"{TARGET_CONTAINER}:{container_dump_path}"])
 
     # pg_restore ทับฐาน TARGET_DB_NAME โดยไม่ตั้ง owner จาก dump (เลี่ยง role admin)
     run([
-        "docker", "exec", "-e", f"PGPASSWORD={TARGET_DB_PASSWORD}", "-it", TARGET_CONTAINER,
+        "docker", "exec", "-e", f"PGPASSWORD={TARGET_DB_PASSWORD}", TARGET_CONTAINER,
         "pg_restore", "-U", TARGET_DB_USER,
         "-d", TARGET_DB_NAME,
         "--clean", "--if-exists",
@@ -0,0 +1,167 @@
+"""retention ของ backup แบบ GFS (daily/weekly/monthly) และเพดานขนาดรวม ต่อ job
+
+backup ของ job เดียวกันคือไฟล์/directory ใน directory เดียวกันที่ชื่อเป็น <job>_<YYYYmmddHHMMSS> (ดู default_dump_name)
+backup ของ section ที่ไม่ได้มาจาก job ใช้ db_type เป็น prefix (postgres_/mysql_) จึงไม่ปนกันใน BASE_DIR
+backup ใหม่สุดจะถูกเก็บไว้เสมอ; ลบ backup แล้วลบ .sums และ row ใน catalog ด้วย และถ้าเป็น manifest
+จะเก็บกวาด chunk ใน repository ที่ไม่มี manifest ใดอ้างถึงแล้ว (manifest ต้องอยู่ใน catalog หรือ directory เดียวกัน)
+
+config:
+    "retention": {"daily": 7, "weekly": 4, "monthly": 12, "max_size_mb": 0}   (0 = ไม่ใช้กฎนั้น)
+"""
+import os
+import shutil
+import threading
+
+from catalog import backup_paths, known_paths, parse_backup_name, path_size, remove_backups
+from checksums import sums_path
+from chunkstore import gc_repository, is_manifest_file, load_manifest, manifest_digests
+
+RETENTION_KEYS = ("daily", "weekly", "monthly")
+
+# bucket ของแต่ละกฎ: เก็บ backup ใหม่สุดของแต่ละวัน/สัปดาห์ (ISO)/เดือน
+_BUCKETS = {
+    "daily": lambda when: when.date(),
+    "weekly": lambda when: tuple(when.isocalendar())[:2],
+    "monthly": lambda when: (when.year, when.month),
+}
+
+# prune ของ directory เดียวกันต้องไม่ทำพร้อมกัน (หลาย job จบพร้อมกันใน scheduler)
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def get_retention(section: dict) -> dict | None:
+    """อ่าน section["retention"]; คืน None ถ้าไม่ได้ตั้งกฎใดเลย"""
+    opts = section.get("retention") or {}
+    try:
+        policy = {key: max(int(opts.get(key) or 0), 0) for key in (*RETENTION_KEYS, "max_size_mb")}
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Invalid retention value: {opts!r}")
+    if not any(policy.values()):
+        return None
+    return policy
+
+
+def select_backups(backups, policy: dict) -> tuple[list[str], list[str]]:
+    """backups = [(path, เวลา, ขนาด)] -> (path ที่เก็บ, path ที่ลบ) เรียงใหม่ไปเก่า"""
+    ordered = sorted(backups, key=lambda b: b[1], reverse=True)
+    if not ordered:
+        return [], []
+    if any(policy[key] for key in RETENTION_KEYS):
+        keep = {ordered[0][0]}
+        for key in RETENTION_KEYS:
+            seen = set()
+            for path, when, _ in ordered:
+                if len(seen) >= policy[key]:
+                    break
+                bucket = _BUCKETS[key](when)
+                if bucket not in seen:
+                    seen.add(bucket)
+                    keep.add(path)
+    else:
+        keep = {path for path, _, _ in ordered}
+
+    if policy["max_size_mb"]:
+        # เกินเพดาน: ลบ backup ที่เก็บไว้จากเก่าสุดไปจนพอ (ยกเว้นอันใหม่สุด)
+        limit = policy["max_size_mb"] * 1024 * 1024
+        total = sum(size for path, _, size in ordered if path in keep)
+        for path, _, size in reversed(ordered[1:]):
+            if total <= limit:
+                break
+            if path in keep:
+                keep.discard(path)
+                total -= size
+    return [b[0] for b in ordered if b[0] in keep], [b[0] for b in ordered if b[0] not in keep]
+
+
+def job_backups(directory: str, prefix: str) -> list[tuple[str, object, int]]:
+    backups = []
+    for path in backup_paths([directory]):
+        parsed = parse_backup_name(os.path.basename(path))
+        if parsed and parsed[0] == prefix:
+            backups.append((path, parsed[1], path_size(path)))
+    return backups
+
+
+def _repositories(path: str) -> set[str]:
+    files = [os.path.join(d, f) for d, _, names in os.walk(path) for f in names] if os.path.isdir(path) else [path]
+    repositories = set()
+    for name in files:
+        try:
+            if is_manifest_file(name):
+                with open(name, "rb") as f:
+                    repositories.add(os.path.abspath(load_manifest(f)["repository"]))
+        except (OSError, ValueError, RuntimeError, KeyError):
+            continue
+    return repositories
+
+
+def _delete_backup(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+    if os.path.exists(sums_path(path)):
+        os.remove(sums_path(path))
+
+
+def prune(directory: str, prefix: str, policy: dict, catalog_path: str, log, dry_run: bool = False) -> list[str]:
+    """ลบ backup ของ job (prefix) ใน directory ที่เกินกฎ retention; คืน path ที่ลบ (หรือจะลบถ้า dry_run)"""
+    keep, delete = select_backups(job_backups(directory, prefix), policy)
+    log(f"Retention '{prefix}': keeping {len(keep)}, pruning {len(delete)} backup(s)")
+    if dry_run or not delete:
+        for path in delete:
+            log(f"Would prune: {path}")
+        return delete
+
+    repositories = set()
+    deleted = []
+    for path in delete:
+        repositories |= _repositories(path)
+        try:
+            _delete_backup(path)
+        except OSError as e:
+            log(f"Warning: could not prune {path}: {e}")
+            continue
+        deleted.append(path)
+        log(f"Pruned: {path}")
+    if deleted and os.path.exists(catalog_path):
+        remove_backups(catalog_path, deleted)
+
+    for repository in sorted(repositories):
+        # chunk ที่ยังใช้อยู่ = chunk ของทุก manifest ที่รู้จัก (catalog + directory นี้)
+        referenced = set()
+        for path in dict.fromkeys(known_paths(catalog_path) + backup_paths([directory])):
+            if os.path.exists(path):
+                referenced |= manifest_digests(path, repository) or set()
+        removed, freed = gc_repository(repository, referenced)
+        log(f"Repository GC {repository}: removed {removed} chunk(s), freed {freed / (1024 * 1024):,.1f} MB")
+    return deleted
+
+
+def start_prune(dump_path: str, policy: dict, catalog_path: str, log) -> threading.Thread | None:
+    """prune ใน background หลัง backup สำเร็จ เพื่อไม่ให้ job ถัดไปต้องรอ
+
+    thread ไม่ใช่ daemon: CLI จะรอให้ prune เสร็จก่อนจบ process
+    """
+    parsed = parse_backup_name(os.path.basename(dump_path.rstrip("/\\")))
+    if not parsed:
+        log(f"Retention skipped: {dump_path} is not named <job>_<YYYYmmddHHMMSS>")
+        return None
+    directory = os.path.dirname(os.path.abspath(dump_path))
+    with _locks_guard:
+        lock = _locks.setdefault(directory, threading.Lock())
+
+    def run():
+        with lock:
+            try:
+                prune(directory, parsed[0], policy, catalog_path, log)
+            except Exception as e:
+                try:
+                    log(f"Warning: retention failed: {e}")
+                except Exception:
+                    pass
+
+    thread = threading.Thread(target=run, name="prune", daemon=False)
+    thread.start()
+    return thread
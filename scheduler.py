@@ -0,0 +1,150 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cancel import bind_token, check_cancelled, current_token
+from engine import BASE_DIR, default_dump_name, do_backup, log_message, use_docker_api
+
+# ค่า default ของ config["scheduler"]
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PER_CONTAINER = 1
+DEFAULT_PER_HOST = 4
+
+
+def get_jobs(config: dict) -> dict:
+    """คืน config["jobs"] เป็น dict ชื่อ job -> job (แต่ละ job มี db_type, source, target และ option เหมือน section)"""
+    jobs = config.get("jobs") or {}
+    for name, job in jobs.items():
+        if not job.get("db_type"):
+            raise RuntimeError(f"Job '{name}' has no db_type")
+    return jobs
+
+
+def job_config(job: dict, name: str | None = None) -> tuple[str, dict]:
+    """แปลง job ให้อยู่ในรูป (db_type, config) ที่ do_backup/do_restore ใช้ได้ (ชื่อ job ใช้ใน history)"""
+    db_type = job["db_type"].lower()
+    if name:
+        job = {**job, "name": name}
+    return db_type, {db_type: job}
+
+
+def get_scheduler_options(config: dict) -> dict:
+    opts = config.get("scheduler") or {}
+    return {
+        "max_workers": max(int(opts.get("max_workers") or DEFAULT_MAX_WORKERS), 1),
+        "per_container": max(int(opts.get("per_container") or DEFAULT_PER_CONTAINER), 1),
+        "per_host": max(int(opts.get("per_host") or DEFAULT_PER_HOST), 1),
+        "backup_dir": opts.get("backup_dir") or BASE_DIR,
+    }
+
+
+def backup_roots(config: dict) -> list[str]:
+    """directory ที่ catalog scan หา backup: ข้าง config.json และ backup_dir ของ scheduler"""
+    return list(dict.fromkeys([BASE_DIR, get_scheduler_options(config)["backup_dir"]]))
+
+
+def _limit_keys(endpoint: dict) -> tuple[str, str]:
+    host = endpoint.get("docker_host") or "local"
+    return host, f"{host}/{endpoint['container']}"
+
+
+def run_jobs(config: dict, job_names=None, log_callback=None, max_workers=None,
+             per_container=None, per_host=None, backup_dir=None, progress_callback=None) -> dict:
+    """backup หลาย job พร้อมกัน โดยจำกัดจำนวนงานรวม ต่อ container และต่อ Docker host
+
+    คืน dict ชื่อ job -> path ของ dump ที่ได้; ถ้ามี job ล้มเหลวจะ raise RuntimeError หลังทุก job จบ
+    """
+    jobs = get_jobs(config)
+    names = list(job_names) if job_names else sorted(jobs)
+    for name in names:
+        if name not in jobs:
+            raise RuntimeError(f"Job not found: {name}")
+    if not names:
+        raise RuntimeError("No jobs configured")
+
+    use_docker_api(config, log_callback)
+    opts = get_scheduler_options(config)
+    max_workers = max_workers or opts["max_workers"]
+    per_container = per_container or opts["per_container"]
+    per_host = per_host or opts["per_host"]
+    backup_dir = backup_dir or opts["backup_dir"]
+    os.makedirs(backup_dir, exist_ok=True)
+
+    cond = threading.Condition()
+    running_hosts: dict[str, int] = {}
+    running_containers: dict[str, int] = {}
+    results: dict[str, str] = {}
+    errors: dict[str, str] = {}
+    pending = list(names)
+    active = 0
+
+    def job_log(name):
+        if not log_callback:
+            return None
+        return lambda text: log_callback(f"[{name}] {text}")
+
+    def job_progress(name):
+        if not progress_callback:
+            return None
+        return lambda event: progress_callback({**event, "job": name})
+
+    def run_one(name, keys):
+        nonlocal active
+        try:
+            # config ที่ผิด (เช่น parallel ไม่ใช่ตัวเลข) ต้องเป็น error ของ job นี้ และยังคืน slot ใน finally
+            db_type, job_cfg = job_config(jobs[name], name)
+            dump_path = os.path.join(backup_dir, default_dump_name(db_type, jobs[name], prefix=name))
+            do_backup(
+                db_type, job_cfg, dump_path,
+                log_callback=job_log(name), progress_callback=job_progress(name),
+            )
+            results[name] = dump_path
+        except Exception as e:
+            errors[name] = str(e)
+            log_message(f"[{name}] Backup failed: {e}", log_callback)
+        finally:
+            with cond:
+                host_key, container_key = keys
+                running_hosts[host_key] -= 1
+                running_containers[container_key] -= 1
+                active -= 1
+                cond.notify_all()
+
+    def next_runnable():
+        # เลือก job แรกที่ยังไม่ชนเพดานของ host และ container
+        for name in pending:
+            host_key, container_key = _limit_keys(jobs[name]["source"])
+            if running_hosts.get(host_key, 0) < per_host and running_containers.get(container_key, 0) < per_container:
+                return name, (host_key, container_key)
+        return None, None
+
+    log_message(
+        f"Running {len(names)} job(s): max_workers={max_workers}, "
+        f"per_container={per_container}, per_host={per_host}",
+        log_callback,
+    )
+    token = current_token()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        with cond:
+            while pending or active:
+                if token is not None and token.cancelled and pending:
+                    # ยกเลิกแล้ว: ไม่เริ่ม job ใหม่ รอแค่ job ที่กำลังหยุด
+                    log_message(f"Cancelled; skipping {len(pending)} pending job(s)", log_callback)
+                    pending.clear()
+                    continue
+                name, keys = next_runnable() if active < max_workers else (None, None)
+                if name is None:
+                    cond.wait()
+                    continue
+                pending.remove(name)
+                host_key, container_key = keys
+                running_hosts[host_key] = running_hosts.get(host_key, 0) + 1
+                running_containers[container_key] = running_containers.get(container_key, 0) + 1
+                active += 1
+                pool.submit(bind_token(run_one), name, keys)
+
+    log_message(f"Jobs finished: {len(results)} succeeded, {len(errors)} failed", log_callback)
+    check_cancelled()
+    if errors:
+        raise RuntimeError("Failed jobs: " + ", ".join(sorted(errors)))
+    return results
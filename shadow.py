@@ -0,0 +1,89 @@
+"""restore แบบ shadow: โหลดลงฐานสำรองก่อน แล้วสลับเข้าแทนฐานจริงในขั้นตอนเดียว
+
+ฐานจริงใช้งานได้ตามปกติระหว่าง restore (ซึ่งอาจนานหลายชั่วโมง) และถูกปิดแค่ช่วงสลับชื่อไม่กี่วินาที
+ถ้า restore หรือการตรวจล้มเหลว ฐานจริงไม่ถูกแตะเลย; ฐานเดิมถูกเก็บไว้เป็น <db_name>_old (แทนของรอบก่อน)
+
+    Postgres: CREATE DATABASE <db>_shadow -> restore -> ALTER DATABASE ... RENAME ทั้งสองฐานใน transaction เดียว
+    MySQL:    CREATE DATABASE <db>_shadow -> restore -> RENAME TABLE ย้ายทุกตารางข้ามฐานในคำสั่งเดียว
+              (RENAME TABLE ย้าย view, stored routine และตารางที่มี trigger ข้ามฐานไม่ได้ ฐานที่มีสิ่งเหล่านี้
+              จึงใช้ shadow restore ไม่ได้ เพราะหลังสลับจะอ้างตารางที่ย้ายไปอยู่ใน <db_name>_old)
+
+ฐานหลังสลับมีเฉพาะสิ่งที่อยู่ใน dump (ตารางที่มีแค่ในฐานเดิมอยู่ใน <db_name>_old) และฐาน Postgres ใหม่
+เป็นของ db_user ของ target โดยไม่มี ALTER DATABASE SET/GRANT ระดับฐานของฐานเดิม
+
+config:
+    "shadow_restore": true
+"""
+
+SHADOW_SUFFIX = "_shadow"
+PREVIOUS_SUFFIX = "_old"
+
+# ความยาวชื่อฐานสูงสุด (Postgres 63 byte, MySQL 64 ตัวอักษร)
+MAX_NAME_LENGTH = 63
+
+# ฐานที่ใช้ต่อตอนสร้าง/เปลี่ยนชื่อฐานของ Postgres (เปลี่ยนชื่อฐานที่ตัวเองต่ออยู่ไม่ได้)
+PG_MAINTENANCE_DB = "postgres"
+
+# Postgres อาจยังไม่ปล่อย backend ที่ถูก terminate ทันที จึงลองเปลี่ยนชื่อซ้ำ
+SWAP_RETRIES = 10
+SWAP_RETRY_DELAY = 0.5
+
+# เวลารอ metadata lock ของ RENAME TABLE (MySQL) ก่อนยอมแพ้ (วินาที)
+SWAP_LOCK_TIMEOUT = 30
+
+
+def shadow_names(db_name: str) -> tuple[str, str]:
+    """(ชื่อฐาน shadow, ชื่อที่ใช้เก็บฐานเดิมหลังสลับ)"""
+    return (
+        db_name[:MAX_NAME_LENGTH - len(SHADOW_SUFFIX)] + SHADOW_SUFFIX,
+        db_name[:MAX_NAME_LENGTH - len(PREVIOUS_SUFFIX)] + PREVIOUS_SUFFIX,
+    )
+
+
+def pg_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def mysql_literal(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def pg_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def mysql_ident(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def pg_create_sql(shadow: str, encoding: str, collate: str, ctype: str) -> str:
+    """ฐาน shadow ว่างจาก template0 ที่ encoding/locale เหมือนฐานจริง"""
+    return (
+        f"CREATE DATABASE {pg_ident(shadow)} TEMPLATE template0 ENCODING {pg_literal(encoding)} "
+        f"LC_COLLATE {pg_literal(collate)} LC_CTYPE {pg_literal(ctype)}"
+    )
+
+
+def pg_swap_sql(db_name: str, shadow: str, previous: str) -> str:
+    """เปลี่ยนชื่อทั้งสองฐานใน transaction เดียว (psql -c หลายคำสั่งรันเป็น transaction เดียว)"""
+    return (
+        f"ALTER DATABASE {pg_ident(db_name)} RENAME TO {pg_ident(previous)}; "
+        f"ALTER DATABASE {pg_ident(shadow)} RENAME TO {pg_ident(db_name)}"
+    )
+
+
+def pg_terminate_sql(db_name: str) -> str:
+    return (
+        "SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity "
+        f"WHERE datname = {pg_literal(db_name)} AND pid <> pg_backend_pid()"
+    )
+
+
+def mysql_swap_sql(db_name: str, shadow: str, previous: str, live_tables, shadow_tables) -> str:
+    """RENAME TABLE เดียวที่ย้ายตารางจริงไป previous และตารางจาก shadow เข้ามาแทน (atomic ทั้งคำสั่ง)"""
+    moves = [
+        f"{mysql_ident(db_name)}.{mysql_ident(t)} TO {mysql_ident(previous)}.{mysql_ident(t)}" for t in live_tables
+    ] + [
+        f"{mysql_ident(shadow)}.{mysql_ident(t)} TO {mysql_ident(db_name)}.{mysql_ident(t)}" for t in shadow_tables
+    ]
+    return "RENAME TABLE " + ", ".join(moves)
@@ -0,0 +1,84 @@
+"""เลือกเฉพาะบางตาราง: pattern include/exclude ของ job และ TOC จาก pg_restore -l"""
+import fnmatch
+import re
+
+from shadow import pg_literal
+
+# บรรทัด TOC ของ pg_restore -l เช่น "215; 1259 16390 TABLE public invoice admin" (<ชนิด> <schema> <ชื่อ> <owner>)
+_TOC_LINE = re.compile(r"^(\d+); \d+ \d+ (.+)$")
+_TOC_TABLE_TYPES = ("TABLE DATA", "TABLE")
+
+
+def get_table_filter(section: dict) -> tuple[list[str], list[str]]:
+    """คืน (include, exclude) จาก section["tables"]; include ว่าง = ทุกตาราง"""
+    tables = section.get("tables") or {}
+    include = [p.strip() for p in tables.get("include") or [] if p.strip()]
+    exclude = [p.strip() for p in tables.get("exclude") or [] if p.strip()]
+    return include, exclude
+
+
+def match_table(name: str, patterns) -> bool:
+    """name เป็น "schema.table" หรือ "table"; pattern ใช้ * และ ? เทียบได้ทั้งชื่อเต็มและชื่อตาราง"""
+    short = name.rsplit(".", 1)[-1]
+    return any(fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(short, p) for p in patterns)
+
+
+def select_tables(names, include, exclude) -> list[str]:
+    return [n for n in names if (not include or match_table(n, include)) and not match_table(n, exclude)]
+
+
+def parse_toc(text: str) -> list[dict]:
+    """แปลงผลของ pg_restore -l เป็นรายการ entry ของตาราง (TABLE และ TABLE DATA เท่านั้น)
+
+    ชื่อตารางมีช่องว่างได้ (pg_restore ไม่ใส่ quote) จึงตัด owner คำสุดท้ายออกแล้วถือว่าคำแรกคือ schema ที่เหลือคือชื่อ
+    """
+    entries = []
+    for line in text.splitlines():
+        # ไม่ strip ท้ายบรรทัด: dump ที่ไม่มี owner จบด้วยช่องว่าง (owner ว่าง)
+        m = _TOC_LINE.match(line.lstrip().rstrip("\r"))
+        if not m:
+            continue
+        rest = m.group(2)
+        for kind in _TOC_TABLE_TYPES:
+            if rest.startswith(kind + " "):
+                qualified, _, _owner = rest[len(kind) + 1:].rpartition(" ")
+                schema, _, name = qualified.partition(" ")
+                if schema and name:
+                    entries.append({
+                        "id": int(m.group(1)),
+                        "type": kind,
+                        "schema": schema,
+                        "name": name,
+                        "line": line.strip(),
+                    })
+                break
+    return entries
+
+
+def toc_tables(entries: list[dict]) -> list[str]:
+    return sorted({f"{e['schema']}.{e['name']}" for e in entries if e["type"] == "TABLE"})
+
+
+def toc_data_list(entries: list[dict], tables) -> str:
+    """เนื้อหาไฟล์สำหรับ pg_restore -L ที่มีเฉพาะ TABLE DATA ของตารางที่เลือก (เรียงตาม TOC)"""
+    wanted = set(tables)
+    lines = [e["line"] for e in entries if e["type"] == "TABLE DATA" and f"{e['schema']}.{e['name']}" in wanted]
+    return "\n".join(lines) + "\n"
+
+
+def quote_pg_table(name: str) -> str:
+    schema, _, table = name.rpartition(".")
+    parts = [schema, table] if schema else [table]
+    return ".".join('"' + p.replace('"', '""') + '"' for p in parts)
+
+
+def pg_fk_dependents_sql(tables) -> str:
+    """ตารางที่มี foreign key อ้างถึงตารางที่ให้มาทั้งทางตรงและเป็นทอด ๆ (ที่ TRUNCATE ... CASCADE ล้างด้วย)"""
+    regclasses = ", ".join(f"to_regclass({pg_literal(quote_pg_table(name))})" for name in tables)
+    return (
+        "WITH RECURSIVE dep(oid) AS ("
+        f"SELECT oid FROM pg_class WHERE oid IN ({regclasses}) "
+        "UNION SELECT c.conrelid FROM pg_constraint c JOIN dep ON c.confrelid = dep.oid WHERE c.contype = 'f'"
+        ") SELECT n.nspname || '.' || r.relname FROM dep "
+        "JOIN pg_class r ON r.oid = dep.oid JOIN pg_namespace n ON n.oid = r.relnamespace ORDER BY 1"
+    )
@@ -0,0 +1,179 @@
+"""ตรวจหลัง restore/clone ว่า target ตรงกับ source ทีละตาราง: จำนวนแถวและ checksum
+
+mode:
+    count   นับแถวทุกตารางทั้งสองฝั่ง
+    sample  นับแถว + checksum SAMPLE_CHUNKS ช่วงของ primary key ที่กระจายทั่วตาราง
+    full    checksum ทุกช่วงของ primary key (ได้จำนวนแถวไปในตัว)
+
+ตารางที่มี primary key เป็นตัวเลขคอลัมน์เดียวถูกแบ่งเป็นช่วง key ละประมาณ chunk_rows แถว ให้ worker หลายตัว
+ตรวจพร้อมกันได้ทั้งข้ามตารางและภายในตารางใหญ่ตัวเดียว; ตารางอื่น checksum ทั้งตารางใน query เดียว (เฉพาะ full)
+checksum ของช่วงคือผลรวมของ md5 (64 bit แรก) ทุกแถว จึงไม่ขึ้นกับลำดับแถวที่ฐานอ่านออกมา
+
+source ต้องมีข้อมูลเดียวกับตอน dump (เช่น clone/refresh จาก replica หรือช่วงที่หยุดเขียน) ไม่อย่างนั้นจะเจอ mismatch
+ตารางที่ไม่ตรงทำให้ run ล้มเหลว; ผลของทุกตารางถูกเก็บใน history (python cli.py history --verify)
+
+config:
+    "verify": {"mode": "off", "workers": 4, "chunk_rows": 500000}
+"""
+from shadow import mysql_ident, mysql_literal, pg_ident, pg_literal
+from tables import quote_pg_table
+
+VERIFY_MODES = ("off", "count", "sample", "full")
+
+DEFAULT_WORKERS = 4
+DEFAULT_CHUNK_ROWS = 500000
+
+# จำนวนช่วงที่ checksum ต่อตารางในโหมด sample
+SAMPLE_CHUNKS = 8
+
+# key ที่เว้นช่วงห่างมาก (เช่น id แบบ snowflake) ไม่ทำให้จำนวน query ต่อตารางบานเกินนี้
+MAX_CHUNKS = 10000
+
+_PG_INTEGER_TYPES = ("smallint", "integer", "bigint")
+_MYSQL_INTEGER_TYPES = ("tinyint", "smallint", "mediumint", "int", "bigint")
+
+
+def get_verify(section: dict) -> dict | None:
+    """อ่าน section["verify"]; คืน None ถ้าปิดอยู่ (mode = off)"""
+    opts = section.get("verify") or {}
+    mode = (opts.get("mode") or "off").lower()
+    if mode not in VERIFY_MODES:
+        raise RuntimeError(f"Unsupported verify mode: {mode}")
+    if mode == "off":
+        return None
+    try:
+        workers = max(int(opts.get("workers") or DEFAULT_WORKERS), 1)
+        chunk_rows = max(int(opts.get("chunk_rows") or DEFAULT_CHUNK_ROWS), 1000)
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Invalid verify value: {opts!r}")
+    return {"mode": mode, "workers": workers, "chunk_rows": chunk_rows}
+
+
+def plan_chunks(low: int, high: int, est_rows: int, chunk_rows: int) -> list[tuple[int, int]]:
+    """แบ่ง key [low, high] เป็นช่วงครึ่งเปิด [start, end) ช่วงละประมาณ chunk_rows แถว
+
+    ใช้จำนวนแถวโดยประมาณของตาราง (key ที่เว้นช่วงก็ได้ขนาดช่วงใกล้เคียงกัน); ไม่รู้จำนวนแถวถือว่า key เรียงติดกัน
+    """
+    span = high - low + 1
+    rows = est_rows if est_rows > 0 else span
+    count = max(1, min(-(-rows // chunk_rows), MAX_CHUNKS, span))
+    step = -(-span // count)
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+def sample_chunks(chunks: list, count: int = SAMPLE_CHUNKS) -> list:
+    """เลือก count ช่วงที่กระจายเท่า ๆ กัน รวมช่วงแรกและช่วงสุดท้ายเสมอ"""
+    if len(chunks) <= count:
+        return list(chunks)
+    if count == 1:
+        return [chunks[0]]
+    return [chunks[i * (len(chunks) - 1) // (count - 1)] for i in range(count)]
+
+
+def _range_filter(key: str, chunk) -> str:
+    if chunk is None:
+        return ""
+    return f" WHERE {key} >= {chunk[0]} AND {key} < {chunk[1]}"
+
+
+def pg_key_sql(table: str) -> str:
+    """คอลัมน์ของ primary key พร้อมชนิดและจำนวนแถวโดยประมาณ (หนึ่งแถวต่อคอลัมน์)"""
+    return (
+        "SELECT a.attname, format_type(a.atttypid, NULL), c.reltuples::bigint FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indrelid "
+        "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+        f"WHERE i.indrelid = to_regclass({pg_literal(quote_pg_table(table))}) AND i.indisprimary"
+    )
+
+
+def pg_count_sql(table: str) -> str:
+    return f"SELECT count(*) FROM {quote_pg_table(table)}"
+
+
+def pg_bounds_sql(table: str, key: str) -> str:
+    key = pg_ident(key)
+    return f"SELECT min({key}), max({key}) FROM {quote_pg_table(table)}"
+
+
+def pg_checksum_sql(table: str, key: str | None = None, chunk=None) -> str:
+    """(จำนวนแถว, checksum) ของทั้งตารางหรือของช่วง key [start, end)"""
+    where = _range_filter(pg_ident(key), chunk) if key else ""
+    return (
+        "SELECT count(*), coalesce(sum(('x' || left(md5(ROW(t.*)::text), 16))::bit(64)::bigint), 0) "
+        f"FROM {quote_pg_table(table)} AS t{where}"
+    )
+
+
+def integer_key(db_type: str, rows: list[list[str]]) -> str | None:
+    """ชื่อ primary key ถ้าเป็นตัวเลขคอลัมน์เดียว (rows = [[ชื่อ, ชนิด, ...]] ของคอลัมน์ใน primary key)"""
+    if len(rows) != 1:
+        return None
+    types = _PG_INTEGER_TYPES if db_type.lower() == "postgres" else _MYSQL_INTEGER_TYPES
+    return rows[0][0] if rows[0][1].lower() in types else None
+
+
+def mysql_columns_sql(db_name: str, table: str) -> str:
+    """ทุกคอลัมน์ตามลำดับ: ชื่อ, ชนิด, อยู่ใน primary key (1/0), จำนวนแถวโดยประมาณ"""
+    return (
+        "SELECT c.column_name, c.data_type, c.column_key = 'PRI', COALESCE(t.table_rows, 0) "
+        "FROM information_schema.columns c JOIN information_schema.tables t "
+        "ON t.table_schema = c.table_schema AND t.table_name = c.table_name "
+        f"WHERE c.table_schema = {mysql_literal(db_name)} AND c.table_name = {mysql_literal(table)} "
+        "ORDER BY c.ordinal_position"
+    )
+
+
+def mysql_count_sql(table: str) -> str:
+    return f"SELECT COUNT(*) FROM {mysql_ident(table)}"
+
+
+def mysql_bounds_sql(table: str, key: str) -> str:
+    return f"SELECT MIN({mysql_ident(key)}), MAX({mysql_ident(key)}) FROM {mysql_ident(table)}"
+
+
+def mysql_checksum_sql(table: str, columns: list[str], key: str | None = None, chunk=None) -> str:
+    """(จำนวนแถว, checksum) แบบเดียวกับ Postgres; CONCAT_WS ข้าม NULL จึงต่อ flag ISNULL ของทุกคอลัมน์ท้ายแถว"""
+    quoted = [mysql_ident(c) for c in columns]
+    row = f"CONCAT_WS('#', {', '.join(quoted)}, CONCAT({', '.join(f'ISNULL({c})' for c in quoted)}))"
+    where = _range_filter(mysql_ident(key), chunk) if key else ""
+    return (
+        f"SELECT COUNT(*), COALESCE(SUM(CAST(CONV(LEFT(MD5({row}), 16), 16, 10) AS UNSIGNED)), 0) "
+        f"FROM {mysql_ident(table)}{where}"
+    )
+
+
+def table_status(result: dict) -> str:
+    """ok, missing, mismatch หรือ error จากผลของตารางหนึ่ง"""
+    if result["missing"]:
+        return "missing"
+    if result["errors"]:
+        return "error"
+    if result["source_rows"] != result["target_rows"] or result["bad_chunks"]:
+        return "mismatch"
+    return "ok"
+
+
+def describe(result: dict) -> str:
+    """ข้อความหนึ่งบรรทัดของผลตารางหนึ่ง"""
+    status = table_status(result)
+    if status == "missing":
+        return f"{result['table']}: MISSING on {result['missing']}"
+    if status == "error":
+        return f"{result['table']}: ERROR {result['errors'][0]}"
+    rows = f"{result['target_rows']:,} rows" if result["target_rows"] is not None else "rows not counted"
+    if status == "ok":
+        checked = f", {result['chunks']} chunk(s) checksummed" if result["chunks"] else ""
+        return f"{result['table']}: OK {rows}{checked}"
+    parts = []
+    if result["source_rows"] != result["target_rows"]:
+        parts.append(f"rows source={result['source_rows']} target={result['target_rows']}")
+    if result["bad_chunks"]:
+        ranges = ", ".join(
+            "whole table" if chunk is None else f"[{chunk[0]}, {chunk[1]})" for chunk in result["bad_chunks"][:5]
+        )
+        more = " ..." if len(result["bad_chunks"]) > 5 else ""
+        parts.append(
+            f"{len(result['bad_chunks'])} of {result['chunks']} chunk(s) differ"
+            + (f" on {result['key']} {ranges}{more}" if result["key"] else "")
+        )
+    return f"{result['table']}: MISMATCH " + "; ".join(parts)